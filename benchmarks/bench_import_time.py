@@ -0,0 +1,72 @@
+"""Measure package import and script startup time.
+
+Each case is run in a fresh interpreter, several times, and the median
+wall-clock time is reported. ``-X importtime`` output for the package
+import is summarized to show the slowest modules.
+
+Usage: python benchmarks/bench_import_time.py [--repeat N] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CASES = [("import kismetdb", ["-c", "import kismetdb"]),
+         ("kismetdb.Packets", ["-c", "import kismetdb; kismetdb.Packets"]),
+         ("kismetdb.Exporter", ["-c", "import kismetdb; kismetdb.Exporter"]),
+         ("kismet_log_to_kml --help",
+          ["-m", "kismetdb.scripts.log_to_kml", "--help"]),
+         ("kismet_log_export --help",
+          ["-m", "kismetdb.scripts.log_export", "--help"])]
+
+
+def run(args):
+    """Return wall-clock seconds to run the interpreter with ``args``."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT
+    start = time.time()
+    subprocess.check_call([sys.executable] + args, env=env,
+                          stdout=open(os.devnull, "w"))
+    return time.time() - start
+
+
+def slowest_imports(top):
+    """Return the ``top`` modules with the largest cumulative import time."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT
+    output = subprocess.check_output(
+        [sys.executable, "-X", "importtime", "-c", "import kismetdb.packets"],
+        env=env, stderr=subprocess.STDOUT).decode("utf-8")
+    results = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        results.append((int(cumulative), name.strip()))
+    return sorted(results, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=11)
+    parser.add_argument("--top", type=int, default=10)
+    results = parser.parse_args()
+
+    # Warm up, so bytecode caches are written before timing
+    run(["-c", "import kismetdb.export"])
+    print("{:<28} {:>10}".format("case", "median_ms"))
+    for name, args in CASES:
+        timings = sorted([run(args) for _ in range(results.repeat)])
+        print("{:<28} {:>10.1f}".format(name,
+                                        timings[len(timings) // 2] * 1000))
+    print("")
+    print("Slowest imports for kismetdb.packets (cumulative us):")
+    for cumulative, name in slowest_imports(results.top):
+        print("{:>10} {}".format(cumulative, name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compare OR-chain and JSON set-membership filters across list sizes.
+
+Builds a throwaway packets table and times ``Packets.get_meta(sourcemac=...)``
+with each strategy, forcing the choice with
+``Utility.multi_value_json_threshold``.
+
+Usage: python benchmarks/bench_set_filters.py [--packets N]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import kismetdb  # NOQA
+
+
+def build_log(file_location, n_packets, n_macs):
+    """Write a minimal version 8 log with only the tables Packets needs."""
+    db = sqlite3.connect(file_location)
+    db.execute("CREATE TABLE KISMET (kismet_version TEXT, db_version INT, "
+               "db_module TEXT)")
+    db.execute("INSERT INTO KISMET VALUES ('bench', 8, 'kismetlog')")
+    columns = kismetdb.Packets.column_reference[8]
+    db.execute("CREATE TABLE packets ({})".format(", ".join(columns)))
+    sql = "INSERT INTO packets VALUES ({})".format(
+        ", ".join(["?"] * len(columns)))
+    rows = []
+    for i in range(n_packets):
+        row = {x: 0 for x in columns}
+        row["sourcemac"] = "02:00:00:{:02X}:{:02X}:{:02X}".format(
+            (i % n_macs) >> 16 & 0xff, (i % n_macs) >> 8 & 0xff,
+            (i % n_macs) & 0xff)
+        row["ts_sec"] = 1600000000 + i // 100
+        row["packet"] = b""
+        rows.append([row[x] for x in columns])
+    db.executemany(sql, rows)
+    db.commit()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packets", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    results = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        log_file = os.path.join(workdir, "bench.kismet")
+        build_log(log_file, results.packets, 50000)
+        packets = kismetdb.Packets(log_file)
+        default_threshold = kismetdb.Utility.multi_value_json_threshold
+        print("{:>8} {:>12} {:>12} {:>8}".format("values", "or_chain_s",
+                                                 "json_each_s", "rows"))
+        for n_values in [1, 2, 4, 8, 32, 128, 1024, 8192, 20000]:
+            macs = ["02:00:00:{:02X}:{:02X}:{:02X}".format(
+                i >> 16 & 0xff, i >> 8 & 0xff, i & 0xff)
+                for i in range(0, n_values * 2, 2)]
+            timings = []
+            for threshold in [sys.maxsize, 0]:
+                kismetdb.Utility.multi_value_json_threshold = threshold
+                try:
+                    timings.append(min(timeit.repeat(
+                        lambda: packets.get_meta(sourcemac=macs),
+                        number=1, repeat=results.repeat)))
+                except sqlite3.OperationalError as e:
+                    timings.append(str(e))
+            kismetdb.Utility.multi_value_json_threshold = default_threshold
+            nrows = len(packets.get_meta(sourcemac=macs))
+            print("{:>8} {:>12} {:>12} {:>8}".format(
+                n_values,
+                *["{:.4f}".format(x) if isinstance(x, float) else "error"
+                  for x in timings] + [nrows]))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
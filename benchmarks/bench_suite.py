@@ -0,0 +1,324 @@
+"""Benchmark every table abstraction and console script on generated logs.
+
+Logs of each requested DB version and size are generated with
+``kismetdb.testing.generate_log()`` (and kept in ``--data-dir`` for later
+runs, since generation is deterministic). Every case is run in a fresh
+interpreter, so peak RSS is measured per case. For each case the median
+wall-clock time, rows/sec, time to first row and peak RSS are reported.
+Time to first row is only measured for library calls; for ``get_*`` calls
+it is the time to return the whole list.
+
+Results can be written as JSON with ``--json``, and compared against an
+earlier run with ``--compare``, to check a change or release for
+regressions.
+
+Usage: python benchmarks/bench_suite.py [--versions 4,8]
+           [--sizes 10000,100000] [--repeat N] [--filter TEXT]
+           [--json OUT] [--compare BASELINE] [--threshold PCT]
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+sys.path.insert(0, ROOT)
+
+import kismetdb  # NOQA
+from kismetdb import testing  # NOQA
+
+ABSTRACTIONS = ["Alerts", "DataPackets", "DataSources", "Devices", "Messages",
+                "Packets", "Snapshots"]
+
+METHODS = ["get_all", "get_meta", "yield_all", "yield_meta"]
+
+# Script name, module, arguments ({log} and {out} are replaced with the
+# input log and an output directory), and the tables it reads.
+SCRIPTS = [("kismet_log_devices_to_filebeat_json",
+            "log_devices_to_filebeat_json",
+            ["--in", "{log}", "--out", "{out}/devices.json"], ["devices"]),
+           ("kismet_log_devices_to_json", "log_devices_to_json",
+            ["--in", "{log}", "--out", "{out}/devices.json"], ["devices"]),
+           ("kismet_log_export", "log_export",
+            ["--in", "{log}", "--sink", "csv:packets:{out}/packets.csv",
+             "--sink", "ndjson:devices:{out}/devices.json"],
+            ["devices", "packets"]),
+           ("kismet_log_to_csv devices", "log_to_csv",
+            ["--in", "{log}", "--out", "{out}/devices.csv"], ["devices"]),
+           ("kismet_log_to_csv packets", "log_to_csv",
+            ["--in", "{log}", "--out", "{out}/packets.csv", "--table",
+             "packets"], ["packets"]),
+           ("kismet_log_to_kml", "log_to_kml",
+            ["--in", "{log}", "--out", "{out}/devices.kml"], ["devices"]),
+           ("kismet_log_to_parquet", "log_to_parquet",
+            ["--in", "{log}", "--out-dir", "{out}", "--table", "devices",
+             "--table", "packets"], ["devices", "packets"]),
+           ("kismet_log_to_pcap", "log_to_pcap",
+            ["--in", "{log}", "--out", "{out}/packets.pcap", "--silent",
+             "yes"], ["packets"])]
+
+
+def get_peak_rss():
+    """Return peak RSS of this process in bytes, or None if unknown."""
+    # On Linux, ru_maxrss survives exec(), so would include the parent's
+    # usage; VmHWM is reset for the new program.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_method(case):
+    """Run one abstraction method, returning (rows, first_row_seconds)."""
+    abstraction = getattr(kismetdb, case["abstraction"])(case["log"])
+    start = time.time()
+    first_row = None
+    rows = 0
+    for _ in getattr(abstraction, case["method"])():
+        if first_row is None:
+            first_row = time.time() - start
+        rows += 1
+    return rows, first_row
+
+
+def run_script(case):
+    """Run one console script, with its output discarded."""
+    module = importlib.import_module("kismetdb.scripts." + case["module"])
+    out_dir = tempfile.mkdtemp()
+    argv = sys.argv
+    sys.stdout.flush()
+    saved_stdout = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        sys.argv = [case["name"]] + [x.format(log=case["log"], out=out_dir)
+                                     for x in case["args"]]
+        try:
+            module.main()
+        except SystemExit as e:
+            if e.code:
+                raise RuntimeError("{} exited with {}".format(case["name"],
+                                                              e.code))
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved_stdout, 1)
+        os.close(devnull)
+        os.close(saved_stdout)
+        sys.argv = argv
+        shutil.rmtree(out_dir)
+    return case["rows"], None
+
+
+def run_case(case):
+    """Run a case in this process, and print its measurements as JSON."""
+    start = time.time()
+    if case["kind"] == "method":
+        rows, first_row = run_method(case)
+    else:
+        rows, first_row = run_script(case)
+    seconds = time.time() - start
+    print(json.dumps({"rows": rows, "seconds": seconds,
+                      "first_row_seconds": first_row,
+                      "peak_rss_bytes": get_peak_rss()}))
+
+
+def measure(case, repeat):
+    """Run a case ``repeat`` times in fresh interpreters, and return its
+    median measurements."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), "--run-case",
+             json.dumps(case)], env=env)
+        runs.append(json.loads(output.decode("utf-8").splitlines()[-1]))
+    result = {}
+    for field in ["seconds", "first_row_seconds", "peak_rss_bytes"]:
+        values = sorted([x[field] for x in runs if x[field] is not None])
+        result[field] = values[len(values) // 2] if values else None
+    result["rows"] = runs[0]["rows"]
+    result["rows_per_sec"] = result["rows"] / max(result["seconds"], 1e-9)
+    return result
+
+
+def get_log(data_dir, db_version, n_packets):
+    """Return the path of a generated log, generating it if needed."""
+    path = os.path.join(data_dir, "bench-v{}-{}.kismet".format(db_version,
+                                                               n_packets))
+    if not os.path.exists(path):
+        print("Generating {}".format(path))
+        testing.generate_log(path, db_version,
+                             n_devices=max(10, n_packets // 50),
+                             n_packets=n_packets,
+                             n_alerts=max(10, n_packets // 100),
+                             n_messages=max(10, n_packets // 100),
+                             n_data=max(10, n_packets // 100),
+                             duplicate_rate=0.1,
+                             duration=max(600, n_packets // 10))
+    return path
+
+
+def build_cases(log, db_version, n_packets):
+    """Return the list of cases to run against one log."""
+    label = "v{}/{}".format(db_version, n_packets)
+    counts = {}
+    cases = []
+    for name in ABSTRACTIONS:
+        abstraction = getattr(kismetdb, name)(log)
+        counts[abstraction.table_name] = abstraction.count()
+        for method in METHODS:
+            cases.append({"kind": "method",
+                          "name": "{}.{}".format(name, method),
+                          "abstraction": name, "method": method})
+    try:
+        import pyarrow  # NOQA
+        have_pyarrow = True
+    except ImportError:
+        have_pyarrow = False
+    for name, module, args, tables in SCRIPTS:
+        if module == "log_to_parquet" and not have_pyarrow:
+            continue
+        cases.append({"kind": "script", "name": name, "module": module,
+                      "args": args,
+                      "rows": sum([counts[x] for x in tables])})
+    for case in cases:
+        case["log"] = log
+        case["label"] = label
+        case["db_version"] = db_version
+        case["log_packets"] = n_packets
+    return cases
+
+
+def get_metadata():
+    """Return a description of the environment the suite ran in."""
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT,
+            stderr=open(os.devnull, "w")).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"kismetdb_version": kismetdb.__version__, "commit": commit,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "time": int(time.time())}
+
+
+def compare(results, baseline_file, threshold):
+    """Print each case's change against a baseline run.
+
+    Returns:
+        int: Number of cases slower, or using more memory, by more than
+            ``threshold`` percent.
+    """
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    previous = {(x["label"], x["name"]): x for x in baseline["results"]}
+    print("")
+    print("Compared with {} ({}):".format(
+        baseline_file, baseline["metadata"].get("commit")))
+    print("{:<10} {:<40} {:>10} {:>10}".format("log", "case", "rows/s %",
+                                               "rss %"))
+    regressions = 0
+    for result in results:
+        before = previous.get((result["label"], result["name"]))
+        if before is None:
+            continue
+        speed = (result["rows_per_sec"] / before["rows_per_sec"] - 1) * 100
+        rss = None
+        if result["peak_rss_bytes"] and before["peak_rss_bytes"]:
+            rss = (float(result["peak_rss_bytes"]) /
+                   before["peak_rss_bytes"] - 1) * 100
+        flag = ""
+        if speed < -threshold or (rss is not None and rss > threshold):
+            flag = " REGRESSION"
+            regressions += 1
+        print("{:<10} {:<40} {:>+10.1f} {:>10}{}".format(
+            result["label"], result["name"], speed,
+            "-" if rss is None else "{:+.1f}".format(rss), flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--versions", default="4,8",
+                        help="Comma-separated DB versions to generate")
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="Comma-separated numbers of packets per log")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--filter", default=None,
+                        help="Only run cases whose name contains this text")
+    parser.add_argument("--data-dir", default=os.path.join(
+        tempfile.gettempdir(), "kismetdb-bench"),
+        help="Directory generated logs are kept in")
+    parser.add_argument("--json", default=None,
+                        help="Write results to this JSON file")
+    parser.add_argument("--compare", default=None,
+                        help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent change reported as a regression")
+    parser.add_argument("--run-case", default=None, help=argparse.SUPPRESS)
+    results = parser.parse_args()
+
+    if results.run_case is not None:
+        run_case(json.loads(results.run_case))
+        return
+
+    if not os.path.isdir(results.data_dir):
+        os.makedirs(results.data_dir)
+    measurements = []
+    print("{:<10} {:<40} {:>8} {:>12} {:>10} {:>10} {:>8}".format(
+        "log", "case", "rows", "rows/s", "median_s", "first_s", "rss_mb"))
+    for db_version in [int(x) for x in results.versions.split(",")]:
+        for n_packets in [int(x) for x in results.sizes.split(",")]:
+            log = get_log(results.data_dir, db_version, n_packets)
+            for case in build_cases(log, db_version, n_packets):
+                if results.filter and results.filter not in case["name"]:
+                    continue
+                result = measure(case, results.repeat)
+                result.update({"label": case["label"], "name": case["name"],
+                               "kind": case["kind"],
+                               "db_version": db_version,
+                               "log_packets": n_packets})
+                measurements.append(result)
+                print("{:<10} {:<40} {:>8} {:>12.0f} {:>10.4f} {:>10} "
+                      "{:>8}".format(
+                          result["label"], result["name"], result["rows"],
+                          result["rows_per_sec"], result["seconds"],
+                          "-" if result["first_row_seconds"] is None else
+                          "{:.4f}".format(result["first_row_seconds"]),
+                          "-" if result["peak_rss_bytes"] is None else
+                          "{:.1f}".format(result["peak_rss_bytes"] /
+                                          1048576.0)))
+
+    if results.json:
+        with open(results.json, "w") as f:
+            json.dump({"metadata": get_metadata(), "results": measurements},
+                      f, indent=2, sort_keys=True)
+        print("Wrote {}".format(results.json))
+
+    if results.compare and compare(measurements, results.compare,
+                                   results.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
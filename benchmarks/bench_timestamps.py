@@ -0,0 +1,67 @@
+"""Time timestamp parsing and formatting helpers.
+
+Compares ``Utility.timestamp_string_to_tuple()`` for epoch, ISO 8601 and
+free-form strings, with and without its memo (which free-form strings
+bypass), against calling dateutil directly, and ``Utility.timestamp_to_iso()`` on a whole column against
+converting values one at a time.
+
+Usage: python benchmarks/bench_timestamps.py [--number N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import kismetdb  # NOQA
+
+
+def parse_uncached(timestamp):
+    kismetdb.Utility.timestamp_cache.clear()
+    return kismetdb.Utility.timestamp_string_to_tuple(timestamp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--rows", type=int, default=1000000)
+    results = parser.parse_args()
+
+    from dateutil import parser as dateparser
+    number = results.number
+    print("{:<34} {:>12} {:>12} {:>12}".format("timestamp", "dateutil_us",
+                                               "uncached_us", "cached_us"))
+    for timestamp in ["1600000000", "2020-09-13T12:26:40",
+                      "2020-09-13T12:26:40.123456+00:00",
+                      "Sep 13 2020 12:26:40"]:
+        try:
+            dateutil_s = timeit.timeit(
+                lambda: dateparser.parse(timestamp, fuzzy=True),
+                number=number)
+            dateutil_us = "{:.2f}".format(dateutil_s / number * 1e6)
+        except ValueError:
+            # dateutil does not understand epoch seconds
+            dateutil_us = "-"
+        uncached_s = timeit.timeit(lambda: parse_uncached(timestamp),
+                                   number=number)
+        cached_s = timeit.timeit(
+            lambda: kismetdb.Utility.timestamp_string_to_tuple(timestamp),
+            number=number)
+        print("{:<34} {:>12} {:>12.2f} {:>12.2f}".format(
+            timestamp, dateutil_us, uncached_s / number * 1e6,
+            cached_s / number * 1e6))
+
+    column = [1600000000 + i // 100 for i in range(results.rows)]
+    per_value_s = timeit.timeit(
+        lambda: [kismetdb.Utility.timestamp_to_iso(x) for x in column],
+        number=1)
+    column_s = timeit.timeit(
+        lambda: kismetdb.Utility.timestamp_to_iso(column), number=1)
+    print("")
+    print("timestamp_to_iso, {} rows: per value {:.3f}s, column {:.3f}s"
+          .format(results.rows, per_value_s, column_s))
+
+
+if __name__ == "__main__":
+    main()
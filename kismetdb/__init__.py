@@ -1,13 +1,59 @@
-from .alerts import Alerts  # NOQA
-from .base_interface import BaseInterface  # NOQA
-from .data_packets import DataPackets  # NOQA
-from .data_sources import DataSources  # NOQA
-from .devices import Devices  # NOQA
-from .kismet import Kismet  # NOQA
-from .messages import Messages  # NOQA
-from .packets import Packets  # NOQA
-from .snapshots import Snapshots  # NOQA
-from .utility import Utility  # NOQA
+import importlib
+import sys
+
+# Public names, and the submodule each is defined in. On Python 3.7 and
+# later, submodules are only imported when one of their names is first
+# used, which keeps short-lived scripts fast to start.
+lazy_attributes = {"Alerts": "alerts",
+                   "BaseInterface": "base_interface",
+                   "DataPackets": "data_packets",
+                   "DataSources": "data_sources",
+                   "DeviceCache": "device_cache",
+                   "Devices": "devices",
+                   "Exporter": "export",
+                   "F": "expressions",
+                   "predicate": "expressions",
+                   "Kismet": "kismet",
+                   "KMLWriter": "kml",
+                   "Messages": "messages",
+                   "Packets": "packets",
+                   "Query": "query",
+                   "ResultCache": "result_cache",
+                   "Snapshots": "snapshots",
+                   "Utility": "utility"}
+
+__all__ = sorted(lazy_attributes)
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name not in lazy_attributes:
+            err = "module {!r} has no attribute {!r}".format(__name__, name)
+            raise AttributeError(err)
+        module = importlib.import_module("." + lazy_attributes[name],
+                                         __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(list(globals()) + list(lazy_attributes))
+else:
+    from .alerts import Alerts  # NOQA
+    from .base_interface import BaseInterface  # NOQA
+    from .data_packets import DataPackets  # NOQA
+    from .data_sources import DataSources  # NOQA
+    from .device_cache import DeviceCache  # NOQA
+    from .devices import Devices  # NOQA
+    from .export import Exporter  # NOQA
+    from .expressions import F, predicate  # NOQA
+    from .kismet import Kismet  # NOQA
+    from .kml import KMLWriter  # NOQA
+    from .messages import Messages  # NOQA
+    from .packets import Packets  # NOQA
+    from .query import Query  # NOQA
+    from .result_cache import ResultCache  # NOQA
+    from .snapshots import Snapshots  # NOQA
+    from .utility import Utility  # NOQA
 
 __version__ = "2021.06.01"
 __author__ = "Mike Kershaw, Ash Wilson"
@@ -15,4 +61,3 @@ __copyright__ = "2021, Mike Kershaw"
 __license__ = "GPL2"
 __email__ = "dragorn@kismetwireless.net"
 __version_int__ = "20210601"
-
@@ -18,6 +18,13 @@ class Alerts(BaseInterface):
         phyname (str, list): Restrict results to this PHY.
         devmac (str, list): Restrict results to this MAC address.
         header (str, list): Restrict results to alerts of this type.
+        bbox (tuple): Match alerts located within
+            (min_lat, min_lon, max_lat, max_lon).
+        within_radius (tuple): Match alerts located within
+            (lat, lon, meters).
+        where (Expression, callable): Match alerts for which this
+            expression (see ``kismetdb.F``) or Python predicate (see
+            ``kismetdb.predicate()``) is true.
 
     """
 
@@ -44,6 +51,7 @@ class Alerts(BaseInterface):
                             "lon", "header", "json"],
                         8: ["ts_sec", "ts_usec", "phyname", "devmac", "lat",
                             "lon", "header", "json"]}
+    location_columns = ("lat", "lon")
     valid_kwargs = {"ts_sec_gt": Utility.generate_single_tstamp_secs_gt,
                     "devmac": Utility.generate_multi_string_sql_eq,
                     "header": Utility.generate_multi_string_sql_eq,
@@ -1,6 +1,16 @@
+import base64
+import collections
+import json
+import math
 import os
 import sqlite3
 
+from . import metrics as progress_metrics
+from . import profiling
+from .expressions import get_predicate_columns
+from .query import Query
+from .utility import Utility
+
 
 class BaseInterface(object):
     """Initialize with a path to a valid Kismet log file.
@@ -32,6 +42,31 @@ class BaseInterface(object):
             of kismet DB. Created on instantiation.
         meta_query_column_names (list): Processed column names for meta query
             of kismet DB. Created on instantiation.
+        location_columns (tuple): Names of the (lat, lon) columns locating
+            each row, if any. Used by spatial filters.
+        signal_column (str): Name of the column holding signal strength,
+            if any. Used by ``aggregate_tiles()``.
+        bounds_columns (tuple): Names of (min_lat, min_lon, max_lat,
+            max_lon) columns, for tables where a row covers an area rather
+            than a point. Defaults to ``location_columns``.
+        spatial_index_file (str): Path of the optional sidecar R*Tree
+            index built by ``build_spatial_index()``.
+        distinct_cache (collections.OrderedDict): Results of ``distinct()``
+            and ``cardinality()``, shared by all instances and keyed by file,
+            table, column and filters. Entries are discarded when the log
+            file changes.
+        distinct_cache_size (int): Maximum number of cached results.
+        sql_functions (collections.OrderedDict): Python predicates passed
+            with the ``where`` keyword argument, keyed by the function
+            itself, with their SQL function names. They are registered as
+            SQL functions on each connection. At most the
+            ``sql_functions_size`` most recent are kept; a ``Query`` keeps
+            the predicates it calls for as long as it exists.
+        result_cache (kismetdb.ResultCache): Optional on-disk cache for
+            query results. Disabled (None) by default.
+        parquet_json_fields (list): Fields extracted from the bulk data
+            field into their own columns when exporting to Parquet. Each
+            item is a tuple of (column name, path of JSON keys, SQLite type).
 
     """
     table_name = "KISMET"
@@ -52,6 +87,18 @@ class BaseInterface(object):
                         7: ["kismet_version", "db_version", "db_module"],
                         8: ["kismet_version", "db_version", "db_module"]}
     valid_kwargs = {}
+    parquet_json_fields = []
+    aggregate_functions = ["count", "count_distinct", "min", "max", "sum",
+                           "avg"]
+    location_columns = None
+    signal_column = None
+    bounds_columns = None
+    spatial_kwargs = ["bbox", "within_radius"]
+    spatial_index_suffix = ".spatial"
+    distinct_cache = collections.OrderedDict()
+    distinct_cache_size = 256
+    result_cache = None
+    sql_functions_size = 64
 
     def __init__(self, file_location):
         self.check_db_exists(file_location)
@@ -61,6 +108,10 @@ class BaseInterface(object):
         self.check_column_names(file_location)
         self.full_query_column_names = self.get_query_column_names()
         self.meta_query_column_names = self.get_meta_query_column_names()
+        self.spatial_index_file = file_location + self.spatial_index_suffix
+        self.spatial_index_state = None
+        self.sql_functions = collections.OrderedDict()
+        self.sql_function_count = 0
 
     def __get_latest_version(self, content):
         if self.db_version in content:
@@ -131,19 +182,903 @@ class BaseInterface(object):
         query_parts = []
         replacements = {}
         for k, v in list(filters.items()):
-            if k not in self.valid_kwargs:
+            if k in self.spatial_kwargs:
+                results = self.generate_spatial_sql(k, v)
+            elif k == "where" and callable(v):
+                results = self.generate_predicate_sql(v)
+            elif k == "where":
+                results = v.to_sql(self)
+            elif k not in self.valid_kwargs:
                 continue
-            results = self.valid_kwargs[k](k, v)
+            else:
+                results = self.valid_kwargs[k](k, v)
             query_parts.append(results[0])
             replacements.update(results[1])
         return (query_parts, replacements)
 
-    def get_all(self, **kwargs):
+    def generate_predicate_sql(self, func):
+        """Return tuple with SQL partial calling a Python predicate, and
+        (empty) replacements.
+
+        The predicate is registered as a SQL function on connections made
+        by ``connect()``. See ``kismetdb.predicate()``.
+
+        Raises:
+            ValueError: Predicate declares unknown columns, or none.
+        """
+        columns = get_predicate_columns(func)
+        for column in columns:
+            if column not in self.column_names:
+                err = "Invalid column {} for table {}. Expected one of {}".format(  # NOQA
+                    column, self.table_name, self.column_names)
+                raise ValueError(err)
+
+        def call(*values):
+            values = [self.convert_value(col, value)
+                      for col, value in zip(columns, values)]
+            return bool(func(*values))
+        # Names are never reused, so SQL compiled for a predicate since
+        # dropped can never call a different one.
+        registered = self.sql_functions.pop(func, None)
+        if registered is None:
+            self.sql_function_count += 1
+            name = "kismetdb_where_{}".format(self.sql_function_count)
+        else:
+            name = registered[0]
+        self.sql_functions[func] = (name, len(columns), call)
+        while len(self.sql_functions) > self.sql_functions_size:
+            self.sql_functions.popitem(last=False)
+        return ("{}({})".format(name, ", ".join(columns)), {})
+
+    def get_sql_functions(self, sql):
+        """Return the registered predicates ``sql`` calls.
+
+        Returns:
+            dict: Tuple of (number of arguments, function), keyed by SQL
+                function name.
+        """
+        return {x[0]: x[1:] for x in list(self.sql_functions.values())
+                if "{}(".format(x[0]) in sql}
+
+    def get_timestamp_columns(self):
+        """Return the columns filtered as timestamps by ``valid_kwargs``."""
+        tstamp_generators = [Utility.generate_single_tstamp_secs_gt,
+                             Utility.generate_single_tstamp_secs_lt]
+        result = []
+        for k, v in list(self.valid_kwargs.items()):
+            column = k.rsplit("_", 1)[0]
+            if v in tstamp_generators and column in self.column_names:
+                result.append(column)
+        return result
+
+    def format_expression_value(self, column, value):
+        """Return ``value`` in the units stored for ``column``.
+
+        Timestamps (as accepted by the time-based keyword filters) become
+        Unix epoch seconds, and lat/lon values are encoded as in the DB.
+        """
+        if column in self.get_timestamp_columns() and \
+                not isinstance(value, (int, float)):
+            return Utility.timestamp_to_dbtime(value)[0]
+        if self.stores_latlon_as_integer(column):
+            return self.format_spatial_value(column, value)
+        return value
+
+    def generate_where_clause(self, filters):
+        """Return tuple with sql WHERE clause (or empty string) and
+        replacements."""
+        query_parts, replacements = self.generate_parts_and_replacements(filters)  # NOQA
+        if not query_parts:
+            return ("", replacements)
+        return (" WHERE " + " AND ".join(query_parts), replacements)
+
+    def parse_order_by(self, order_by):
+        """Return a list of (column, direction) tuples for ``order_by``.
+
+        Args:
+            order_by (str, list): Column name, or list of column names. Prefix
+                a name with ``-`` to sort in descending order.
+
+        Raises:
+            ValueError: Unknown column, or the bulk data field.
+        """
+        if order_by is None:
+            return []
+        if not isinstance(order_by, (list, tuple)):
+            order_by = [order_by]
+        result = []
+        for col in order_by:
+            direction = "ASC"
+            if col.startswith("-"):
+                col, direction = col[1:], "DESC"
+            self.check_query_column(col)
+            result.append((col, direction))
+        return result
+
+    def generate_order_and_limit(self, order_by=None, limit=None):
+        """Return the ``ORDER BY`` and ``LIMIT`` SQL suffix (or empty string).
+
+        Args:
+            order_by (str, list): As described for ``parse_order_by()``.
+            limit (int): Maximum number of rows to return.
+
+        Raises:
+            ValueError: Invalid column or limit.
+        """
+        sql = ""
+        ordering = self.parse_order_by(order_by)
+        if ordering:
+            sql = " ORDER BY " + ", ".join(["{} {}".format(col, direction)
+                                            for col, direction in ordering])
+        if limit is not None:
+            if int(limit) != limit or limit < 0:
+                raise ValueError("Limit must be a non-negative integer")
+            sql = sql + " LIMIT {}".format(int(limit))
+        return sql
+
+    def get_column_types(self):
+        """Return a dictionary of declared SQLite types, keyed by column.
+
+        Columns which are run through a converter report the type the
+        converter produces, so that all DB versions describe their columns
+        the same way.
+
+        Returns:
+            dict: Column name to declared type (``INT``, ``REAL``, ``TEXT``
+                or ``BLOB``).
+        """
+        db = sqlite3.connect(self.db_file)
+        cur = db.cursor()
+        cur.execute("PRAGMA table_info({})".format(self.table_name))
+        result = {row[1]: row[2].upper() for row in cur.fetchall()}
+        db.close()
+        converter_reference = self.__get_latest_version(self.converters_reference)  # NOQA
+        for col, converter in list(converter_reference.items()):
+            if converter == Utility.format_int_as_latlon:
+                result[col] = "REAL"
+            elif converter == Utility.device_field_parser:
+                result[col] = "TEXT"
+        return result
+
+    def get_field_defaults(self):
+        """Return static defaults for columns missing from this DB version."""
+        return self.__get_latest_version(self.field_defaults)
+
+    def to_parquet(self, file_location, include_bulk=False,
+                   row_group_size=65536, **kwargs):
+        """Write rows from this table to a Parquet file.
+
+        Rows are streamed into the file in row groups of ``row_group_size``
+        rows, so memory use is bounded regardless of table size. Requires
+        ``pyarrow`` (``pip install kismetdb[parquet]``).
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation.
+
+        Args:
+            file_location (str): Path to output Parquet file.
+            include_bulk (bool): Include the bulk data field (packet
+                capture as binary, or JSON as a string).
+            row_group_size (int): Number of rows per row group.
+
+        Returns:
+            int: Number of rows written.
+        """
+        from .parquet import ParquetTableWriter
+        writer = ParquetTableWriter(self, file_location,
+                                    include_bulk=include_bulk,
+                                    row_group_size=row_group_size,
+                                    json_fields=self.parquet_json_fields)
+        if include_bulk:
+            query_columns = list(self.full_query_column_names)
+            column_names = list(self.column_names)
+        else:
+            query_columns = list(self.meta_query_column_names)
+            column_names = [x for x in self.column_names
+                            if x != self.bulk_data_field]
+        for alias, path, _ in self.parquet_json_fields:
+            query_columns.append("{} as {}".format(
+                Utility.generate_json_extract(self.bulk_data_field, path),
+                alias))
+            column_names.append(alias)
+        where, replacements = self.generate_where_clause(kwargs)
+        sql = "SELECT {} FROM {}{}".format(", ".join(query_columns),
+                                           self.table_name, where)
+        writer.open()
+        progress_metrics.add_output(file_location, self.table_name)
+        switch = profiling.get_switch()
+        try:
+            for row in self.yield_rows(column_names, sql, replacements):
+                if switch:
+                    switch("write")
+                writer.write(row)
+        finally:
+            writer.close()
+        return writer.num_rows
+
+    def check_query_column(self, column):
+        """Return None if ``column`` may be used in a query, else raise.
+
+        Column names are interpolated into SQL by several query methods, so
+        they are checked against this abstraction's known columns first. The
+        bulk data field is refused, since it is never useful to sort, group
+        or compare by it.
+
+        Raises:
+            ValueError: Unknown column, or the bulk data field.
+        """
+        if column not in self.column_names or column == self.bulk_data_field:
+            valid = [x for x in self.column_names
+                     if x != self.bulk_data_field]
+            err = "Invalid column {} for table {}. Expected one of {}".format(
+                column, self.table_name, valid)
+            raise ValueError(err)
+        return
+
+    def convert_value(self, column, value):
+        """Return ``value`` converted as this column's converter would.
+
+        Used for values computed in SQL (like ``MAX(lat)``) which bypass
+        the converters registered on the connection. Only converters which
+        preserve ordering and scale (lat/lon) are applied.
+        """
+        converter_reference = self.__get_latest_version(self.converters_reference)  # NOQA
+        converter = converter_reference.get(column)
+        if value is None or converter != Utility.format_int_as_latlon:
+            return value
+        return converter(value)
+
+    def aggregate(self, group_by=None, metrics=None, **kwargs):
+        """Return aggregated values, computed by SQLite with ``GROUP BY``.
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation, and restrict the rows aggregated.
+
+        Args:
+            group_by (str or list): Column(s) to group by. If omitted, one
+                row aggregating the whole (filtered) table is returned.
+            metrics (dict): Output key to metric specification. A
+                specification is ``count``, or ``FUNCTION:COLUMN`` where
+                ``FUNCTION`` is one of ``count``, ``count_distinct``,
+                ``min``, ``max``, ``sum`` or ``avg``. Defaults to
+                ``{"count": "count"}``.
+
+        Returns:
+            list: One dict per group, with the ``group_by`` columns and one
+                key per metric. Ordered by the ``group_by`` columns.
+
+        Example:
+            ``packets.aggregate(group_by="datasource",
+            metrics={"n": "count", "sig": "max:signal"})``
+        """
+        if group_by is None:
+            group_by = []
+        elif not isinstance(group_by, list):
+            group_by = [group_by]
+        if metrics is None:
+            metrics = {"count": "count"}
+        for col in group_by:
+            self.check_query_column(col)
+        metric_names = sorted(metrics.keys())
+        metric_columns = []
+        expressions = list(group_by)
+        for name in metric_names:
+            func, _, col = metrics[name].partition(":")
+            if func not in self.aggregate_functions:
+                err = "Invalid metric {} for {}. Expected one of {}".format(
+                    func, name, self.aggregate_functions)
+                raise ValueError(err)
+            if func == "count" and not col:
+                expressions.append("COUNT(*)")
+                metric_columns.append(None)
+                continue
+            self.check_query_column(col)
+            if func == "count_distinct":
+                expressions.append("COUNT(DISTINCT {})".format(col))
+            else:
+                expressions.append("{}({})".format(func.upper(), col))
+            metric_columns.append(col if func in ["min", "max", "avg"]
+                                  else None)
+        where, replacements = self.generate_where_clause(kwargs)
+        sql = "SELECT {} FROM {}{}".format(", ".join(expressions),
+                                           self.table_name, where)
+        if group_by:
+            sql = sql + " GROUP BY {} ORDER BY {}".format(
+                ", ".join(group_by), ", ".join(group_by))
+        results = []
+        db = self.connect(sql=sql)
+        cur = db.cursor()
+        cur.execute(sql, replacements)
+        for row in cur.fetchall():
+            result = {}
+            for i, col in enumerate(group_by):
+                result[col] = self.convert_value(col, row[i])
+            offset = len(group_by)
+            for i, name in enumerate(metric_names):
+                value = row[offset + i]
+                if metric_columns[i] is not None:
+                    value = self.convert_value(metric_columns[i], value)
+                result[name] = value
+            results.append(result)
+        db.close()
+        return results
+
+    def time_histogram(self, bucket="1s", by=None, as_numpy=False,
+                       **kwargs):
+        """Return row counts per time bucket, computed by SQLite.
+
+        Rows are binned by integer division of their timestamp, so only one
+        row per (bucket, key) pair leaves the database. Only tables with a
+        ``ts_sec`` column support this; buckets shorter than one second also
+        need a ``ts_usec`` column.
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation, and restrict the rows counted.
+
+        Args:
+            bucket (str, int or float): Bucket width, as seconds or a string
+                like ``"100ms"``, ``"1s"``, ``"1m"``, ``"1h"`` or ``"1d"``.
+            by (str): Column to count separately within each bucket, like
+                ``datasource`` or ``header``.
+            as_numpy (bool): Return NumPy arrays instead of a list (requires
+                ``numpy``).
+
+        Returns:
+            list: Tuples of (bucket start in Unix epoch seconds, value of
+                the ``by`` column or ``None``, count), ordered by bucket and
+                key. If ``as_numpy`` is set, a tuple of three arrays (bucket
+                starts, keys, counts) is returned instead.
+
+        Raises:
+            ValueError: Table has no timestamp, or invalid bucket or column.
+        """
+        if "ts_sec" not in self.column_names:
+            err = "Table {} has no ts_sec column".format(self.table_name)
+            raise ValueError(err)
+        if by is not None:
+            self.check_query_column(by)
+        bucket_usecs = Utility.duration_to_usecs(bucket)
+        where, replacements = self.generate_where_clause(kwargs)
+        if bucket_usecs % 1000000 == 0:
+            divisor = bucket_usecs // 1000000
+            timestamp = "ts_sec"
+        elif "ts_usec" in self.column_names:
+            divisor = bucket_usecs
+            timestamp = "(ts_sec * 1000000 + ts_usec)"
+        else:
+            err = ("Table {} has no ts_usec column, so buckets must be a "
+                   "whole number of seconds".format(self.table_name))
+            raise ValueError(err)
+        replacements["kismetdb_bucket"] = divisor
+        key = by if by is not None else "NULL"
+        sql = ("SELECT ({} / :kismetdb_bucket) * :kismetdb_bucket AS bucket, "
+               "{} AS key, COUNT(*) FROM {}{} GROUP BY bucket, key "
+               "ORDER BY bucket, key").format(timestamp, key, self.table_name,
+                                              where)
+        results = []
+        db = self.connect(sql=sql)
+        cur = db.cursor()
+        cur.execute(sql, replacements)
+        for row in cur.fetchall():
+            start = row[0] if divisor != bucket_usecs else row[0] / 1000000.0
+            results.append((start, row[1], row[2]))
+        db.close()
+        if not as_numpy:
+            return results
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("as_numpy requires numpy. Install it with "
+                              "pip install numpy")
+        return (numpy.array([x[0] for x in results]),
+                numpy.array([x[1] for x in results]),
+                numpy.array([x[2] for x in results], dtype=numpy.int64))
+
+    def get_bounds_columns(self):
+        """Return (min lat, min lon, max lat, max lon) column names.
+
+        Tables with a single location per row use the same column for
+        minimum and maximum.
+
+        Raises:
+            ValueError: This table has no location columns in this DB
+                version.
+        """
+        if self.bounds_columns is not None:
+            result = tuple(self.bounds_columns)
+        elif self.location_columns is not None:
+            lat, lon = self.location_columns
+            result = (lat, lon, lat, lon)
+        else:
+            result = ()
+        if not result or [x for x in result if x not in self.column_names]:
+            err = "Table {} has no location columns in DB version {}".format(
+                self.table_name, self.db_version)
+            raise ValueError(err)
+        return result
+
+    def get_spatial_index_table(self):
+        """Return the name of this table's R*Tree in the sidecar index."""
+        return "{}_rtree".format(self.table_name)
+
+    def build_spatial_index(self):
+        """Build (or rebuild) the sidecar R*Tree index for this table.
+
+        The index lives in a separate SQLite file next to the Kismet log
+        (``spatial_index_file``), so the log itself is never modified. It
+        stores each row's bounding box, in the same units as the log (v4
+        logs store integer-encoded coordinates). Rows without a location
+        (0, 0) are left out, as the filters never match them. Once built,
+        the ``bbox`` and ``within_radius`` filters use the index
+        automatically, for as long as the log's size and modification time
+        match those recorded when it was built.
+
+        Returns:
+            int: Number of rows indexed.
+        """
+        min_lat, min_lon, max_lat, max_lon = self.get_bounds_columns()
+        stat = os.stat(self.db_file)
+        rtree = self.get_spatial_index_table()
+        db = sqlite3.connect(self.spatial_index_file)
+        db.execute("CREATE TABLE IF NOT EXISTS kismetdb_spatial_meta "
+                   "(table_name TEXT PRIMARY KEY, source_size INT, "
+                   "source_mtime REAL, db_version INT)")
+        db.execute("DROP TABLE IF EXISTS {}".format(rtree))
+        db.execute("CREATE VIRTUAL TABLE {} USING rtree(id, min_lat, max_lat, "
+                   "min_lon, max_lon)".format(rtree))
+        db.execute("ATTACH DATABASE ? AS kismet", (self.db_file,))
+        cur = db.execute("INSERT INTO {} SELECT rowid, {}, {}, {}, {} FROM "
+                         "kismet.{} WHERE NOT ({} = 0 AND {} = 0)".format(
+                             rtree, min_lat, max_lat, min_lon, max_lon,
+                             self.table_name, min_lat, min_lon))
+        nrows = cur.rowcount
+        db.execute("INSERT OR REPLACE INTO kismetdb_spatial_meta VALUES "
+                   "(?, ?, ?, ?)", (self.table_name, stat.st_size,
+                                    stat.st_mtime, self.db_version))
+        db.commit()
+        db.execute("DETACH DATABASE kismet")
+        db.close()
+        return nrows
+
+    def has_spatial_index(self):
+        """Return True if a current sidecar index exists for this table."""
+        if not os.path.isfile(self.spatial_index_file):
+            return False
+        stat = os.stat(self.db_file)
+        index_stat = os.stat(self.spatial_index_file)
+        key = (stat.st_size, stat.st_mtime, index_stat.st_mtime)
+        if self.spatial_index_state is not None and \
+                self.spatial_index_state[0] == key:
+            return self.spatial_index_state[1]
+        result = False
+        db = sqlite3.connect(self.spatial_index_file)
+        try:
+            row = db.execute("SELECT source_size, source_mtime FROM "
+                             "kismetdb_spatial_meta WHERE table_name = ?",
+                             (self.table_name,)).fetchone()
+            result = row is not None and tuple(row) == (stat.st_size,
+                                                        stat.st_mtime)
+        except sqlite3.DatabaseError:
+            result = False
+        db.close()
+        self.spatial_index_state = (key, result)
+        return result
+
+    def uses_spatial_index(self, sql):
+        """Return True if ``sql`` was compiled to use the sidecar spatial
+        index, which must then be attached to its connection."""
+        return "kismetdb_spatial." in sql
+
+    def stores_latlon_as_integer(self, column):
+        """Return True if ``column`` holds integer-encoded lat/lon (v4)."""
+        converter_reference = self.__get_latest_version(self.converters_reference)  # NOQA
+        return converter_reference.get(column) == Utility.format_int_as_latlon
+
+    def format_spatial_value(self, column, value):
+        """Return a lat/lon value in the units stored for ``column``."""
+        if self.stores_latlon_as_integer(column):
+            return Utility.format_latlon_as_integer(value)
+        return float(value)
+
+    def generate_spatial_sql(self, filter_name, filter_value):
+        """Return tuple with sql and replacements for a spatial filter.
+
+        Args:
+            filter_name (str): ``bbox`` or ``within_radius``.
+            filter_value (tuple): ``(min_lat, min_lon, max_lat, max_lon)``
+                for ``bbox``, or ``(lat, lon, meters)`` for
+                ``within_radius``.
+
+        Returns:
+            tuple: Item 0 contains the SQL partial string. Item 1 contains
+                the replacement dictionary.
+        """
+        min_lat_col, min_lon_col, max_lat_col, max_lon_col = \
+            self.get_bounds_columns()
+        if filter_name == "within_radius":
+            lat, lon, meters = [float(x) for x in filter_value]
+            lat_delta = meters / 111320.0
+            lon_delta = meters / (111320.0 *
+                                  max(math.cos(math.radians(lat)), 1e-6))
+            bbox = (lat - lat_delta, lon - lon_delta,
+                    lat + lat_delta, lon + lon_delta)
+        else:
+            bbox = [float(x) for x in filter_value]
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            err = ("Badly-formatted {}. Expected (min_lat, min_lon, max_lat, "
+                   "max_lon)".format(filter_name))
+            raise ValueError(err)
+        # Each filter gets its own parameter names, so bbox and
+        # within_radius can be combined.
+        names = {x: "{}_{}".format(filter_name, x)
+                 for x in ["min_lat", "min_lon", "max_lat", "max_lon", "lat",
+                           "lon", "meters"]}
+        replacements = {
+            names["min_lat"]: self.format_spatial_value(min_lat_col, bbox[0]),
+            names["min_lon"]: self.format_spatial_value(min_lon_col, bbox[1]),
+            names["max_lat"]: self.format_spatial_value(max_lat_col, bbox[2]),
+            names["max_lon"]: self.format_spatial_value(max_lon_col, bbox[3])}
+        # Rows at (0, 0) have no location, and are left out of the index,
+        # so they are never matched whether or not it is used.
+        parts = ["NOT ({} = 0 AND {} = 0)".format(min_lat_col, min_lon_col),
+                 "{} >= :{}".format(max_lat_col, names["min_lat"]),
+                 "{} <= :{}".format(min_lat_col, names["max_lat"]),
+                 "{} >= :{}".format(max_lon_col, names["min_lon"]),
+                 "{} <= :{}".format(min_lon_col, names["max_lon"])]
+        if self.has_spatial_index():
+            parts.insert(0, (
+                "rowid IN (SELECT id FROM kismetdb_spatial.{rtree} WHERE "
+                "max_lat >= :{min_lat} AND min_lat <= :{max_lat} AND "
+                "max_lon >= :{min_lon} AND min_lon <= :{max_lon})").format(
+                    rtree=self.get_spatial_index_table(), **names))
+        if filter_name == "within_radius":
+            lat_col, lon_col = self.location_columns
+            lat_expr, lon_expr = lat_col, lon_col
+            if self.stores_latlon_as_integer(lat_col):
+                lat_expr = "{} / 100000.0".format(lat_col)
+                lon_expr = "{} / 100000.0".format(lon_col)
+            parts.append("kismetdb_distance({}, {}, :{}, :{}) <= :{}".format(
+                lat_expr, lon_expr, names["lat"], names["lon"],
+                names["meters"]))
+            replacements.update({names["lat"]: lat, names["lon"]: lon,
+                                 names["meters"]: meters})
+        return (" AND ".join(parts), replacements)
+
+    def top_k(self, column, k, by=None, ascending=False, include_bulk=False,
+              **kwargs):
+        """Return the ``k`` rows with the largest values of ``column``.
+
+        Sorting and limiting are done by SQLite. With ``by``, the top ``k``
+        rows are returned for each distinct value of that column, using a
+        ``ROW_NUMBER()`` window where SQLite supports it (3.25 and later)
+        and one limited query per group otherwise. Rows where ``column`` is
+        NULL are ignored.
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation, and restrict the rows considered.
+
+        Args:
+            column (str): Column to rank rows by.
+            k (int): Number of rows to return, per group if ``by`` is set.
+            by (str): Column to group by, for example ``datasource``.
+            ascending (bool): Return the smallest values instead.
+            include_bulk (bool): Include the bulk data field.
+
+        Returns:
+            list: Row dicts, best first. With ``by``, rows are ordered by
+                group, then best first within each group.
+
+        Raises:
+            ValueError: Invalid column or k.
+        """
+        self.check_query_column(column)
+        if by is not None:
+            self.check_query_column(by)
+        if int(k) != k or k < 1:
+            raise ValueError("k must be a positive integer")
+        direction = "ASC" if ascending else "DESC"
+        if include_bulk:
+            column_names = list(self.column_names)
+            query_columns = self.full_query_column_names
+        else:
+            column_names = [x for x in self.column_names
+                            if x != self.bulk_data_field]
+            query_columns = self.meta_query_column_names
+        query_parts, replacements = self.generate_parts_and_replacements(kwargs)  # NOQA
+        query_parts.append("{} IS NOT NULL".format(column))
+        where = " WHERE " + " AND ".join(query_parts)
+        ranking = "{} {}, rowid".format(column, direction)
+        if by is None:
+            sql = "SELECT {} FROM {}{} ORDER BY {} LIMIT {}".format(
+                ", ".join(query_columns), self.table_name, where, ranking,
+                int(k))
+            return self.get_rows(column_names, sql, replacements)
+        if sqlite3.sqlite_version_info >= (3, 25, 0):
+            sql = ("SELECT {} FROM (SELECT {}, ROW_NUMBER() OVER "
+                   "(PARTITION BY {} ORDER BY {}) AS kismetdb_rank FROM {}{}) "
+                   "WHERE kismetdb_rank <= {} "
+                   "ORDER BY {}, kismetdb_rank").format(
+                       ", ".join(query_columns), ", ".join(column_names), by,
+                       ranking, self.table_name, where, int(k), by)
+            return self.get_rows(column_names, sql, replacements)
+        sql = "SELECT DISTINCT {} FROM {}{} ORDER BY {}".format(
+            by, self.table_name, where, by)
+        db = self.connect(sql=sql)
+        groups = [row[0] for row in db.execute(sql, replacements)]
+        db.close()
+        results = []
+        for group in groups:
+            group_replacements = dict(replacements)
+            group_replacements["kismetdb_group"] = group
+            sql = ("SELECT {} FROM {}{} AND {} IS :kismetdb_group "
+                   "ORDER BY {} LIMIT {}").format(
+                       ", ".join(query_columns), self.table_name, where, by,
+                       ranking, int(k))
+            results.extend(self.get_rows(column_names, sql,
+                                         group_replacements))
+        return results
+
+    def get_file_signature(self):
+        """Return a tuple which changes whenever the log file changes.
+
+        This is built from the size and modification time of the log, and
+        of its write-ahead log if Kismet is still writing to it.
+        """
+        signature = []
+        for path in [self.db_file, self.db_file + "-wal"]:
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                signature.extend([stat.st_size, stat.st_mtime])
+        return tuple(signature)
+
+    def get_cached(self, method, column, sql, replacements, compute):
+        """Return a cached ``distinct()`` or ``cardinality()`` result.
+
+        Results are keyed by the compiled SQL and its parameters. ``compute``
+        is called to produce the result if it is not cached, or if the log
+        has changed since it was cached. Queries calling Python predicates
+        are never cached, since their results depend on code the key cannot
+        capture.
+        """
+        if "kismetdb_where_" in sql:
+            return compute()
+        key = (os.path.abspath(self.db_file), self.table_name, method,
+               column, sql, repr(sorted(replacements.items())))
+        signature = self.get_file_signature()
+        cached = self.distinct_cache.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        result = compute()
+        self.distinct_cache.pop(key, None)
+        self.distinct_cache[key] = (signature, result)
+        while len(self.distinct_cache) > self.distinct_cache_size:
+            self.distinct_cache.popitem(last=False)
+        return result
+
+    def distinct(self, column, **kwargs):
+        """Return the distinct values of ``column``, for filter pickers.
+
+        Values are found with ``SELECT DISTINCT`` and cached per file, so
+        repeated calls do not scan the table again until the log changes.
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation, and restrict the rows considered.
+
+        Args:
+            column (str): Column name, for example ``phyname``.
+
+        Returns:
+            list: Sorted distinct values.
+
+        Raises:
+            ValueError: Invalid column.
+        """
+        self.check_query_column(column)
+
+        where, replacements = self.generate_where_clause(kwargs)
+        sql = "SELECT DISTINCT {} FROM {}{} ORDER BY {}".format(
+            column, self.table_name, where, column)
+
+        def compute():
+            db = self.connect(sql=sql)
+            cur = db.cursor()
+            cur.execute(sql, replacements)
+            result = [self.convert_value(column, row[0])
+                      for row in cur.fetchall()]
+            db.close()
+            return result
+        return list(self.get_cached("distinct", column, sql, replacements,
+                                    compute))
+
+    def cardinality(self, column, **kwargs):
+        """Return the number of distinct values of ``column``.
+
+        Counted with ``COUNT(DISTINCT)`` (NULL is not counted) and cached
+        like ``distinct()``.
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation, and restrict the rows considered.
+
+        Args:
+            column (str): Column name.
+
+        Returns:
+            int: Number of distinct non-NULL values.
+
+        Raises:
+            ValueError: Invalid column.
+        """
+        self.check_query_column(column)
+
+        where, replacements = self.generate_where_clause(kwargs)
+        sql = "SELECT COUNT(DISTINCT {}) FROM {}{}".format(
+            column, self.table_name, where)
+
+        def compute():
+            db = self.connect(sql=sql)
+            cur = db.cursor()
+            cur.execute(sql, replacements)
+            result = cur.fetchone()[0]
+            db.close()
+            return result
+        return self.get_cached("cardinality", column, sql, replacements,
+                               compute)
+
+    def aggregate_tiles(self, zoom, metric="count", as_numpy=False,
+                        **kwargs):
+        """Return per-tile counts or signal maxima for a map overlay.
+
+        Rows are binned into slippy-map (``z/x/y``) tiles at ``zoom`` by
+        SQLite, in one pass over the table, using each row's location
+        (devices use their average location). Rows without a location are
+        ignored.
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation, and restrict the rows binned.
+
+        Args:
+            zoom (int): Tile zoom level, 0 to 30.
+            metric (str): ``count`` for the number of rows per tile, or
+                ``max_signal`` for the strongest signal seen in each tile.
+            as_numpy (bool): Return NumPy arrays instead of a list (requires
+                ``numpy``).
+
+        Returns:
+            list: Tuples of (tile x, tile y, value), ordered by x and y. If
+                ``as_numpy`` is set, a tuple of three arrays is returned
+                instead. ``Utility.tile_bounds()`` converts a tile back to
+                a bounding box.
+
+        Raises:
+            ValueError: Table has no location or signal column, or invalid
+                zoom or metric.
+        """
+        if self.location_columns is None or \
+                [x for x in self.location_columns
+                 if x not in self.column_names]:
+            err = "Table {} has no location columns in DB version {}".format(
+                self.table_name, self.db_version)
+            raise ValueError(err)
+        if int(zoom) != zoom or not 0 <= zoom <= 30:
+            raise ValueError("Zoom must be an integer from 0 to 30")
+        if metric == "count":
+            value = "COUNT(*)"
+        elif metric == "max_signal" and self.signal_column is not None:
+            value = "MAX({})".format(self.signal_column)
+        else:
+            err = "Invalid metric {} for table {}".format(metric,
+                                                          self.table_name)
+            raise ValueError(err)
+        lat_col, lon_col = self.location_columns
+        lat_expr, lon_expr = lat_col, lon_col
+        if self.stores_latlon_as_integer(lat_col):
+            lat_expr = "{} / 100000.0".format(lat_col)
+            lon_expr = "{} / 100000.0".format(lon_col)
+        query_parts, replacements = self.generate_parts_and_replacements(kwargs)  # NOQA
+        query_parts.append("NOT ({} = 0 AND {} = 0)".format(lat_col, lon_col))
+        replacements["kismetdb_zoom"] = int(zoom)
+        sql = ("SELECT kismetdb_tile_x({}, :kismetdb_zoom) AS tile_x, "
+               "kismetdb_tile_y({}, :kismetdb_zoom) AS tile_y, {} FROM {} "
+               "WHERE {} GROUP BY tile_x, tile_y "
+               "ORDER BY tile_x, tile_y").format(lon_expr, lat_expr, value,
+                                                 self.table_name,
+                                                 " AND ".join(query_parts))
+        db = self.connect(sql=sql)
+        cur = db.cursor()
+        cur.execute(sql, replacements)
+        results = [tuple(row) for row in cur.fetchall()]
+        db.close()
+        if not as_numpy:
+            return results
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("as_numpy requires numpy. Install it with "
+                              "pip install numpy")
+        return (numpy.array([x[0] for x in results], dtype=numpy.int64),
+                numpy.array([x[1] for x in results], dtype=numpy.int64),
+                numpy.array([x[2] for x in results]))
+
+    def count(self, **kwargs):
+        """Return the number of rows matching the filters.
+
+        The count is done by SQLite, without fetching any rows. Keyword
+        arguments are described above, near the beginning of the class
+        documentation.
+
+        Returns:
+            int: Number of matching rows.
+        """
+        where, replacements = self.generate_where_clause(kwargs)
+        sql = "SELECT COUNT(*) FROM {}{}".format(self.table_name, where)
+        db = self.connect(sql=sql)
+        cur = db.cursor()
+        cur.execute(sql, replacements)
+        result = cur.fetchone()[0]
+        db.close()
+        return result
+
+    def exists(self, **kwargs):
+        """Return True if at least one row matches the filters.
+
+        SQLite stops at the first matching row. Keyword arguments are
+        described above, near the beginning of the class documentation.
+
+        Returns:
+            bool: True if a matching row exists.
+        """
+        where, replacements = self.generate_where_clause(kwargs)
+        sql = "SELECT 1 FROM {}{} LIMIT 1".format(self.table_name, where)
+        db = self.connect(sql=sql)
+        cur = db.cursor()
+        cur.execute(sql, replacements)
+        result = cur.fetchone() is not None
+        db.close()
+        return result
+
+    def estimated_count(self):
+        """Return an estimate of the number of rows in the table.
+
+        If the log has been analyzed (``ANALYZE``), the row count recorded
+        in ``sqlite_stat1`` is used. Otherwise the largest ``rowid`` is
+        used, which SQLite finds without scanning the table and which
+        overestimates only if rows have been deleted.
+
+        Returns:
+            int: Estimated number of rows.
+        """
+        db = sqlite3.connect(self.db_file)
+        cur = db.cursor()
+        result = None
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                    "AND name = 'sqlite_stat1'")
+        if cur.fetchone() is not None:
+            cur.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? "
+                        "AND idx IS NULL", (self.table_name,))
+            row = cur.fetchone()
+            if row is None:
+                cur.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ?",
+                            (self.table_name,))
+                row = cur.fetchone()
+            if row is not None:
+                result = int(row[0].split()[0])
+        if result is None:
+            cur.execute("SELECT MAX(rowid) FROM {}".format(self.table_name))
+            result = cur.fetchone()[0] or 0
+        db.close()
+        return result
+
+    def get_all(self, order_by=None, limit=None, **kwargs):
         """Get all objects represented by this class from Kismet DB.
 
         Keyword arguments are described above, near the beginning of
         the class documentation.
 
+        Args:
+            order_by (str, list): Column name, or list of column names, to
+                sort by. Prefix a name with ``-`` to sort in descending order.
+            limit (int): Maximum number of rows to return.
+
         Returns:
             list: List of each json object from all rows returned from query.
         """
@@ -158,22 +1093,27 @@ class BaseInterface(object):
                                          self.table_name)
         if query_parts:
             sql = sql + " WHERE " + " AND ".join(query_parts)
+        sql = sql + self.generate_order_and_limit(order_by, limit)
         return self.get_rows(self.column_names, sql, replacements)
 
-    def get_meta(self, **kwargs):
+    def get_meta(self, order_by=None, limit=None, **kwargs):
         """Get metadata columns from DB, excluding bulk data columns.
 
         Keyword arguments are described above, near the beginning of
         the class documentation.
 
+        Args:
+            order_by (str, list): Column name, or list of column names, to
+                sort by. Prefix a name with ``-`` to sort in descending order.
+            limit (int): Maximum number of rows to return.
+
         Returns:
             list: List of each json object from all rows returned from query.
         """
 
         query_parts = []
         replacements = {}
-        columns = list(self.column_names)
-        columns.remove(self.bulk_data_field)
+        columns = [x for x in self.column_names if x != self.bulk_data_field]
 
         if kwargs:
             query_parts, replacements = self.generate_parts_and_replacements(kwargs)  # NOQA
@@ -185,14 +1125,20 @@ class BaseInterface(object):
                                          self.table_name)
         if query_parts:
             sql = sql + " WHERE " + " AND ".join(query_parts)
+        sql = sql + self.generate_order_and_limit(order_by, limit)
         return self.get_rows(columns, sql, replacements)
 
-    def yield_all(self, **kwargs):
+    def yield_all(self, order_by=None, limit=None, **kwargs):
         """Get all objects represented by this class from Kismet DB.
 
         Yields one row at a time. Keyword arguments are described above,
         near the beginning of the class documentation.
 
+        Args:
+            order_by (str, list): Column name, or list of column names, to
+                sort by. Prefix a name with ``-`` to sort in descending order.
+            limit (int): Maximum number of rows to return.
+
         Yields:
             dict: Dict representing one row from query.
         """
@@ -207,23 +1153,28 @@ class BaseInterface(object):
                                          self.table_name)
         if query_parts:
             sql = sql + " WHERE " + " AND ".join(query_parts)
+        sql = sql + self.generate_order_and_limit(order_by, limit)
         for row in self.yield_rows(self.column_names, sql, replacements):
             yield row
 
-    def yield_meta(self, **kwargs):
+    def yield_meta(self, order_by=None, limit=None, **kwargs):
         """Yield metadata from DB, excluding bulk data columns.
 
         Yields one row at a time. Keyword arguments are described above, near
         the beginning of the class documentation.
 
+        Args:
+            order_by (str, list): Column name, or list of column names, to
+                sort by. Prefix a name with ``-`` to sort in descending order.
+            limit (int): Maximum number of rows to return.
+
         Returns:
             dict: Dict representing one row from query.
         """
 
         query_parts = []
         replacements = {}
-        columns = list(self.column_names)
-        columns.remove(self.bulk_data_field)
+        columns = [x for x in self.column_names if x != self.bulk_data_field]
 
         if kwargs:
             query_parts, replacements = self.generate_parts_and_replacements(kwargs)  # NOQA
@@ -235,9 +1186,122 @@ class BaseInterface(object):
                                          self.table_name)
         if query_parts:
             sql = sql + " WHERE " + " AND ".join(query_parts)
+        sql = sql + self.generate_order_and_limit(order_by, limit)
         for row in self.yield_rows(columns, sql, replacements):
             yield row
 
+    def query(self, include_bulk=False, order_by=None, limit=None,
+              **kwargs):
+        """Return a prepared ``Query``, which can be run repeatedly.
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation. Unlike other methods, unknown keyword
+        arguments raise ``ValueError``.
+
+        Args:
+            include_bulk (bool): Include the bulk data field.
+            order_by (str, list): As described for ``get_all()``.
+            limit (int): Maximum number of rows to return.
+
+        Returns:
+            kismetdb.Query: Compiled query.
+        """
+        return Query(self, include_bulk=include_bulk, order_by=order_by,
+                     limit=limit, **kwargs)
+
+    def page(self, size, cursor=None, order_by=None, include_bulk=False,
+             **kwargs):
+        """Return one page of rows, and a cursor for the next page.
+
+        Pages are fetched by keyset: each page resumes directly after the
+        sort key (plus ``rowid``, as a tie-breaker) of the last row of the
+        previous page, so fetching a deep page costs the same as fetching
+        the first one. For packets, ``order_by=["ts_sec", "ts_usec"]`` pages
+        through a log in time order.
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation. Use the same filters and ``order_by`` for
+        every page.
+
+        Args:
+            size (int): Maximum number of rows in the page.
+            cursor (str): Cursor returned with the previous page, or None
+                for the first page.
+            order_by (str, list): As described for ``get_all()``. Defaults
+                to insertion order.
+            include_bulk (bool): Include the bulk data field.
+
+        Returns:
+            tuple: List of row dicts, and the cursor for the next page
+                (None if this is the last page).
+
+        Raises:
+            ValueError: Invalid size, column or cursor.
+        """
+        if int(size) != size or size < 1:
+            raise ValueError("Page size must be a positive integer")
+        ordering = self.parse_order_by(order_by)
+        last_direction = ordering[-1][1] if ordering else "ASC"
+        ordering.append(("rowid", last_direction))
+        if include_bulk:
+            column_names = list(self.column_names)
+            query_columns = list(self.full_query_column_names)
+        else:
+            column_names = [x for x in self.column_names
+                            if x != self.bulk_data_field]
+            query_columns = list(self.meta_query_column_names)
+        key_names = []
+        for i, (col, _) in enumerate(ordering):
+            key_names.append("kismetdb_key{}".format(i))
+            query_columns.append("{} AS kismetdb_key{}".format(col, i))
+        query_parts, replacements = self.generate_parts_and_replacements(kwargs)  # NOQA
+        if cursor is not None:
+            keyset_sql, keyset_replacements = self.generate_keyset_sql(
+                ordering, cursor)
+            query_parts.append(keyset_sql)
+            replacements.update(keyset_replacements)
+        sql = "SELECT {} FROM {}".format(", ".join(query_columns),
+                                         self.table_name)
+        if query_parts:
+            sql = sql + " WHERE " + " AND ".join(query_parts)
+        sql = sql + " ORDER BY {} LIMIT {}".format(
+            ", ".join(["{} {}".format(col, direction)
+                       for col, direction in ordering]), int(size) + 1)
+        rows = self.get_rows(column_names + key_names, sql, replacements)
+        keys = [[row.pop(x) for x in key_names] for row in rows]
+        if len(rows) <= size:
+            return (rows, None)
+        token = json.dumps({"order": ordering, "key": keys[size - 1]})
+        token = base64.urlsafe_b64encode(token.encode("utf-8"))
+        return (rows[:size], token.decode("ascii"))
+
+    def generate_keyset_sql(self, ordering, cursor):
+        """Return tuple with SQL partial and replacements resuming after
+        ``cursor``, for rows sorted by ``ordering``.
+
+        Raises:
+            ValueError: Cursor is malformed, or was made for another order.
+        """
+        try:
+            token = json.loads(base64.urlsafe_b64decode(
+                cursor.encode("ascii")).decode("utf-8"))
+            token_ordering = [tuple(x) for x in token["order"]]
+            key = token["key"]
+        except (TypeError, ValueError, KeyError, AttributeError):
+            raise ValueError("Invalid page cursor: {}".format(cursor))
+        if token_ordering != ordering or len(key) != len(ordering):
+            raise ValueError("Page cursor does not match order_by")
+        alternatives = []
+        replacements = {}
+        for i, (col, direction) in enumerate(ordering):
+            parts = ["{} = :kismetdb_cursor{}".format(ordering[j][0], j)
+                     for j in range(i)]
+            parts.append("{} {} :kismetdb_cursor{}".format(
+                col, ">" if direction == "ASC" else "<", i))
+            alternatives.append("( " + " AND ".join(parts) + " )")
+            replacements["kismetdb_cursor{}".format(i)] = key[i]
+        return ("( " + " OR ".join(alternatives) + " )", replacements)
+
     @classmethod
     def check_db_exists(cls, log_file):
         """Return None if able to open DB file, otherwise raise exception.
@@ -305,9 +1369,62 @@ class BaseInterface(object):
             raise ValueError(err)
         return
 
+    def connect(self, sql_functions=None, sql=None):
+        """Return a connection to the Kismet DB, ready for querying.
+
+        Rows are returned as ``sqlite3.Row`` objects, and this abstraction's
+        converters are registered so that columns aliased as
+        ``col as "col [col]"`` are converted.
+
+        Args:
+            sql_functions (dict): SQL functions to register as well as the
+                recent predicates in ``sql_functions``, as returned by
+                ``get_sql_functions()``.
+            sql (str): Statement the connection will run. The sidecar
+                spatial index is attached if it uses the index. Without
+                it, the index is attached if it is current.
+
+        Returns:
+            sqlite3.Connection: Open connection. The caller closes it.
+        """
+        db = sqlite3.connect(self.db_file, detect_types=sqlite3.PARSE_COLNAMES)
+        db.row_factory = sqlite3.Row
+        converter_reference = self.__get_latest_version(self.converters_reference)  # NOQA
+        for field_name, converter in list(converter_reference.items()):  # NOQA
+            if profiling.recorders:
+                converter = profiling.wrap_converter(converter)
+            sqlite3.register_converter(field_name, converter)
+        db.create_function("kismetdb_distance", 4, Utility.distance_meters)
+        db.create_function("kismetdb_tile_x", 2, Utility.lon_to_tile_x)
+        db.create_function("kismetdb_tile_y", 2, Utility.lat_to_tile_y)
+        functions = {x[0]: x[1:] for x in list(self.sql_functions.values())}
+        functions.update(sql_functions or {})
+        for name, (num_args, func) in list(functions.items()):
+            db.create_function(name, num_args, func)
+        if sql is None:
+            attach_index = self.has_spatial_index()
+        else:
+            attach_index = self.uses_spatial_index(sql)
+        if attach_index:
+            db.execute("ATTACH DATABASE ? AS kismetdb_spatial",
+                       (self.spatial_index_file,))
+        return db
+
+    def get_result_cache(self, sql):
+        """Return the result cache to use for ``sql``, or None.
+
+        Queries calling Python predicates are never cached, since their
+        results depend on code the cache key cannot capture.
+        """
+        if "kismetdb_where_" in sql:
+            return None
+        return self.result_cache
+
     def get_rows(self, column_names, sql, replacements):
         """Return rows from query results as a list of dictionary objects.
 
+        If ``result_cache`` is set, results are read from and stored in it.
+
         Args:
             column_names (list): List of column names. Used in constructing
                 row dictionary (these are the dictionary keys).
@@ -317,27 +1434,90 @@ class BaseInterface(object):
         Returns:
             list: List of dictionary items.
         """
+        result_cache = self.get_result_cache(sql)
+        if result_cache is not None:
+            key = result_cache.make_key(self, column_names, sql, replacements)
+            cached = result_cache.read(key)
+            if cached is not None:
+                return list(cached)
         # static_fields = self.field_defaults[self.db_version]
         static_fields = self.__get_latest_version(self.field_defaults)
 
+        switch = profiling.get_switch()
+        if switch:
+            switch("query")
+        counter = progress_metrics.get_table_metrics(self)
         results = []
-        db = sqlite3.connect(self.db_file, detect_types=sqlite3.PARSE_COLNAMES)
-        db.row_factory = sqlite3.Row
-        converter_reference = self.__get_latest_version(self.converters_reference)
-        for field_name, converter in list(converter_reference.items()):  # NOQA
-            sqlite3.register_converter(field_name, converter)
-        cur = db.cursor()
-        cur.execute(sql, replacements)
-        for row in cur.fetchall():
+        db = self.connect(sql=sql)
+        try:
+            cur = db.cursor()
+            cur.execute(sql, replacements)
+            fetched = cur.fetchall()
+        except Exception:
+            if counter:
+                counter.errors += 1
+            raise
+        finally:
+            db.close()
+        if switch:
+            switch("decode")
+        for row in fetched:
             result = {x: row[x] for x in column_names}
             result.update(static_fields)
             results.append(result.copy())  # NOQA
-        db.close()
+        if counter and results:
+            counter.rows += len(results)
+            counter.last_row = results[-1]
+        if result_cache is not None:
+            result_cache.store(key, results)
         return results
 
+    def query_rows(self, column_names, sql, replacements):
+        """Yield rows from query results, always querying the DB.
+
+        Args:
+            column_names (list): List of column names. Used in constructing
+                row dictionary (these are the dictionary keys).
+            sql (str): SQL statement.
+            replacements (dict): Replacements for SQL query.
+
+        Yields:
+            dict: Dictionary object representing one row in result of SQL
+                query.
+        """
+        static_fields = self.__get_latest_version(self.field_defaults)
+        switch = profiling.get_switch()
+        if switch:
+            switch("query")
+        counter = progress_metrics.get_table_metrics(self)
+        db = self.connect(sql=sql)
+        try:
+            cur = db.cursor()
+            cur.execute(sql, replacements)
+            for row in cur:
+                if switch:
+                    switch("decode")
+                result = {x: row[x] for x in column_names}
+                result.update(static_fields)
+                if counter:
+                    counter.rows += 1
+                    counter.last_row = result
+                yield result
+                if switch:
+                    switch("query")
+        except Exception:
+            if counter:
+                counter.errors += 1
+            raise
+        finally:
+            db.close()
+
     def yield_rows(self, column_names, sql, replacements):
         """Yield rows from query results as a list of dictionary objects.
 
+        If ``result_cache`` is set, cached rows are streamed from it, and
+        rows from the DB are stored in it as they are yielded.
+
         Args:
             column_names (list): List of column names. Used in constructing
                 row dictionary (these are the dictionary keys).
@@ -348,27 +1528,18 @@ class BaseInterface(object):
             dict: Dictionary object representing one row in result of SQL
                 query.
         """
-        #static_fields = self.field_defaults[self.db_version]
-        static_fields = self.__get_latest_version(self.field_defaults)
-        db = sqlite3.connect(self.db_file, detect_types=sqlite3.PARSE_COLNAMES)
-        db.row_factory = sqlite3.Row
-        converter_reference = self.__get_latest_version(self.converters_reference)
-        for field_name, converter in list(converter_reference.items()):  # NOQA
-            sqlite3.register_converter(field_name, converter)
-        cur = db.cursor()
-        cur.execute(sql, replacements)
-        moar_rows = True
-        while moar_rows:
-            try:
-                row = cur.fetchone()
-                if row is None:
-                    moar_rows = False
-                else:
-                    result = {x: row[x] for x in column_names}
-                    result.update(static_fields)
-                    yield result.copy()  # NOQA
-            except KeyboardInterrupt:
-                moar_rows = False
-                print("Caught keyboard interrupt, exiting gracefully!")
-        db.close()
+        rows = self.query_rows(column_names, sql, replacements)
+        result_cache = self.get_result_cache(sql)
+        if result_cache is not None:
+            key = result_cache.make_key(self, column_names, sql, replacements)
+            cached = result_cache.read(key)
+            if cached is None:
+                rows = result_cache.write(key, rows)
+            else:
+                rows = cached
+        try:
+            for row in rows:
+                yield row
+        except KeyboardInterrupt:
+            print("Caught keyboard interrupt, exiting gracefully!")
         return
@@ -28,6 +28,13 @@ class DataPackets(BaseInterface):
         devmac (str or list): Exact match against device mac.
         datasource (str or list): Exact match against datasource UUID.
         type (str or list): Exact match against reported data type
+        bbox (tuple): Match packets located within
+            (min_lat, min_lon, max_lat, max_lon).
+        within_radius (tuple): Match packets located within
+            (lat, lon, meters).
+        where (Expression, callable): Match packets for which this
+            expression (see ``kismetdb.F``) or Python predicate (see
+            ``kismetdb.predicate()``) is true.
 
     """
 
@@ -62,6 +69,7 @@ class DataPackets(BaseInterface):
                         8: ["ts_sec", "ts_usec", "phyname", "devmac",
                             "lat", "lon", "alt", "speed", "heading",
                             "datasource", "type", "json"]}
+    location_columns = ("lat", "lon")
     valid_kwargs = {"ts_sec_lt": Utility.generate_single_tstamp_secs_lt,
                     "ts_sec_gt": Utility.generate_single_tstamp_secs_gt,
                     "phyname": Utility.generate_multi_string_sql_eq,
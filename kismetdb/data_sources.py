@@ -18,6 +18,9 @@ class DataSources(BaseInterface):
         definition (str, list): Data source definition.
         name (str, list): Name of data source.
         interface (str, list): Interface associated with data source.
+        where (Expression, callable): Match data sources for which this
+            expression (see ``kismetdb.F``) or Python predicate (see
+            ``kismetdb.predicate()``) is true.
     """
 
     table_name = "datasources"
@@ -0,0 +1,178 @@
+"""LRU cache of device records, for repeated lookups by devkey or MAC."""
+import collections
+import json
+import time
+
+from .devices import Devices
+
+
+class DeviceCache(object):
+    """Look up devices by devkey or MAC address, caching recent results.
+
+    Each cached record is the row returned by ``Devices.get_all()``, with
+    the ``device`` field already parsed from JSON into a dict, so a cache
+    hit costs neither a query nor a JSON parse. Records are evicted least
+    recently used first, when either ``max_devices`` or ``max_bytes`` (the
+    size of the cached JSON) is exceeded.
+
+    If Kismet is still writing to the log, the cache is emptied whenever
+    the latest ``last_time`` in the devices table advances. This is only
+    checked after the log file has changed on disk, and lookups look at the
+    file at most once every ``check_interval`` seconds, so a hit stays a
+    dictionary lookup. Call ``check_watermark()`` to check immediately.
+
+    Args:
+        file_location (str): Path to Kismet log file.
+        max_devices (int): Maximum number of cached devices.
+        max_bytes (int): Maximum total size of cached device JSON.
+        check_interval (float): Minimum seconds between checks for changes
+            to the log during lookups. Use 0 to check on every lookup, or
+            None to only check when ``check_watermark()`` is called.
+
+    Attributes:
+        devices (kismetdb.Devices): Abstraction used for queries.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups which queried the log.
+        size_bytes (int): Total size of cached device JSON.
+    """
+
+    def __init__(self, file_location, max_devices=1024,
+                 max_bytes=64 * 1024 * 1024, check_interval=1.0):
+        self.devices = Devices(file_location)
+        self.max_devices = int(max_devices)
+        self.max_bytes = int(max_bytes)
+        self.entries = collections.OrderedDict()
+        self.devmac_index = {}
+        self.missing = set()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.check_interval = check_interval
+        self.next_check = None
+        self.file_signature = self.devices.get_file_signature()
+        self.watermark = self.get_watermark()
+        self.schedule_check()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_watermark(self):
+        """Return the latest ``last_time`` in the devices table."""
+        db = self.devices.connect()
+        row = db.execute("SELECT MAX(last_time) FROM devices").fetchone()
+        db.close()
+        return row[0]
+
+    def schedule_check(self):
+        """Set the time of the next check for changes during lookups."""
+        if self.check_interval is not None:
+            self.next_check = time.time() + self.check_interval
+
+    def check_watermark(self):
+        """Empty the cache if devices have been updated since it was filled.
+
+        Returns:
+            bool: True if the cache was emptied.
+        """
+        self.schedule_check()
+        signature = self.devices.get_file_signature()
+        if signature == self.file_signature:
+            return False
+        self.file_signature = signature
+        watermark = self.get_watermark()
+        if watermark == self.watermark:
+            return False
+        self.watermark = watermark
+        self.invalidate()
+        return True
+
+    def invalidate(self):
+        """Empty the cache."""
+        self.entries.clear()
+        self.devmac_index.clear()
+        self.missing.clear()
+        self.size_bytes = 0
+
+    def add(self, row):
+        """Add a row from ``Devices.get_all()`` to the cache, and return the
+        cached record."""
+        raw = row["device"]
+        record = dict(row)
+        record["device"] = json.loads(raw)
+        devkey = record["devkey"]
+        if devkey in self.entries:
+            self.remove(devkey)
+        self.entries[devkey] = (record, len(raw))
+        self.devmac_index[record["devmac"]] = devkey
+        self.missing.discard(("devkey", devkey))
+        self.missing.discard(("devmac", record["devmac"]))
+        self.size_bytes += len(raw)
+        while len(self.entries) > self.max_devices or \
+                (self.size_bytes > self.max_bytes and len(self.entries) > 1):
+            self.remove(next(iter(self.entries)))
+        return record
+
+    def remove(self, devkey):
+        """Remove one device from the cache."""
+        record, size = self.entries.pop(devkey)
+        if self.devmac_index.get(record["devmac"]) == devkey:
+            del self.devmac_index[record["devmac"]]
+        self.size_bytes -= size
+
+    def warm(self, devkeys=None, devmacs=None):
+        """Load many devices into the cache with a single query.
+
+        Args:
+            devkeys (list): Devkeys to load.
+            devmacs (list): Device MAC addresses to load.
+
+        Returns:
+            int: Number of devices loaded.
+        """
+        self.check_watermark()
+        count = 0
+        for column, values in [("devkey", devkeys), ("devmac", devmacs)]:
+            if not values:
+                continue
+            for row in self.devices.yield_all(**{column: list(values)}):
+                self.add(row)
+                count += 1
+        return count
+
+    def get(self, devkey=None, devmac=None):
+        """Return the device record for a devkey or MAC address.
+
+        Exactly one of ``devkey`` or ``devmac`` must be given. Devices which
+        are not in the log are remembered too, until the cache is emptied.
+
+        Returns:
+            dict: Device record, with ``device`` parsed into a dict, or
+                None if the device is not in the log.
+
+        Raises:
+            ValueError: Neither or both of ``devkey`` and ``devmac`` given.
+        """
+        if (devkey is None) == (devmac is None):
+            raise ValueError("Specify exactly one of devkey or devmac")
+        if self.next_check is not None and time.time() >= self.next_check:
+            self.check_watermark()
+        if devkey is None:
+            column, value = "devmac", devmac
+            devkey = self.devmac_index.get(devmac)
+        else:
+            column, value = "devkey", devkey
+        if devkey in self.entries:
+            self.entries[devkey] = self.entries.pop(devkey)
+            self.hits += 1
+            return self.entries[devkey][0]
+        if (column, value) in self.missing:
+            self.hits += 1
+            return None
+        self.misses += 1
+        rows = self.devices.get_all(**{column: value})
+        if not rows:
+            if len(self.missing) >= self.max_devices:
+                self.missing.clear()
+            self.missing.add((column, value))
+            return None
+        return self.add(rows[0])
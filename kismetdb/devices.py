@@ -36,6 +36,13 @@ class Devices(BaseInterface):
             many bytes of data (converted to int).
         bytes_data_lt (str, int): Match devices where we've seen at most this
             many bytes of data (converted to int).
+        bbox (tuple): Match devices whose bounding box intersects
+            (min_lat, min_lon, max_lat, max_lon).
+        within_radius (tuple): Match devices whose average location is
+            within (lat, lon, meters).
+        where (Expression, callable): Match devices for which this
+            expression (see ``kismetdb.F``) or Python predicate (see
+            ``kismetdb.predicate()``) is true.
 
     """
 
@@ -77,6 +84,9 @@ class Devices(BaseInterface):
                             "devmac", "strongest_signal", "min_lat", "min_lon",
                             "max_lat", "max_lon", "avg_lat", "avg_lon",
                             "bytes_data", "type", "device"]}
+    location_columns = ("avg_lat", "avg_lon")
+    bounds_columns = ("min_lat", "min_lon", "max_lat", "max_lon")
+    signal_column = "strongest_signal"
     valid_kwargs = {"first_time_lt": Utility.generate_single_tstamp_secs_lt,
                     "first_time_gt": Utility.generate_single_tstamp_secs_gt,
                     "last_time_lt": Utility.generate_single_tstamp_secs_lt,
@@ -89,3 +99,75 @@ class Devices(BaseInterface):
                     "strongest_signal_gt": Utility.generate_single_int_sql_gt,
                     "bytes_data_lt": Utility.generate_single_int_sql_lt,
                     "bytes_data_gt": Utility.generate_single_int_sql_gt}
+    location_json_paths = {"avg": ("kismet.device.base.location",
+                                   "kismet.common.location.avg_loc"),
+                           "strongest": ("kismet.device.base.signal",
+                                         "kismet.common.signal.peak_loc")}
+    location_folder_columns = ["phyname", "type"]
+    parquet_json_fields = [
+        ("name", ("kismet.device.base.name",), "TEXT"),
+        ("commonname", ("kismet.device.base.commonname",), "TEXT"),
+        ("manuf", ("kismet.device.base.manuf",), "TEXT"),
+        ("channel", ("kismet.device.base.channel",), "TEXT"),
+        ("packets_total", ("kismet.device.base.packets.total",), "INT"),
+        ("last_beaconed_ssid",
+         ("dot11.device", "dot11.device.last_beaconed_ssid"), "TEXT")]
+
+    def yield_locations(self, strongest_point=False, include_ssids=False,
+                        folder_by=None, **kwargs):
+        """Yield device locations, extracting only the needed JSON fields.
+
+        Rather than returning (and parsing) the whole ``device`` blob, the
+        location, name and SSID fields are pulled out by SQLite with
+        ``json_extract()``. This is what the KML exporter uses.
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation.
+
+        Args:
+            strongest_point (bool): Use the location of the strongest
+                signal instead of the average location.
+            include_ssids (bool): Also return the advertised SSID map as a
+                JSON string, under the ``advertised_ssid_map`` key.
+            folder_by (str): Order results by ``phyname`` or ``type`` so
+                they can be grouped into folders while streaming.
+
+        Yields:
+            dict: Dict with ``devkey``, ``devmac``, ``phyname``, ``type``,
+                ``name``, ``last_beaconed_ssid``, ``lat``, ``lon`` and
+                ``alt`` keys. Location values are ``None`` when the device
+                has no location.
+        """
+        if folder_by is not None and \
+                folder_by not in self.location_folder_columns:
+            err = "folder_by must be one of {}".format(
+                self.location_folder_columns)
+            raise ValueError(err)
+        if strongest_point:
+            loc_path = self.location_json_paths["strongest"]
+        else:
+            loc_path = self.location_json_paths["avg"]
+        extracts = [("name", ("kismet.device.base.name",)),
+                    ("last_beaconed_ssid",
+                     ("dot11.device", "dot11.device.last_beaconed_ssid")),
+                    ("lat", loc_path + ("kismet.common.location.lat",)),
+                    ("lon", loc_path + ("kismet.common.location.lon",)),
+                    ("alt", loc_path + ("kismet.common.location.alt",))]
+        if include_ssids:
+            extracts.append(("advertised_ssid_map",
+                             ("dot11.device",
+                              "dot11.device.advertised_ssid_map")))
+        column_names = ["devkey", "devmac", "phyname", "type"]
+        sql_columns = list(column_names)
+        for alias, path in extracts:
+            sql_columns.append("{} as {}".format(
+                Utility.generate_json_extract(self.bulk_data_field, path),
+                alias))
+            column_names.append(alias)
+        where, replacements = self.generate_where_clause(kwargs)
+        sql = "SELECT {} FROM {}{}".format(", ".join(sql_columns),
+                                           self.table_name, where)
+        if folder_by is not None:
+            sql = sql + " ORDER BY {}".format(folder_by)
+        for row in self.yield_rows(column_names, sql, replacements):
+            yield row
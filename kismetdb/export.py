@@ -0,0 +1,409 @@
+"""Single-pass export of Kismet DB tables to multiple outputs."""
+import base64
+import csv
+import json
+import struct
+import sys
+
+from . import metrics
+from . import profiling
+from .alerts import Alerts
+from .data_packets import DataPackets
+from .data_sources import DataSources
+from .devices import Devices
+from .kml import KMLWriter
+from .messages import Messages
+from .packets import Packets
+from .snapshots import Snapshots
+
+
+TABLE_ABSTRACTIONS = {x.table_name: x for x in [Alerts, DataPackets,
+                                                 DataSources, Devices,
+                                                 Messages, Packets,
+                                                 Snapshots]}
+
+
+class Sink(object):
+    """Base class for export outputs.
+
+    A sink receives rows from exactly one table. Rows can be narrowed per
+    sink, independently of the SQL filters used for the table scan, which
+    lets one scan feed differently-filtered outputs.
+
+    Args:
+        table_name (str): Name of the table this sink consumes.
+        file_location (str): Path to output file.
+        match (dict): Only accept rows where each key (column name) equals
+            the value, or one of the values if a list is given. Values are
+            compared as strings, so ``{"dlt": "127"}`` (as parsed from a
+            command line) matches the integer column.
+        where (callable): Only accept rows for which this returns True.
+
+    Subclasses implement ``write(row)``, which writes one row, and may
+    override ``open()`` and ``close()``, which do nothing by default.
+
+    Attributes:
+        needs_bulk (bool): Sink requires the bulk data field (packet capture
+            or JSON blob). If no sink for a table needs it, the table is
+            scanned without it.
+        num_rows (int): Number of rows written.
+    """
+
+    needs_bulk = False
+
+    def __init__(self, table_name, file_location, match=None, where=None):
+        if table_name not in TABLE_ABSTRACTIONS:
+            err = "Unsupported table {}. Expected one of {}".format(
+                table_name, sorted(TABLE_ABSTRACTIONS))
+            raise ValueError(err)
+        self.table_name = table_name
+        self.file_location = file_location
+        self.match = {}
+        for k, v in list((match or {}).items()):
+            values = v if isinstance(v, list) else [v]
+            self.match[k] = set([str(x) for x in values])
+        self.where = where
+        self.num_rows = 0
+
+    def accepts(self, row):
+        """Return True if ``row`` passes this sink's filters."""
+        for k, values in self.match.items():
+            if str(row.get(k)) not in values:
+                return False
+        if self.where is not None and not self.where(row):
+            return False
+        return True
+
+    def open(self, abstraction):
+        """Prepare output, given the abstraction rows will come from."""
+        pass
+
+    def close(self):
+        """Flush and close output."""
+        pass
+
+
+class CSVSink(Sink):
+    """Write metadata columns as tab-delimited CSV, like kismet_log_to_csv.
+
+    Args:
+        columns (list): Columns to write. Defaults to every column except
+            the bulk data field.
+    """
+
+    def __init__(self, table_name, file_location, columns=None, **kwargs):
+        super(CSVSink, self).__init__(table_name, file_location, **kwargs)
+        self.columns = columns
+        self.out = None
+        self.writer = None
+
+    def open(self, abstraction):
+        if self.columns is None:
+            self.columns = [x for x in abstraction.column_names
+                            if x != abstraction.bulk_data_field]
+        csv_file_mode = "wb" if sys.version_info[0] < 3 else "w"
+        self.out = open(self.file_location, csv_file_mode)
+        self.writer = csv.DictWriter(self.out, delimiter="\t",
+                                     extrasaction="ignore",
+                                     fieldnames=self.columns)
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.num_rows += 1
+
+    def close(self):
+        self.out.close()
+
+
+class NDJSONSink(Sink):
+    """Write one JSON object per line.
+
+    Args:
+        include_bulk (bool): Include the bulk data field. JSON blobs are
+            embedded as objects; binary packet data is base64-encoded.
+    """
+
+    def __init__(self, table_name, file_location, include_bulk=False,
+                 **kwargs):
+        super(NDJSONSink, self).__init__(table_name, file_location, **kwargs)
+        self.needs_bulk = include_bulk
+        self.bulk_data_field = None
+        self.out = None
+
+    def open(self, abstraction):
+        self.bulk_data_field = abstraction.bulk_data_field
+        self.out = open(self.file_location, "w")
+
+    def write(self, row):
+        profiling.switch("json")
+        record = dict(row)
+        bulk = record.pop(self.bulk_data_field, None)
+        if self.needs_bulk and bulk is not None:
+            if isinstance(bulk, bytes) and self.bulk_data_field == "packet":
+                bulk = base64.b64encode(bulk).decode("ascii")
+            else:
+                bulk = json.loads(bulk)
+            record[self.bulk_data_field] = bulk
+        output = json.dumps(record, sort_keys=True)
+        profiling.switch("write")
+        self.out.write(output)
+        self.out.write("\n")
+        self.num_rows += 1
+
+    def close(self):
+        self.out.close()
+
+
+class PcapSink(Sink):
+    """Write packets to a pcap file, like kismet_log_to_pcap.
+
+    The link type of the file is taken from the first packet written.
+    Rows without packet data (DLT 0) are skipped.
+    """
+
+    needs_bulk = True
+
+    def __init__(self, file_location, **kwargs):
+        super(PcapSink, self).__init__("packets", file_location, **kwargs)
+        self.out = None
+
+    def accepts(self, row):
+        if not row["dlt"] or not row["packet"]:
+            return False
+        return super(PcapSink, self).accepts(row)
+
+    def open(self, abstraction):
+        self.out = open(self.file_location, "wb")
+
+    def write(self, row):
+        if self.num_rows == 0:
+            self.out.write(struct.pack("IHHiIII",
+                                       0xa1b2c3d4,  # magic
+                                       2, 4,  # version
+                                       0,  # offset
+                                       0,  # sigfigs
+                                       8192,  # max packet len
+                                       int(row["dlt"])  # packet type
+                                       ))
+        packet_bytes = row["packet"]
+        packet_len = len(packet_bytes)
+        self.out.write(struct.pack("IIII",
+                                   int(row["ts_sec"]),
+                                   int(row["ts_usec"]),
+                                   packet_len,
+                                   packet_len))
+        self.out.write(packet_bytes)
+        self.num_rows += 1
+
+    def close(self):
+        self.out.close()
+
+
+class KMLSink(Sink):
+    """Write one placemark per row, using the row's location columns.
+
+    Devices are plotted at their average location and named by MAC address;
+    other tables are plotted at ``lat``/``lon``. Rows without a location
+    are skipped.
+
+    Args:
+        folder_by (str): Column to group placemarks into folders by. Rows
+            are written in scan order, so this works best on columns the
+            table is already clustered by.
+        title (str): Document name embedded in the KML.
+    """
+
+    def __init__(self, table_name, file_location, folder_by=None,
+                 title="Kismet", **kwargs):
+        super(KMLSink, self).__init__(table_name, file_location, **kwargs)
+        self.folder_by = folder_by
+        if table_name == "devices":
+            self.lat_column, self.lon_column = "avg_lat", "avg_lon"
+            self.name_column = "devmac"
+        else:
+            self.lat_column, self.lon_column = "lat", "lon"
+            self.name_column = None
+        self.writer = KMLWriter(file_location, title=title)
+
+    def accepts(self, row):
+        if not row.get(self.lat_column) and not row.get(self.lon_column):
+            return False
+        return super(KMLSink, self).accepts(row)
+
+    def open(self, abstraction):
+        self.writer.open()
+
+    def write(self, row):
+        if self.name_column is not None:
+            name = row[self.name_column]
+        else:
+            name = str(row["ts_sec"])
+        folder = row[self.folder_by] if self.folder_by else None
+        self.writer.add_point(name, row[self.lon_column],
+                              row[self.lat_column], row.get("alt", 0),
+                              folder=folder)
+        self.num_rows += 1
+
+    def close(self):
+        self.writer.close()
+
+
+class ParquetSink(Sink):
+    """Write rows to a Parquet file in bounded row groups.
+
+    Requires ``pyarrow`` (``pip install kismetdb[parquet]``). Unlike
+    ``BaseInterface.to_parquet()``, fields are not extracted from the bulk
+    data field, since rows arrive already decoded from the shared scan.
+
+    Args:
+        include_bulk (bool): Include the bulk data field.
+        row_group_size (int): Number of rows per row group.
+    """
+
+    def __init__(self, table_name, file_location, include_bulk=False,
+                 row_group_size=65536, **kwargs):
+        super(ParquetSink, self).__init__(table_name, file_location, **kwargs)
+        self.needs_bulk = include_bulk
+        self.row_group_size = row_group_size
+        self.writer = None
+
+    def open(self, abstraction):
+        from .parquet import ParquetTableWriter
+        self.writer = ParquetTableWriter(abstraction, self.file_location,
+                                         include_bulk=self.needs_bulk,
+                                         row_group_size=self.row_group_size)
+        self.writer.open()
+
+    def write(self, row):
+        self.writer.write(row)
+        self.num_rows += 1
+
+    def close(self):
+        self.writer.close()
+
+
+class Exporter(object):
+    """Scan each table of a Kismet log once, feeding rows to many sinks.
+
+    Args:
+        file_location (str): Path to Kismet log file.
+
+    Attributes:
+        sinks (list): Sinks registered with ``add_sink()``.
+    """
+
+    def __init__(self, file_location):
+        self.file_location = file_location
+        self.sinks = []
+
+    def add_sink(self, sink):
+        """Register a sink. Returns the sink, for convenience."""
+        self.sinks.append(sink)
+        return sink
+
+    def get_tables(self):
+        """Return the names of tables with at least one sink, in the order
+        their sinks were added."""
+        tables = []
+        for sink in self.sinks:
+            if sink.table_name not in tables:
+                tables.append(sink.table_name)
+        return tables
+
+    def filter_applies(self, name, table_name=None):
+        """Return True if filter ``name`` is valid for ``table_name``, or
+        for any table with a sink.
+
+        Spatial filters only apply to tables with location columns.
+        """
+        if name in ["order_by", "limit", "where"]:
+            return True
+        for table in [table_name] if table_name else self.get_tables():
+            abstraction = TABLE_ABSTRACTIONS[table]
+            if name in abstraction.valid_kwargs:
+                return True
+            if name in abstraction.spatial_kwargs and \
+                    (abstraction.bounds_columns or
+                     abstraction.location_columns):
+                return True
+        return False
+
+    def run(self, **kwargs):
+        """Scan every table that has at least one sink, exactly once.
+
+        Keyword arguments are passed to each table's query and are
+        interpreted as described in each abstraction's documentation.
+        Arguments which are not valid for a table (see
+        ``filter_applies()``) are ignored for that table. Every table's
+        query is checked before any output is opened, so invalid
+        arguments leave no partial output.
+
+        Returns:
+            dict: Number of rows read, keyed by table name.
+
+        Raises:
+            ValueError: An argument is not valid for any of the tables, or
+                cannot be applied to one of them.
+        """
+        tables = self.get_tables()
+        for name in sorted(kwargs):
+            if not self.filter_applies(name):
+                err = "Filter {} does not apply to any of the tables {}".format(  # NOQA
+                    name, tables)
+                raise ValueError(err)
+        table_kwargs = {}
+        for table_name in tables:
+            table_kwargs[table_name] = {
+                x: y for x, y in list(kwargs.items())
+                if self.filter_applies(x, table_name)}
+            self.check_filters(table_name, table_kwargs[table_name])
+        rows_read = {}
+        for table_name in tables:
+            rows_read[table_name] = self.run_table(table_name,
+                                                   **table_kwargs[table_name])
+        return rows_read
+
+    def check_filters(self, table_name, kwargs):
+        """Compile a table's query arguments, without running the query.
+
+        Raises:
+            ValueError: An argument cannot be applied to the table.
+        """
+        abstraction = TABLE_ABSTRACTIONS[table_name](self.file_location)
+        filters = dict(kwargs)
+        abstraction.generate_order_and_limit(filters.pop("order_by", None),
+                                             filters.pop("limit", None))
+        abstraction.generate_parts_and_replacements(filters)
+
+    def run_table(self, table_name, **kwargs):
+        """Scan one table, feeding rows to the sinks registered for it."""
+        sinks = [x for x in self.sinks if x.table_name == table_name]
+        abstraction = TABLE_ABSTRACTIONS[table_name](self.file_location)
+        if [x for x in sinks if x.needs_bulk]:
+            rows = abstraction.yield_all(**kwargs)
+        else:
+            rows = abstraction.yield_meta(**kwargs)
+        for sink in sinks:
+            sink.open(abstraction)
+            metrics.add_output(sink.file_location, table_name)
+        nrows = 0
+        switch = profiling.get_switch()
+        try:
+            for row in rows:
+                nrows += 1
+                if switch:
+                    switch("write")
+                try:
+                    for sink in sinks:
+                        if sink.accepts(row):
+                            sink.write(row)
+                except Exception:
+                    # Failed reads are counted by the query itself
+                    if metrics.active is not None:
+                        metrics.active.record_error(table_name)
+                    raise
+        finally:
+            for sink in sinks:
+                sink.close()
+        return nrows
@@ -0,0 +1,210 @@
+"""Composable filter expressions, compiled to a single SQL WHERE clause."""
+from .utility import Utility
+
+
+class Expression(object):
+    """A boolean filter expression.
+
+    Expressions are built from ``F`` column references and combined with
+    ``&`` (and), ``|`` (or) and ``~`` (not). Since these operators bind
+    more tightly than comparisons in Python, wrap each comparison in
+    parentheses::
+
+        from kismetdb import F
+
+        expr = (F("type") == "Wi-Fi AP") | ((F("strongest_signal") > -50) &
+                                            (F("last_time") > "2021-01-01"))
+        devices.get_meta(where=expr)
+
+    Pass an expression to any query method with the ``where`` keyword
+    argument. It is compiled against the abstraction's columns, and ANDed
+    with any other keyword filters.
+
+    This is an abstract base. Subclasses implement
+    ``compile(abstraction, replacements)``, which returns the SQL for the
+    expression and adds its parameters to ``replacements``, raising
+    ValueError for an unknown column or the bulk data field.
+    """
+
+    def __and__(self, other):
+        return Combination("AND", [self, other])
+
+    def __or__(self, other):
+        return Combination("OR", [self, other])
+
+    def __invert__(self):
+        return Negation(self)
+
+    def to_sql(self, abstraction):
+        """Return tuple with SQL partial and replacements for
+        ``abstraction``."""
+        replacements = {}
+        sql = self.compile(abstraction, replacements)
+        return (sql, replacements)
+
+
+class Comparison(Expression):
+    """Compare a column against one value, or a list for ``IN``."""
+
+    def __init__(self, column, operator, value):
+        self.column = column
+        self.operator = operator
+        self.value = value
+
+    def compile(self, abstraction, replacements):
+        abstraction.check_query_column(self.column)
+        if self.value is None and self.operator in ["=", "!="]:
+            operator = "IS" if self.operator == "=" else "IS NOT"
+            return "{} {} NULL".format(self.column, operator)
+        values = self.value if self.operator == "IN" else [self.value]
+        if len(values) > Utility.multi_value_json_threshold:
+            # Bind long lists as one JSON array, like multi-value filters,
+            # to stay within SQLite's limit on parameters.
+            sql, replacement = Utility.generate_multi_string_sql_in_json(
+                self.column, [abstraction.format_expression_value(
+                    self.column, x) for x in values],
+                param_name="where{}".format(len(replacements)))
+            replacements.update(replacement)
+            return sql
+        names = []
+        for value in values:
+            name = "where{}".format(len(replacements))
+            replacements[name] = abstraction.format_expression_value(
+                self.column, value)
+            names.append(":" + name)
+        if self.operator == "IN":
+            return "{} IN ({})".format(self.column, ", ".join(names))
+        return "{} {} {}".format(self.column, self.operator, names[0])
+
+
+class Combination(Expression):
+    """Combine expressions with ``AND`` or ``OR``."""
+
+    def __init__(self, operator, expressions):
+        self.operator = operator
+        self.expressions = []
+        for expression in expressions:
+            if not isinstance(expression, Expression):
+                err = "Cannot combine {!r} with an expression".format(
+                    expression)
+                raise ValueError(err)
+            if isinstance(expression, Combination) and \
+                    expression.operator == operator:
+                self.expressions.extend(expression.expressions)
+            else:
+                self.expressions.append(expression)
+
+    def compile(self, abstraction, replacements):
+        parts = [x.compile(abstraction, replacements)
+                 for x in self.expressions]
+        return "( " + " {} ".format(self.operator).join(parts) + " )"
+
+
+class Negation(Expression):
+    """Negate an expression."""
+
+    def __init__(self, expression):
+        self.expression = expression
+
+    def compile(self, abstraction, replacements):
+        return "NOT {}".format(self.expression.compile(abstraction,
+                                                       replacements))
+
+
+class F(object):
+    """Reference a column, to build an ``Expression``.
+
+    Comparison operators (``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``)
+    return expressions. Comparing with None matches NULL. Timestamp columns
+    accept the same values as the time-based keyword filters, and lat/lon
+    values are given in degrees whatever the DB version.
+
+    Args:
+        column (str): Column name.
+    """
+
+    def __init__(self, column):
+        self.column = column
+
+    def __eq__(self, value):
+        return Comparison(self.column, "=", value)
+
+    def __ne__(self, value):
+        return Comparison(self.column, "!=", value)
+
+    def __lt__(self, value):
+        return Comparison(self.column, "<", value)
+
+    def __le__(self, value):
+        return Comparison(self.column, "<=", value)
+
+    def __gt__(self, value):
+        return Comparison(self.column, ">", value)
+
+    def __ge__(self, value):
+        return Comparison(self.column, ">=", value)
+
+    __hash__ = None
+
+    def isin(self, values):
+        """Match rows where the column equals any of ``values``."""
+        values = list(values)
+        if not values:
+            raise ValueError("isin() requires at least one value")
+        return Comparison(self.column, "IN", values)
+
+    def like(self, pattern):
+        """Match rows where the column matches a SQL ``LIKE`` pattern."""
+        return Comparison(self.column, "LIKE", pattern)
+
+
+def predicate(*columns):
+    """Declare the columns a Python predicate is called with.
+
+    A callable passed with the ``where`` keyword argument is run by SQLite
+    during the scan, so rows it rejects are never turned into dicts (and
+    their bulk data is never returned). It receives only the columns it
+    declares, as positional arguments, and returns True to keep a row.
+    Without this decorator, the callable's argument names are used as the
+    column names::
+
+        @kismetdb.predicate("devmac")
+        def in_oui_list(mac):
+            return mac[:8] in ouis
+
+        devices.get_all(where=in_oui_list)
+        packets.get_meta(where=lambda sourcemac: sourcemac.startswith("00"))
+
+    The bulk data field may be declared, to match on JSON or packet
+    content. Lat/lon values are passed in degrees whatever the DB version.
+
+    Args:
+        columns (str): Column names.
+    """
+    def decorate(func):
+        func.kismetdb_columns = list(columns)
+        return func
+    return decorate
+
+
+def get_predicate_columns(func):
+    """Return the columns a predicate declares.
+
+    Raises:
+        ValueError: No columns declared.
+    """
+    columns = getattr(func, "kismetdb_columns", None)
+    if columns is None:
+        import inspect  # Deferred, since it is slow to import
+        try:
+            parameters = inspect.signature(func).parameters.values()
+            columns = [x.name for x in parameters
+                       if x.kind in (x.POSITIONAL_ONLY,
+                                     x.POSITIONAL_OR_KEYWORD)]
+        except AttributeError:
+            argspec = inspect.getargspec(func)
+            columns = argspec.args[1:] if inspect.ismethod(func) \
+                else argspec.args
+    if not columns:
+        raise ValueError("Predicate {!r} declares no columns".format(func))
+    return list(columns)
@@ -0,0 +1,136 @@
+"""Streaming KML and KMZ writer."""
+import io
+import os
+import tempfile
+import zipfile
+
+
+def escape(text):
+    """Escape ``&``, ``<`` and ``>`` in ``text`` for XML element content.
+
+    This matches ``xml.sax.saxutils.escape()``, which is not used because
+    importing it also imports ``urllib`` and roughly doubles the time taken
+    to import this package.
+    """
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">",
+                                                                   "&gt;")
+
+
+class KMLWriter(object):
+    """Write KML (or zipped KMZ) placemarks incrementally.
+
+    Unlike building a full KML document in memory and saving it at the end,
+    this writer emits each placemark as soon as it is added, so memory use
+    stays flat no matter how many devices are exported. Placemarks may be
+    grouped into folders; since folders are written as they are encountered,
+    placemarks belonging to the same folder must be added consecutively
+    (order your query by the folder key).
+
+    Args:
+        file_location (str): Path to output file.
+        title (str): Document name embedded in the KML.
+        kmz (bool): Write a zipped KMZ file instead of plain KML. If
+            unspecified, a KMZ is written when ``file_location`` ends
+            in ``.kmz``.
+
+    Attributes:
+        num_placemarks (int): Number of placemarks written so far.
+
+    """
+
+    kmz_document_name = "doc.kml"
+
+    def __init__(self, file_location, title="Kismet", kmz=None):
+        if kmz is None:
+            kmz = file_location.lower().endswith(".kmz")
+        self.file_location = file_location
+        self.title = title
+        self.kmz = kmz
+        self.num_placemarks = 0
+        self.current_folder = None
+        self.kml_file = None
+        self.out = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        """Open the output file and write the document header."""
+        if self.kmz:
+            # ZipFile.open() can only write from Python 3.6, so the KML is
+            # streamed to a temporary file and zipped on close.
+            handle, self.kml_file = tempfile.mkstemp(
+                suffix=".kml", dir=os.path.dirname(
+                    os.path.abspath(self.file_location)))
+            os.close(handle)
+            self.out = io.open(self.kml_file, "w", encoding="utf-8")
+        else:
+            self.out = io.open(self.file_location, "w", encoding="utf-8")
+        self.out.write(u"<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"
+                       u"<kml xmlns=\"http://www.opengis.net/kml/2.2\">\n"
+                       u"<Document>\n"
+                       u"<name>{}</name>\n".format(escape(self.title)))
+
+    def close(self):
+        """Close any open folder, write the document footer and close."""
+        if self.out is None:
+            return
+        self.end_folder()
+        self.out.write(u"</Document>\n</kml>\n")
+        self.out.close()
+        self.out = None
+        if self.kml_file is not None:
+            try:
+                with zipfile.ZipFile(self.file_location, "w",
+                                     zipfile.ZIP_DEFLATED,
+                                     allowZip64=True) as zip_file:
+                    zip_file.write(self.kml_file, self.kmz_document_name)
+            finally:
+                os.remove(self.kml_file)
+                self.kml_file = None
+
+    def start_folder(self, name):
+        """Close the current folder, if any, and open a new one."""
+        self.end_folder()
+        self.out.write(u"<Folder>\n<name>{}</name>\n".format(escape(name)))
+        self.current_folder = name
+
+    def end_folder(self):
+        """Close the current folder, if any."""
+        if self.current_folder is None:
+            return
+        self.out.write(u"</Folder>\n")
+        self.current_folder = None
+
+    def add_point(self, name, lon, lat, alt=0, description=None,
+                  folder=None):
+        """Write one point placemark.
+
+        Args:
+            name (str): Placemark name.
+            lon (float): Longitude.
+            lat (float): Latitude.
+            alt (float): Altitude.
+            description (str): Optional placemark description.
+            folder (str): Folder this placemark belongs to. A new folder is
+                started whenever this differs from the previous placemark's
+                folder. If ``None``, the placemark is written at document
+                level (closing any open folder).
+        """
+        if folder != self.current_folder:
+            if folder is None:
+                self.end_folder()
+            else:
+                self.start_folder(folder)
+        parts = [u"<Placemark><name>{}</name>".format(escape(name))]
+        if description:
+            parts.append(u"<description>{}</description>".format(
+                escape(description)))
+        parts.append(u"<Point><coordinates>{},{},{}</coordinates></Point>"
+                     u"</Placemark>\n".format(lon, lat, alt or 0))
+        self.out.write(u"".join(parts))
+        self.num_placemarks += 1
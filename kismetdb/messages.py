@@ -22,6 +22,13 @@ class Messages(BaseInterface):
         lon_gt (str, float): Bounding minimum longitude
         lon_lt (str, float): Bounding maximum longitude
         msgtype (str): Message type
+        bbox (tuple): Match messages located within
+            (min_lat, min_lon, max_lat, max_lon).
+        within_radius (tuple): Match messages located within
+            (lat, lon, meters).
+        where (Expression, callable): Match messages for which this
+            expression (see ``kismetdb.F``) or Python predicate (see
+            ``kismetdb.predicate()``) is true.
     """
 
     table_name = "messages"
@@ -42,6 +49,7 @@ class Messages(BaseInterface):
                         6: ["ts_sec", "lat", "lon", "msgtype", "message"],
                         7: ["ts_sec", "lat", "lon", "msgtype", "message"],
                         8: ["ts_sec", "lat", "lon", "msgtype", "message"]}
+    location_columns = ("lat", "lon")
     valid_kwargs = {"ts_sec_gt": Utility.generate_single_tstamp_secs_gt,
                     "ts_sec_lt": Utility.generate_single_tstamp_secs_lt,
                     "lat_gt": Utility.generate_single_float_sql_gt,
@@ -0,0 +1,305 @@
+"""Progress and throughput metrics for long exports, in Prometheus format."""
+import os
+import threading
+import time
+
+# The running Metrics instance, if any. Row loops look this up once per
+# query, so they pay nothing when metrics are off.
+active = None
+
+
+def get_table_metrics(abstraction):
+    """Return the counters for ``abstraction``'s table if metrics are
+    running, otherwise None."""
+    if active is None:
+        return None
+    return active.get_table(abstraction)
+
+
+def add_output(file_location, table_name=None):
+    """Report the size of an output file as bytes written, if metrics are
+    running."""
+    if active is not None:
+        active.add_output(file_location, table_name)
+
+
+def escape_label(value):
+    """Return ``value`` escaped for use as a label value."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace(
+        "\"", "\\\"")
+
+
+class TableMetrics(object):
+    """Counters for one table, updated by the row loops.
+
+    Attributes:
+        rows (int): Rows read.
+        errors (int): Queries or exports of this table which failed.
+        last_row (dict): Most recent row read, used to compute lag.
+        time_column (str): Column holding each row's time, or None.
+    """
+
+    def __init__(self, time_column):
+        self.rows = 0
+        self.errors = 0
+        self.last_row = None
+        self.time_column = time_column
+        self.last_rows = 0
+        self.last_time = time.time()
+        self.rate = 0.0
+
+    def get_lag(self, now):
+        """Return seconds between ``now`` and the newest row read, or None.
+
+        For a log which Kismet is still writing, this is how far behind
+        live data an export is.
+        """
+        row = self.last_row
+        if row is None or self.time_column is None:
+            return None
+        timestamp = row.get(self.time_column)
+        if not timestamp:
+            return None
+        return max(0.0, now - timestamp)
+
+    def update_rate(self, now):
+        """Recompute rows/sec over the time since the last update."""
+        rows = self.rows
+        elapsed = now - self.last_time
+        if elapsed > 0:
+            self.rate = (rows - self.last_rows) / elapsed
+        self.last_rows = rows
+        self.last_time = now
+
+
+class Metrics(object):
+    """Publish progress of long-running reads and exports as metrics.
+
+    While running, every table query counts the rows read, and the newest
+    row's timestamp (to report lag behind live data) and failed queries,
+    per table. Output files registered with ``add_output()`` (the included
+    scripts and ``Exporter`` register theirs) are reported as bytes
+    written. Row loops only increment a counter, so the overhead is
+    negligible; rates, lag and file sizes are computed when metrics are
+    published.
+
+    Metrics are written in the Prometheus text format, every ``interval``
+    seconds, to ``textfile`` (for node_exporter's textfile collector; the
+    name should end in ``.prom``), and/or served over HTTP on ``port``::
+
+        with kismetdb.metrics.Metrics(textfile="/var/lib/node_exporter/"
+                                               "kismetdb.prom"):
+            exporter.run()
+
+    Args:
+        textfile (str): Path of a file to write metrics to.
+        port (int): Port to serve metrics on, at any path.
+        address (str): Address to serve metrics on.
+        interval (float): Seconds between updates of ``textfile``, and of
+            the rows/sec gauge.
+        labels (dict): Labels added to every metric, such as a job name.
+
+    Attributes:
+        tables (dict): ``TableMetrics`` for each table read.
+        outputs (dict): Table name (or None) for each output file.
+    """
+
+    def __init__(self, textfile=None, port=None, address="127.0.0.1",
+                 interval=10.0, labels=None):
+        self.textfile = textfile
+        self.port = port
+        self.address = address
+        self.interval = interval
+        self.labels = dict(labels or {})
+        self.tables = {}
+        self.outputs = {}
+        self.start_time = None
+        self.stop_event = threading.Event()
+        self.publisher = None
+        self.server = None
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """Start publishing, and counting rows read.
+
+        Raises:
+            ValueError: Other metrics are already running.
+            socket.error: ``port`` could not be bound. Metrics are left
+                stopped.
+        """
+        global active
+        if active is not None:
+            raise ValueError("Metrics are already running")
+        self.start_time = time.time()
+        if self.port is not None:
+            self.start_server()
+        active = self
+        self.stop_event.clear()
+        self.publisher = threading.Thread(target=self.publish_loop)
+        self.publisher.daemon = True
+        self.publisher.start()
+
+    def stop(self):
+        """Publish final values, and stop."""
+        global active
+        if active is self:
+            active = None
+        self.stop_event.set()
+        if self.publisher is not None:
+            self.publisher.join()
+            self.publisher = None
+        self.publish()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def get_table(self, abstraction):
+        """Return the counters for ``abstraction``'s table, creating them
+        if needed."""
+        table = self.tables.get(abstraction.table_name)
+        if table is None:
+            time_columns = abstraction.get_timestamp_columns()
+            time_column = None
+            for column in ["last_time", "ts_sec"]:
+                if column in time_columns:
+                    time_column = column
+                    break
+            table = TableMetrics(time_column)
+            self.tables[abstraction.table_name] = table
+        return table
+
+    def add_output(self, file_location, table_name=None):
+        """Report the size of an output file as bytes written."""
+        self.outputs[file_location] = table_name
+
+    def record_error(self, table_name):
+        """Count a failed read or export of ``table_name``."""
+        table = self.tables.get(table_name)
+        if table is None:
+            table = TableMetrics(None)
+            self.tables[table_name] = table
+        table.errors += 1
+
+    def format_labels(self, **labels):
+        """Return a label set, including the constant labels."""
+        merged = dict(self.labels)
+        merged.update([(x, y) for x, y in list(labels.items())
+                       if y is not None])
+        if not merged:
+            return ""
+        return "{" + ",".join(["{}=\"{}\"".format(x, escape_label(y))
+                               for x, y in sorted(merged.items())]) + "}"
+
+    def render(self):
+        """Return current metrics in the Prometheus text format."""
+        now = time.time()
+        tables = sorted(list(self.tables.items()))
+        families = [
+            ("kismetdb_rows_read_total", "counter",
+             "Rows read from the Kismet log.",
+             [(dict(table=x), y.rows) for x, y in tables]),
+            ("kismetdb_rows_per_second", "gauge",
+             "Rows read per second, over the last update interval.",
+             [(dict(table=x), y.rate) for x, y in tables]),
+            ("kismetdb_errors_total", "counter",
+             "Reads or exports which failed.",
+             [(dict(table=x), y.errors) for x, y in tables]),
+            ("kismetdb_lag_seconds", "gauge",
+             "Seconds between now and the newest row read.",
+             [(dict(table=x), y.get_lag(now)) for x, y in tables])]
+        written = []
+        for file_location, table_name in sorted(
+                list(self.outputs.items()),
+                key=lambda x: x[0]):
+            try:
+                size = os.path.getsize(file_location)
+            except OSError:
+                continue
+            written.append((dict(output=file_location, table=table_name),
+                            size))
+        families.append(("kismetdb_bytes_written_total", "counter",
+                         "Bytes written to each output file.", written))
+        families.append(("kismetdb_start_time_seconds", "gauge",
+                         "Time metrics collection started, in seconds "
+                         "since the epoch.", [({}, self.start_time)]))
+        lines = []
+        for name, metric_type, help_text, samples in families:
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} {}".format(name, metric_type))
+            for labels, value in samples:
+                if value is None:
+                    continue
+                lines.append("{}{} {}".format(
+                    name, self.format_labels(**labels), repr(value)
+                    if isinstance(value, float) else value))
+        return "\n".join(lines) + "\n"
+
+    def publish(self):
+        """Update rates, and write the textfile if there is one."""
+        with self.lock:
+            now = time.time()
+            for table in list(self.tables.values()):
+                table.update_rate(now)
+            if self.textfile is None:
+                return
+            # Write then rename, so the collector never reads a partial file
+            temp_path = "{}.{}.tmp".format(self.textfile, os.getpid())
+            with open(temp_path, "w") as textfile:
+                textfile.write(self.render())
+            os.rename(temp_path, self.textfile)
+
+    def publish_loop(self):
+        """Publish until stopped."""
+        while not self.stop_event.wait(self.interval):
+            self.publish()
+
+    def start_server(self):
+        """Serve metrics over HTTP, from a background thread."""
+        try:
+            from http.server import BaseHTTPRequestHandler, HTTPServer
+        except ImportError:
+            from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type",
+                                 "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer((self.address, self.port), Handler)
+        self.port = self.server.server_address[1]
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+
+def add_arguments(parser):
+    """Add the metrics options shared by the included scripts."""
+    parser.add_argument("--metrics-textfile", action="store",
+                        dest="metricstextfile",
+                        help=("Write progress metrics in Prometheus format "
+                              "to this file (for node_exporter's textfile "
+                              "collector) while running"))
+    parser.add_argument("--metrics-port", action="store", dest="metricsport",
+                        type=int,
+                        help=("Serve progress metrics in Prometheus format "
+                              "over HTTP on this local port while running"))
+    parser.add_argument("--metrics-interval", action="store",
+                        dest="metricsinterval", type=float, default=10.0,
+                        help="Seconds between metrics updates")
@@ -1,4 +1,6 @@
 """Packets abstraction."""
+import itertools
+
 from .base_interface import BaseInterface
 from .utility import Utility
 
@@ -38,6 +40,13 @@ class Packets(BaseInterface):
         datarate_gt (real): Match packets where the datarate is greater than this.
         hash (str): Exact match against CRC32 hash.
         packetid (int): Exact match against packetid.
+        bbox (tuple): Match packets located within
+            (min_lat, min_lon, max_lat, max_lon).
+        within_radius (tuple): Match packets located within
+            (lat, lon, meters).
+        where (Expression, callable): Match packets for which this
+            expression (see ``kismetdb.F``) or Python predicate (see
+            ``kismetdb.predicate()``) is true.
 
     """
 
@@ -81,6 +90,8 @@ class Packets(BaseInterface):
                             "packet_len", "signal", "datasource", "dlt",
                             "packet", "error", "tags", "datarate", "hash",
                             "packetid"]}
+    location_columns = ("lat", "lon")
+    signal_column = "signal"
     valid_kwargs = {"ts_sec_lt": Utility.generate_single_tstamp_secs_lt,
                     "ts_sec_gt": Utility.generate_single_tstamp_secs_gt,
                     "devkey": Utility.generate_multi_string_sql_eq,
@@ -98,3 +109,138 @@ class Packets(BaseInterface):
                     "datarate_gt": Utility.generate_single_float_sql_gt,
                     "hash": Utility.generate_single_string_sql_eq,
                     "packetid": Utility.generate_single_int_sql_eq}
+    frame_key_columns = ["packetid"]
+
+    def check_hash_support(self):
+        """Return None if this log records packet IDs, else raise.
+
+        Raises:
+            ValueError: Log predates the ``packetid`` column (DB version 8).
+        """
+        if "packetid" not in self.column_names:
+            err = ("Duplicate detection requires the packetid column, which "
+                   "is only present in DB version 8 and later. This log is "
+                   "version {}".format(self.db_version))
+            raise ValueError(err)
+        return
+
+    def group_by_hash(self, min_observations=1, **kwargs):
+        """Yield each captured frame with every observation of it.
+
+        When several datasources hear the same frame, Kismet stores it once
+        per datasource, with the same ``packetid``. Observations are grouped
+        by ``packetid``, so a frame with the same contents sent again later
+        (such as a repeated beacon, which has the same ``hash``) is a
+        separate frame. SQLite sorts the rows (spilling to temporary files
+        for very large logs), so only one frame is held in memory at a time.
+        Packets without a packet ID (``packetid`` of 0) are each their own
+        frame.
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation.
+
+        Args:
+            min_observations (int): Only yield frames seen at least this
+                many times. Use 2 to find duplicates only.
+
+        Yields:
+            dict: Dict with ``packetid``, ``hash``, ``packet_len``,
+                ``ts_sec`` and ``ts_usec`` (of the earliest observation), and
+                ``observations``, a list of (datasource, signal, ts_sec,
+                ts_usec) tuples in time order.
+
+        Raises:
+            ValueError: Log predates the ``packetid`` column.
+        """
+        self.check_hash_support()
+        where, replacements = self.generate_where_clause(kwargs)
+        sql = ("SELECT packetid, hash, packet_len, datasource, signal, "
+               "ts_sec, ts_usec, CASE WHEN packetid = 0 OR packetid IS NULL "
+               "THEN rowid ELSE 0 END AS kismetdb_unkeyed FROM packets{} "
+               "ORDER BY packetid, kismetdb_unkeyed, ts_sec, "
+               "ts_usec").format(where)
+        db = self.connect(sql=sql)
+        cur = db.cursor()
+        cur.execute(sql, replacements)
+        try:
+            frames = itertools.groupby(cur, lambda row: (row[0], row[7]))
+            for _, rows in frames:
+                rows = list(rows)
+                observations = [(row[3], row[4], row[5], row[6])
+                                for row in rows]
+                if len(observations) < min_observations:
+                    continue
+                yield {"packetid": rows[0][0],
+                       "hash": rows[0][1],
+                       "packet_len": rows[0][2],
+                       "ts_sec": observations[0][2],
+                       "ts_usec": observations[0][3],
+                       "observations": observations}
+        finally:
+            db.close()
+
+    def generate_unique_sql(self, include_bulk, kwargs):
+        """Return tuple with SQL selecting the first observation of each
+        frame, and replacements."""
+        self.check_hash_support()
+        query_parts, replacements = self.generate_parts_and_replacements(kwargs)  # NOQA
+        inner_parts = query_parts + ["packetid != 0"]
+        unique_sql = ("(packetid = 0 OR packetid IS NULL OR rowid IN "
+                      "(SELECT MIN(rowid) FROM packets WHERE {} "
+                      "GROUP BY {}))").format(
+                          " AND ".join(inner_parts),
+                          ", ".join(self.frame_key_columns))
+        if include_bulk:
+            columns = self.full_query_column_names
+        else:
+            columns = self.meta_query_column_names
+        sql = "SELECT {} FROM packets WHERE {} ORDER BY rowid".format(
+            ", ".join(columns), " AND ".join(query_parts + [unique_sql]))
+        return (sql, replacements)
+
+    def yield_unique(self, include_bulk=False, **kwargs):
+        """Yield each frame once, dropping copies heard by other datasources.
+
+        The first stored observation of each frame is kept; see
+        ``group_by_hash()`` for how frames are identified. Duplicates are
+        removed by SQLite.
+
+        Keyword arguments are described above, near the beginning of
+        the class documentation.
+
+        Args:
+            include_bulk (bool): Include the packet capture.
+
+        Yields:
+            dict: Dict representing one row from query.
+
+        Raises:
+            ValueError: Log predates the ``packetid`` column.
+        """
+        sql, replacements = self.generate_unique_sql(include_bulk, kwargs)
+        if include_bulk:
+            column_names = self.column_names
+        else:
+            column_names = [x for x in self.column_names
+                            if x != self.bulk_data_field]
+        for row in self.yield_rows(column_names, sql, replacements):
+            yield row
+
+    def dedupe(self, include_bulk=False, **kwargs):
+        """Return each frame once, dropping copies heard by other datasources.
+
+        This is the list form of ``yield_unique()``.
+
+        Returns:
+            list: List of dicts, one per frame.
+
+        Raises:
+            ValueError: Log predates the ``packetid`` column.
+        """
+        sql, replacements = self.generate_unique_sql(include_bulk, kwargs)
+        if include_bulk:
+            column_names = self.column_names
+        else:
+            column_names = [x for x in self.column_names
+                            if x != self.bulk_data_field]
+        return self.get_rows(column_names, sql, replacements)
@@ -0,0 +1,131 @@
+"""Streaming Parquet writer for Kismet DB tables.
+
+This module requires ``pyarrow``, which is an optional dependency. Install
+it with ``pip install kismetdb[parquet]``.
+"""
+
+
+DICTIONARY_COLUMNS = ["phyname", "sourcemac", "destmac", "transmac",
+                      "devmac", "devkey", "datasource", "uuid", "type",
+                      "typestring", "interface", "header", "msgtype",
+                      "snaptype"]
+
+
+def import_pyarrow():
+    """Return the ``pyarrow`` and ``pyarrow.parquet`` modules.
+
+    Raises:
+        ImportError: pyarrow is not installed.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow. Install it with "
+                          "pip install kismetdb[parquet]")
+    return pyarrow, pyarrow.parquet
+
+
+def arrow_type_for(declared_type):
+    """Return the pyarrow type for a declared SQLite column type.
+
+    This follows SQLite's own column affinity rules.
+    """
+    pyarrow, _ = import_pyarrow()
+    declared_type = declared_type.upper()
+    if "INT" in declared_type:
+        return pyarrow.int64()
+    if "CHAR" in declared_type or "CLOB" in declared_type or \
+            "TEXT" in declared_type:
+        return pyarrow.string()
+    if "BLOB" in declared_type or not declared_type:
+        return pyarrow.binary()
+    if "REAL" in declared_type or "FLOA" in declared_type or \
+            "DOUB" in declared_type:
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+class ParquetTableWriter(object):
+    """Write rows from one abstraction to a Parquet file in row groups.
+
+    The schema is derived from the table's declared column types (see
+    ``BaseInterface.get_column_types()``), so it does not depend on the
+    data in the first rows. Columns listed in ``DICTIONARY_COLUMNS`` are
+    dictionary-encoded.
+
+    Args:
+        abstraction (BaseInterface): Abstraction rows will come from.
+        file_location (str): Path to output Parquet file.
+        include_bulk (bool): Include the bulk data field.
+        row_group_size (int): Number of rows buffered per row group.
+        json_fields (list): Extra columns, as described for
+            ``BaseInterface.parquet_json_fields``.
+
+    Attributes:
+        column_names (list): Columns written, in order.
+        num_rows (int): Number of rows written so far.
+    """
+
+    def __init__(self, abstraction, file_location, include_bulk=False,
+                 row_group_size=65536, json_fields=None):
+        self.pyarrow, self.parquet = import_pyarrow()
+        self.file_location = file_location
+        self.row_group_size = int(row_group_size)
+        column_types = abstraction.get_column_types()
+        fields = []
+        for col in abstraction.column_names:
+            if col == abstraction.bulk_data_field and not include_bulk:
+                continue
+            fields.append((col, arrow_type_for(column_types.get(col, ""))))
+        for col, default in sorted(abstraction.get_field_defaults().items()):
+            if col in abstraction.column_names:
+                continue
+            # Defaults stand in for numeric columns added in later versions
+            declared = "REAL" if isinstance(default, (int, float)) else "TEXT"
+            fields.append((col, arrow_type_for(declared)))
+        for col, _, declared in json_fields or []:
+            fields.append((col, arrow_type_for(declared)))
+        self.schema = self.pyarrow.schema(fields)
+        self.column_names = [x[0] for x in fields]
+        self.buffers = {x: [] for x in self.column_names}
+        self.buffered = 0
+        self.num_rows = 0
+        self.writer = None
+
+    def open(self):
+        """Open the output file."""
+        dictionary_columns = [x for x in self.column_names
+                              if x in DICTIONARY_COLUMNS]
+        self.writer = self.parquet.ParquetWriter(
+            self.file_location, self.schema,
+            use_dictionary=dictionary_columns)
+
+    def write(self, row):
+        """Buffer one row, writing a row group when the buffer is full."""
+        for col in self.column_names:
+            self.buffers[col].append(row.get(col))
+        self.buffered += 1
+        if self.buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows as a row group."""
+        if not self.buffered:
+            return
+        arrays = [self.pyarrow.array(self.buffers[field.name],
+                                     type=field.type)
+                  for field in self.schema]
+        table = self.pyarrow.Table.from_arrays(arrays, schema=self.schema)
+        self.writer.write_table(table, row_group_size=self.row_group_size)
+        self.num_rows += self.buffered
+        self.buffers = {x: [] for x in self.column_names}
+        self.buffered = 0
+
+    def close(self):
+        """Flush remaining rows and close the output file."""
+        if self.writer is None:
+            return
+        self.flush()
+        self.writer.close()
+        self.writer = None
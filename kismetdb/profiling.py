@@ -0,0 +1,472 @@
+"""Opt-in instrumentation of the stages rows pass through.
+
+Reading a table and exporting it moves each row through a few stages:
+the SQLite query (``query``), turning results into converted row dicts
+(``decode``), parsing and serializing JSON (``json``) and writing output
+(``write``). The library and the included scripts call ``switch()`` as
+work moves between stages, and recorders, such as ``MemoryProfile`` and
+``StageTimer``, attribute what happened in between to the stage being
+left. When no
+recorder is active, the library skips these calls entirely.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from . import metrics
+
+# Active recorders, each notified by ``switch()``.
+recorders = []
+
+default_stage = "other"
+
+# Highest resolution clock available.
+timer = getattr(time, "perf_counter", time.time)
+
+
+def switch(stage):
+    """Attribute work from now on to ``stage``."""
+    for recorder in recorders:
+        recorder.switch(stage)
+
+
+def get_switch():
+    """Return a function to call on stage switches if any recorder is
+    active, otherwise None.
+
+    Row loops call this once, so that they only pay for instrumentation
+    while it is in use.
+    """
+    if len(recorders) == 1:
+        return recorders[0].switch
+    return switch if recorders else None
+
+
+def wrap_converter(converter):
+    """Return ``converter``, wrapped to record its work as ``decode``.
+
+    SQLite calls converters while it fetches rows, so without this their
+    work would be counted as part of the query.
+    """
+    def convert(value):
+        switch("decode")
+        try:
+            return converter(value)
+        finally:
+            switch("query")
+    return convert
+
+
+def get_current_rss():
+    """Return the resident set size of this process in bytes.
+
+    Where the current size cannot be read cheaply (anywhere but Linux),
+    the peak size so far is returned instead, or None if that is not
+    available either.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        import resource
+        return pages * resource.getpagesize()
+    except (IOError, OSError, ImportError, IndexError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_bytes(value):
+    """Return a byte count in human-readable units."""
+    if value is None:
+        return "-"
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(value) < 1024:
+            return "{:.1f} {}".format(value, unit)
+        value = value / 1024.0
+    return "{:.1f} GiB".format(value)
+
+
+class MemoryProfile(object):
+    """Record Python allocations per stage, and RSS over time.
+
+    Allocations are traced with ``tracemalloc`` while the profile runs,
+    which slows Python code down considerably, so only use this to
+    investigate memory use. For each stage, the profile records how often
+    it was entered, the bytes allocated and released while in it, and the
+    peak traced memory reached while in it (on Python 3.9 and later). A
+    background thread samples RSS every ``interval`` seconds, noting the
+    stage running at the time, and takes a snapshot of the largest
+    allocation sites each time traced memory reaches a new high::
+
+        with kismetdb.profiling.MemoryProfile() as profile:
+            for row in kismetdb.Devices(log_file).yield_all():
+                ...
+        print(profile.report())
+
+    Args:
+        interval (float): Seconds between RSS samples.
+        max_samples (int): Maximum number of RSS samples kept. When
+            reached, every other sample is dropped, and the interval
+            doubled.
+        top (int): Number of allocation sites reported.
+
+    Attributes:
+        stages (dict): Statistics for each stage.
+        samples (list): Tuples of seconds since start, RSS in bytes and
+            stage name.
+        peak_traced (int): Peak memory traced by ``tracemalloc``.
+        peak_rss (int): Highest RSS sampled.
+        top_allocations (list): Tuples of allocation site, bytes and
+            number of blocks, at the highest traced memory.
+
+    Raises:
+        ImportError: ``tracemalloc`` is not available (Python 2).
+    """
+
+    def __init__(self, interval=0.1, max_samples=1000, top=10):
+        try:
+            import tracemalloc
+        except ImportError:
+            raise ImportError("Memory profiling requires Python 3.4+")
+        self.tracemalloc = tracemalloc
+        self.interval = interval
+        self.max_samples = max_samples
+        self.top = top
+        self.stages = {}
+        self.samples = []
+        self.peak_traced = 0
+        self.peak_rss = None
+        self.top_allocations = []
+        self.stage = default_stage
+        self.last_traced = 0
+        self.started_tracing = False
+        self.start_time = None
+        self.duration = None
+        self.snapshot_traced = 0
+        self.stop_event = threading.Event()
+        self.sampler = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """Start tracing allocations and sampling RSS."""
+        if not self.tracemalloc.is_tracing():
+            self.tracemalloc.start()
+            self.started_tracing = True
+        self.start_time = time.time()
+        self.last_traced = self.tracemalloc.get_traced_memory()[0]
+        self.reset_peak()
+        self.stop_event.clear()
+        self.sampler = threading.Thread(target=self.sample_loop)
+        self.sampler.daemon = True
+        self.sampler.start()
+        recorders.append(self)
+
+    def stop(self):
+        """Stop recording, and stop tracing if this profile started it."""
+        if self in recorders:
+            recorders.remove(self)
+        self.attribute()
+        self.stop_event.set()
+        if self.sampler is not None:
+            self.sampler.join()
+            self.sampler = None
+        self.sample()
+        self.duration = time.time() - self.start_time
+        if self.started_tracing:
+            self.tracemalloc.stop()
+            self.started_tracing = False
+
+    def reset_peak(self):
+        """Reset the traced peak, where ``tracemalloc`` supports it."""
+        if hasattr(self.tracemalloc, "reset_peak"):
+            self.tracemalloc.reset_peak()
+
+    def attribute(self):
+        """Attribute allocations since the last switch to the current
+        stage."""
+        current, peak = self.tracemalloc.get_traced_memory()
+        stats = self.stages.get(self.stage)
+        if stats is None:
+            stats = {"entries": 1, "allocated": 0, "released": 0, "peak": 0}
+            self.stages[self.stage] = stats
+        delta = current - self.last_traced
+        if delta > 0:
+            stats["allocated"] += delta
+        else:
+            stats["released"] -= delta
+        if peak > stats["peak"]:
+            stats["peak"] = peak
+        if peak > self.peak_traced:
+            self.peak_traced = peak
+        self.reset_peak()
+        self.last_traced = current
+
+    def switch(self, stage):
+        """Attribute allocations since the last switch to the stage being
+        left, and start recording ``stage``."""
+        if stage == self.stage:
+            return
+        self.attribute()
+        self.stage = stage
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = {"entries": 0, "allocated": 0, "released": 0, "peak": 0}
+            self.stages[stage] = stats
+        stats["entries"] += 1
+
+    def sample(self):
+        """Record RSS now, and the top allocation sites if traced memory
+        has grown by a tenth since they were last recorded."""
+        rss = get_current_rss()
+        if rss is not None and (self.peak_rss is None or
+                                rss > self.peak_rss):
+            self.peak_rss = rss
+        self.samples.append((time.time() - self.start_time, rss, self.stage))
+        if len(self.samples) > self.max_samples:
+            self.samples = self.samples[::2]
+            self.interval *= 2
+        if not self.tracemalloc.is_tracing():
+            return
+        current = self.tracemalloc.get_traced_memory()[0]
+        if current > self.snapshot_traced * 1.1:
+            self.snapshot_traced = current
+            snapshot = self.tracemalloc.take_snapshot().filter_traces([
+                self.tracemalloc.Filter(False, self.tracemalloc.__file__),
+                self.tracemalloc.Filter(False, "<frozen importlib.*")])
+            self.top_allocations = [
+                (str(x.traceback[0]), x.size, x.count)
+                for x in snapshot.statistics("lineno")[:self.top]]
+
+    def sample_loop(self):
+        """Sample until stopped."""
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def summary(self):
+        """Return the recorded statistics as a dict."""
+        return {"duration": self.duration, "peak_traced": self.peak_traced,
+                "peak_rss": self.peak_rss,
+                "stages": dict([(x, dict(y)) for x, y in
+                                list(self.stages.items())]),
+                "samples": list(self.samples),
+                "top_allocations": list(self.top_allocations)}
+
+    def report(self):
+        """Return a human-readable summary of the profile."""
+        lines = ["Memory profile ({:.1f}s): peak traced {}, peak RSS "
+                 "{}".format(self.duration or 0,
+                             format_bytes(self.peak_traced),
+                             format_bytes(self.peak_rss)),
+                 "{:<8} {:>10} {:>12} {:>12} {:>12}".format(
+                     "stage", "entries", "allocated", "released", "peak")]
+        for stage in sorted(self.stages):
+            stats = self.stages[stage]
+            if not stats["entries"] and not stats["allocated"]:
+                continue
+            lines.append("{:<8} {:>10} {:>12} {:>12} {:>12}".format(
+                stage, stats["entries"], format_bytes(stats["allocated"]),
+                format_bytes(stats["released"]),
+                format_bytes(stats["peak"]) if stats["peak"] else "-"))
+        rss = [x for x in self.samples if x[1] is not None]
+        if rss:
+            lines.append("RSS over time:")
+            step = max(1, len(rss) // 10)
+            for offset, value, stage in rss[::step]:
+                lines.append("  {:>8.2f}s {:>12} {}".format(
+                    offset, format_bytes(value), stage))
+        if self.top_allocations:
+            lines.append("Largest allocation sites at peak:")
+            for site, size, count in self.top_allocations:
+                lines.append("  {:>12} {:>8} blocks  {}".format(
+                    format_bytes(size), count, site))
+        return "\n".join(lines)
+
+
+class StageTimer(object):
+    """Record the time spent in each stage.
+
+    Time is measured at every stage switch, which costs under a
+    microsecond, so timings can be left on for full-size exports::
+
+        with kismetdb.profiling.StageTimer() as timings:
+            kismetdb.Packets(log_file).to_parquet("packets.parquet")
+        print(timings.report())
+
+    Attributes:
+        stages (dict): Seconds spent in, and number of entries into, each
+            stage.
+        duration (float): Seconds between start and stop.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.stage = default_stage
+        self.last_time = None
+        self.start_time = None
+        self.duration = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """Start timing."""
+        self.start_time = self.last_time = timer()
+        self.stages.setdefault(self.stage, {"seconds": 0.0, "entries": 1})
+        recorders.append(self)
+
+    def stop(self):
+        """Stop timing."""
+        if self in recorders:
+            recorders.remove(self)
+        now = timer()
+        self.stages[self.stage]["seconds"] += now - self.last_time
+        self.duration = now - self.start_time
+
+    def switch(self, stage):
+        """Add the time since the last switch to the stage being left, and
+        start timing ``stage``."""
+        if stage == self.stage:
+            return
+        now = timer()
+        self.stages[self.stage]["seconds"] += now - self.last_time
+        self.last_time = now
+        self.stage = stage
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = {"seconds": 0.0, "entries": 0}
+            self.stages[stage] = stats
+        stats["entries"] += 1
+
+    def summary(self):
+        """Return the recorded timings as a dict."""
+        return {"duration": self.duration,
+                "stages": dict([(x, dict(y)) for x, y in
+                                list(self.stages.items())])}
+
+    def report(self):
+        """Return a human-readable summary of the timings, slowest stage
+        first."""
+        duration = self.duration or 0
+        lines = ["Stage timings ({:.3f}s):".format(duration),
+                 "{:<8} {:>10} {:>10} {:>7}".format("stage", "entries",
+                                                     "seconds", "share")]
+        for stage, stats in sorted(list(self.stages.items()),
+                                   key=lambda x: -x[1]["seconds"]):
+            share = stats["seconds"] / duration * 100 if duration else 0
+            lines.append("{:<8} {:>10} {:>10.3f} {:>6.1f}%".format(
+                stage, stats["entries"], stats["seconds"], share))
+        return "\n".join(lines)
+
+
+class ProfileMemoryAction(argparse.Action):
+    """Set ``--profile-memory``, failing with a usage error if
+    ``tracemalloc`` is not available."""
+
+    def __init__(self, option_strings, dest, **kwargs):
+        super(ProfileMemoryAction, self).__init__(option_strings, dest,
+                                                  nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        try:
+            import tracemalloc  # NOQA
+        except ImportError:
+            parser.error("{} requires Python 3.4+".format(option_string))
+        setattr(namespace, self.dest, True)
+
+
+def add_arguments(parser):
+    """Add the profiling options shared by the included scripts."""
+    parser.add_argument("--profile-memory", action=ProfileMemoryAction,
+                        dest="profilememory", default=False,
+                        help=("Trace memory use per stage, and print a "
+                              "report to stderr when done"))
+    parser.add_argument("--timings", action="store_true", dest="timings",
+                        default=False,
+                        help=("Print the time spent in each stage (query, "
+                              "decode, json, write) to stderr when done"))
+    parser.add_argument("--profile", action="store", dest="profile",
+                        nargs="?", const="-", metavar="PSTATS_FILE",
+                        help=("Run under cProfile, and print the slowest "
+                              "functions to stderr when done. If "
+                              "PSTATS_FILE is given, the full statistics "
+                              "are saved to it"))
+    metrics.add_arguments(parser)
+
+
+class ScriptProfile(object):
+    """Run the profiles selected by a script's command-line options, and
+    report them to stderr when done. Metrics are published while running,
+    if selected, with the script's ``--out`` file reported as output.
+
+    Args:
+        options (argparse.Namespace): Parsed options, including those added
+            by ``add_arguments()``.
+    """
+
+    top_functions = 25
+
+    def __init__(self, options):
+        self.memory_profile = None
+        self.stage_timer = None
+        self.profiler = None
+        self.metrics = None
+        self.outfile = getattr(options, "outfile", None)
+        self.pstats_file = getattr(options, "profile", None)
+        if getattr(options, "profilememory", False):
+            self.memory_profile = MemoryProfile()
+        if getattr(options, "timings", False):
+            self.stage_timer = StageTimer()
+        if self.pstats_file is not None:
+            import cProfile
+            self.profiler = cProfile.Profile()
+        textfile = getattr(options, "metricstextfile", None)
+        port = getattr(options, "metricsport", None)
+        if textfile is not None or port is not None:
+            self.metrics = metrics.Metrics(
+                textfile=textfile, port=port,
+                interval=getattr(options, "metricsinterval", 10.0))
+
+    def __enter__(self):
+        if self.metrics is not None:
+            self.metrics.start()
+            if self.outfile:
+                self.metrics.add_output(self.outfile)
+        if self.memory_profile is not None:
+            self.memory_profile.start()
+        if self.stage_timer is not None:
+            self.stage_timer.start()
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.profiler is not None:
+            self.profiler.disable()
+            if self.pstats_file != "-":
+                self.profiler.dump_stats(self.pstats_file)
+            import pstats
+            stats = pstats.Stats(self.profiler, stream=sys.stderr)
+            stats.sort_stats("cumulative").print_stats(self.top_functions)
+        if self.stage_timer is not None:
+            self.stage_timer.stop()
+            sys.stderr.write(self.stage_timer.report() + "\n")
+        if self.memory_profile is not None:
+            self.memory_profile.stop()
+            sys.stderr.write(self.memory_profile.report() + "\n")
+        if self.metrics is not None:
+            self.metrics.stop()
@@ -0,0 +1,172 @@
+"""Prepared, re-executable queries."""
+
+
+class Query(object):
+    """A query compiled once and run many times on a persistent connection.
+
+    Create one with ``BaseInterface.query()``. The SQL and its parameters
+    are built when the query is created, so filter values (timestamps in
+    particular) are not parsed again on each run. Running the query with
+    new values for its filters only rebuilds the parameters, and the SQL
+    when its shape changes (for example, a list filter of a different
+    length). Because the connection is kept open, SQLite's statement cache
+    avoids re-preparing the SQL, which matters for tight polling loops.
+
+    Close the query when done with it, or use it as a context manager.
+
+    Args:
+        abstraction (BaseInterface): Abstraction the query runs against.
+        include_bulk (bool): Include the bulk data field.
+        order_by (str, list): As described for ``BaseInterface.get_all()``.
+        limit (int): Maximum number of rows to return.
+
+    Keyword args:
+        Filters, as described in the abstraction's documentation.
+
+    Attributes:
+        sql (str): Compiled SQL statement.
+        params (dict): Current parameter values.
+        column_names (list): Columns in each returned row.
+        sql_functions (dict): Python predicates ``sql`` calls, registered
+            on the query's connection.
+
+    Raises:
+        ValueError: Unknown filter, or invalid column or limit.
+    """
+
+    def __init__(self, abstraction, include_bulk=False, order_by=None,
+                 limit=None, **kwargs):
+        self.abstraction = abstraction
+        if include_bulk:
+            self.column_names = list(abstraction.column_names)
+            self.query_columns = abstraction.full_query_column_names
+        else:
+            self.column_names = [x for x in abstraction.column_names
+                                 if x != abstraction.bulk_data_field]
+            self.query_columns = abstraction.meta_query_column_names
+        self.suffix = abstraction.generate_order_and_limit(order_by, limit)
+        self.static_fields = abstraction.get_field_defaults()
+        self.filters = {}
+        self.filter_values = dict(kwargs)
+        for name, value in list(kwargs.items()):
+            self.filters[name] = self.compile_filter(name, value)
+        self.sql = None
+        self.params = None
+        self.sql_functions = {}
+        self.build()
+        self.db = None
+        self.registered_functions = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def compile_filter(self, name, value):
+        """Return tuple with the SQL partial and replacements for one
+        filter."""
+        if name not in self.abstraction.valid_kwargs and \
+                name not in self.abstraction.spatial_kwargs and \
+                name != "where":
+            err = "Invalid filter {} for table {}".format(
+                name, self.abstraction.table_name)
+            raise ValueError(err)
+        query_parts, replacements = \
+            self.abstraction.generate_parts_and_replacements({name: value})
+        return (query_parts[0], replacements)
+
+    def build(self):
+        """Assemble ``sql`` and ``params`` from the compiled filters."""
+        self.params = {}
+        query_parts = []
+        for name in sorted(self.filters):
+            query_part, replacements = self.filters[name]
+            query_parts.append(query_part)
+            self.params.update(replacements)
+        sql = "SELECT {} FROM {}".format(", ".join(self.query_columns),
+                                         self.abstraction.table_name)
+        if query_parts:
+            sql = sql + " WHERE " + " AND ".join(query_parts)
+        self.sql = sql + self.suffix
+        self.sql_functions = self.abstraction.get_sql_functions(self.sql)
+
+    def bind(self, **kwargs):
+        """Set new values for filters of this query.
+
+        Only filters given when the query was created may be changed.
+
+        Raises:
+            ValueError: Filter was not part of this query.
+        """
+        rebuild = False
+        for name, value in list(kwargs.items()):
+            if name not in self.filters:
+                err = "Filter {} is not part of this query".format(name)
+                raise ValueError(err)
+            compiled = self.compile_filter(name, value)
+            self.filter_values[name] = value
+            if compiled[0] != self.filters[name][0]:
+                rebuild = True
+            self.filters[name] = compiled
+            self.params.update(compiled[1])
+        if rebuild:
+            self.build()
+
+    def check_spatial_index(self):
+        """Recompile spatial filters if the sidecar spatial index has been
+        built, or has gone stale, since they were compiled."""
+        if not [x for x in self.filters
+                if x in self.abstraction.spatial_kwargs]:
+            return
+        if self.abstraction.uses_spatial_index(self.sql) == \
+                self.abstraction.has_spatial_index():
+            return
+        for name in self.filters:
+            if name in self.abstraction.spatial_kwargs:
+                self.filters[name] = self.compile_filter(
+                    name, self.filter_values[name])
+        self.build()
+
+    def execute(self, **kwargs):
+        """Run the query and return the ``sqlite3`` cursor.
+
+        Keyword arguments are passed to ``bind()`` first.
+        """
+        if kwargs:
+            self.bind(**kwargs)
+        if self.db is None:
+            self.check_spatial_index()
+            self.db = self.abstraction.connect(self.sql_functions,
+                                               sql=self.sql)
+            self.registered_functions = set(self.sql_functions)
+        # Predicates bound since the connection was opened
+        for name, (num_args, func) in list(self.sql_functions.items()):
+            if name not in self.registered_functions:
+                self.db.create_function(name, num_args, func)
+                self.registered_functions.add(name)
+        return self.db.execute(self.sql, self.params)
+
+    def yield_rows(self, **kwargs):
+        """Run the query, yielding one row dict at a time.
+
+        Keyword arguments are passed to ``bind()`` first.
+        """
+        for row in self.execute(**kwargs):
+            result = {x: row[x] for x in self.column_names}
+            result.update(self.static_fields)
+            yield result
+
+    def get_rows(self, **kwargs):
+        """Run the query, returning a list of row dicts.
+
+        Keyword arguments are passed to ``bind()`` first.
+        """
+        return list(self.yield_rows(**kwargs))
+
+    def close(self):
+        """Close the query's connection."""
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+            self.registered_functions = set()
@@ -0,0 +1,152 @@
+"""On-disk cache of query results, for repeated queries on archived logs."""
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+
+class ResultCache(object):
+    """Store query results on disk, keyed by log file identity and query.
+
+    Results are keyed by the log's path, size and modification time (and
+    those of its write-ahead log, if any), its DB version, and the compiled
+    SQL and replacements, so a cached result is never returned for a log
+    which has changed. Rows are stored as batches of pickled dicts, which
+    can be streamed back without loading the whole result. When the cache
+    directory grows past ``max_bytes``, the least recently used results are
+    deleted.
+
+    Enable the cache for an abstraction by setting its ``result_cache``
+    attribute::
+
+        packets = kismetdb.Packets("Kismet-20210601.kismet")
+        packets.result_cache = kismetdb.ResultCache("/var/cache/kismetdb")
+
+    Since cached results are unpickled, only use a directory which is
+    writable by trusted users.
+
+    Args:
+        directory (str): Directory to store results in. Created if needed.
+        max_bytes (int): Maximum total size of cached results.
+        batch_size (int): Number of rows pickled together.
+
+    Attributes:
+        hits (int): Number of queries answered from the cache.
+        misses (int): Number of queries which were run against the log.
+    """
+
+    file_suffix = ".rows"
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024,
+                 batch_size=1024):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.batch_size = int(batch_size)
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, abstraction, column_names, sql, replacements):
+        """Return the cache key for a query run by ``abstraction``."""
+        identity = repr((os.path.abspath(abstraction.db_file),
+                         abstraction.get_file_signature(),
+                         abstraction.db_version, abstraction.table_name,
+                         list(column_names), sql,
+                         sorted(replacements.items()),
+                         sys.version_info[:2]))
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    def get_path(self, key):
+        """Return the path of the file holding the result for ``key``."""
+        return os.path.join(self.directory, key + self.file_suffix)
+
+    def read(self, key):
+        """Return an iterator over cached rows, or None if not cached."""
+        path = self.get_path(key)
+        try:
+            cache_file = open(path, "rb")
+        except (IOError, OSError):
+            self.misses += 1
+            return None
+        os.utime(path, None)
+        self.hits += 1
+        return self.iterate_file(cache_file)
+
+    def iterate_file(self, cache_file):
+        """Yield rows from an open cache file, closing it when done."""
+        try:
+            while True:
+                try:
+                    batch = pickle.load(cache_file)
+                except EOFError:
+                    break
+                for row in batch:
+                    yield row
+        finally:
+            cache_file.close()
+
+    def write(self, key, rows):
+        """Yield ``rows``, storing them under ``key`` as they pass through.
+
+        The result is only stored if every row is consumed.
+        """
+        handle, temp_path = tempfile.mkstemp(dir=self.directory,
+                                             suffix=".tmp")
+        cache_file = os.fdopen(handle, "wb")
+        complete = False
+        try:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    pickle.dump(batch, cache_file, pickle.HIGHEST_PROTOCOL)
+                    batch = []
+                yield row
+            if batch:
+                pickle.dump(batch, cache_file, pickle.HIGHEST_PROTOCOL)
+            complete = True
+        finally:
+            cache_file.close()
+            if complete and os.path.getsize(temp_path) <= self.max_bytes:
+                path = self.get_path(key)
+                if os.path.exists(path):
+                    os.remove(path)
+                os.rename(temp_path, path)
+                self.evict()
+            else:
+                os.remove(temp_path)
+
+    def store(self, key, rows):
+        """Store a complete list of rows under ``key``."""
+        for _ in self.write(key, rows):
+            pass
+
+    def evict(self):
+        """Delete least recently used results until under ``max_bytes``."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.file_suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum([x[1] for x in entries])
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Delete every cached result."""
+        for name in os.listdir(self.directory):
+            if name.endswith(self.file_suffix):
+                os.remove(os.path.join(self.directory, name))
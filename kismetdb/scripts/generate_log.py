@@ -0,0 +1,90 @@
+"""Generate a synthetic Kismet log, for tests and benchmarks."""
+
+import argparse
+import os
+import sys
+import time
+
+from kismetdb import profiling
+from kismetdb import testing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic Kismet log "
+                                                 "generator")
+    parser.add_argument("--out", action="store", dest="outfile",
+                        help="Output (.kismet) file")
+    parser.add_argument("--db-version", action="store", dest="dbversion",
+                        type=int, default=8, choices=[4, 5, 6, 7, 8],
+                        help="Kismet DB version to generate. Defaults to 8")
+    parser.add_argument("--devices", action="store", dest="devices",
+                        type=int, default=100, help="Number of devices")
+    parser.add_argument("--packets", action="store", dest="packets",
+                        type=int, default=10000, help="Number of packets")
+    parser.add_argument("--alerts", action="store", dest="alerts", type=int,
+                        default=50, help="Number of alerts")
+    parser.add_argument("--messages", action="store", dest="messages",
+                        type=int, default=100, help="Number of messages")
+    parser.add_argument("--data", action="store", dest="data", type=int,
+                        default=100,
+                        help="Number of non-packet data records")
+    parser.add_argument("--datasources", action="store", dest="datasources",
+                        type=int, default=3, help="Number of datasources")
+    parser.add_argument("--device-json-size", action="store",
+                        dest="devicejsonsize", type=int, default=2048,
+                        help="Approximate size of each device record, in "
+                             "bytes")
+    parser.add_argument("--duplicate-rate", action="store",
+                        dest="duplicaterate", type=float, default=0.0,
+                        help="Share of packets which are seen again by "
+                             "another datasource")
+    parser.add_argument("--start-time", action="store", dest="starttime",
+                        type=int, default=1600000000,
+                        help="Time of the first record, in seconds since "
+                             "the epoch")
+    parser.add_argument("--duration", action="store", dest="duration",
+                        type=int, default=3600,
+                        help="Seconds covered by the log")
+    parser.add_argument("--seed", action="store", dest="seed", type=int,
+                        default=0, help="Random seed")
+    parser.add_argument("--overwrite", action="store_true", dest="overwrite",
+                        default=False, help="Replace the output file if it "
+                                            "exists")
+    profiling.add_arguments(parser)
+
+    results = parser.parse_args()
+
+    if results.outfile is None:
+        print("Expected --out [file]")
+        sys.exit(1)
+
+    if os.path.exists(results.outfile) and not results.overwrite:
+        print("Output file \"{}\" exists, use --overwrite to "
+              "replace it".format(results.outfile))
+        sys.exit(1)
+
+    start = time.time()
+    try:
+        with profiling.ScriptProfile(results):
+            counts = testing.generate_log(
+                results.outfile, results.dbversion, n_devices=results.devices,
+                n_packets=results.packets, n_alerts=results.alerts,
+                n_messages=results.messages, n_data=results.data,
+                n_datasources=results.datasources,
+                device_json_size=results.devicejsonsize,
+                duplicate_rate=results.duplicaterate,
+                start_time=results.starttime, duration=results.duration,
+                seed=results.seed, overwrite=results.overwrite)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    for table_name in sorted(counts):
+        print("Wrote {} rows to {}".format(counts[table_name], table_name))
+    print("Generated {} ({} bytes) in {:.1f}s".format(
+        results.outfile, os.path.getsize(results.outfile),
+        time.time() - start))
+
+
+if __name__ == "__main__":
+    main()
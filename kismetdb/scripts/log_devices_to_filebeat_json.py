@@ -6,6 +6,7 @@ import os
 import sys
 
 import kismetdb
+from kismetdb import profiling
 
 
 def main():
@@ -22,6 +23,7 @@ def main():
     parser.add_argument("--min-signal", action="store", dest="minsignal",
                         help=("Only list devices with a best signal higher "
                               "than min-signal"))
+    profiling.add_arguments(parser)
 
     results = parser.parse_args()
     query_args = {}
@@ -37,16 +39,20 @@ def main():
         query_args["strongest_signal_gt"] = results.minsignal
     logf = None
 
-    devices_abstraction = kismetdb.Devices(results.infile)
+    with profiling.ScriptProfile(results):
+        devices_abstraction = kismetdb.Devices(results.infile)
 
-    for device in [json.loads(row["device"]) for row
-                   in devices_abstraction.yield_all(**query_args)]:
-        stripped_device = strip_old_empty_trees(device)
-        if results.outfile:
-            logf = open(results.outfile, "a")
-            logf.write(json.dumps(stripped_device, sort_keys=True))
-        else:
-            print(json.dumps(stripped_device, sort_keys=True))
+        for row in devices_abstraction.yield_all(**query_args):
+            profiling.switch("json")
+            device = json.loads(row["device"])
+            stripped_device = strip_old_empty_trees(device)
+            output = json.dumps(stripped_device, sort_keys=True)
+            profiling.switch("write")
+            if results.outfile:
+                logf = open(results.outfile, "a")
+                logf.write(output)
+            else:
+                print(output)
 
 
 def strip_old_empty_trees(obj):
@@ -6,6 +6,7 @@ import os
 import sys
 
 import kismetdb
+from kismetdb import profiling
 
 
 def main():
@@ -21,6 +22,7 @@ def main():
     parser.add_argument("--min-signal", action="store", dest="minsignal",
                         help=("Only list devices with a best signal higher "
                               "than min-signal"))
+    profiling.add_arguments(parser)
 
     results = parser.parse_args()
     query_args = {}
@@ -40,17 +42,21 @@ def main():
         query_args["strongest_signal_gt"] = results.minsignal
     logf = None
 
-    devices_abstraction = kismetdb.Devices(results.infile)
-
-    devs = [row["device"] for row in devices_abstraction.get_all(**query_args)]
-
-    if results.outfile:
-        logf = open(results.outfile, "w")
-        logf.write(json.dumps(devs, sort_keys=True, indent=4,
-                              separators=(",", ": ")))
-    else:
-        print(json.dumps(devs, sort_keys=True, indent=4,
-                         separators=(",", ": ")))
+    with profiling.ScriptProfile(results):
+        devices_abstraction = kismetdb.Devices(results.infile)
+
+        devs = [row["device"]
+                for row in devices_abstraction.get_all(**query_args)]
+
+        profiling.switch("json")
+        output = json.dumps(devs, sort_keys=True, indent=4,
+                            separators=(",", ": "))
+        profiling.switch("write")
+        if results.outfile:
+            logf = open(results.outfile, "w")
+            logf.write(output)
+        else:
+            print(output)
 
 
 if __name__ == "__main__":
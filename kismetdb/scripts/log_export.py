@@ -0,0 +1,121 @@
+"""Export several outputs from a Kismet DB, reading each table only once."""
+
+import argparse
+import os
+import sys
+
+from kismetdb import export
+from kismetdb import profiling
+
+
+SINK_FORMATS = ["csv", "ndjson", "pcap", "kml", "parquet"]
+
+
+def build_sink(spec):
+    """Return a sink for a ``FORMAT:TABLE:PATH[:COLUMN=VALUE[|VALUE][,...]]``
+    specification."""
+    parts = spec.split(":", 3)
+    if len(parts) < 3 or parts[0] not in SINK_FORMATS:
+        raise ValueError("Badly-formatted sink \"{}\". Expected "
+                         "FORMAT:TABLE:PATH, where FORMAT is one of "
+                         "{}".format(spec, ", ".join(SINK_FORMATS)))
+    sink_format, table_name, outfile = parts[:3]
+    match = {}
+    # Filters are split on commas, so values (such as MAC addresses) may
+    # contain colons.
+    for part in parts[3].split(",") if len(parts) > 3 else []:
+        if "=" not in part:
+            raise ValueError("Badly-formatted sink filter \"{}\". Expected "
+                             "COLUMN=VALUE".format(part))
+        column, values = part.split("=", 1)
+        match[column] = values.split("|")
+    if sink_format == "csv":
+        return export.CSVSink(table_name, outfile, match=match)
+    elif sink_format == "ndjson":
+        return export.NDJSONSink(table_name, outfile, include_bulk=True,
+                                 match=match)
+    elif sink_format == "pcap":
+        if table_name != "packets":
+            raise ValueError("pcap sinks only support the packets table")
+        return export.PcapSink(outfile, match=match)
+    elif sink_format == "parquet":
+        return export.ParquetSink(table_name, outfile, match=match)
+    return export.KMLSink(table_name, outfile, match=match)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=("Kismet single-pass "
+                                                  "multi-output exporter"))
+    parser.add_argument("--in", action="store", dest="infile",
+                        help="Input (.kismet) file")
+    parser.add_argument("--sink", action="append", dest="sinks",
+                        metavar="FORMAT:TABLE:PATH[:COLUMN=VALUE]",
+                        help=("Add an output. FORMAT is one of {}. Optional "
+                              "COLUMN=VALUE filters (multiple values "
+                              "separated by |, multiple filters separated "
+                              "by ,) apply to this output only. May be "
+                              "repeated.".format(
+                                  ", ".join(SINK_FORMATS))))
+    parser.add_argument("--start-time", action="store", dest="starttime",
+                        help="Only export records seen after start-time")
+    parser.add_argument("--end-time", action="store", dest="endtime",
+                        help="Only export records seen before end-time")
+    profiling.add_arguments(parser)
+
+    results = parser.parse_args()
+
+    if results.infile is None:
+        print("Expected --in [file]")
+        sys.exit(1)
+
+    if not os.path.isfile(results.infile):
+        print("Could not find input file \"{}\"".format(results.infile))
+        sys.exit(1)
+
+    if not results.sinks:
+        print("Expected at least one --sink")
+        sys.exit(1)
+
+    exporter = export.Exporter(results.infile)
+    try:
+        for spec in results.sinks:
+            exporter.add_sink(build_sink(spec))
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    query_args = {}
+
+    # Each time option maps to a different filter depending on the table;
+    # only pass those that apply, and say which tables are not filtered.
+    time_options = [("--start-time", results.starttime,
+                     ["ts_sec_gt", "last_time_gt"]),
+                    ("--end-time", results.endtime,
+                     ["ts_sec_lt", "first_time_lt"])]
+    for option, value, filter_names in time_options:
+        if not value:
+            continue
+        for table_name in exporter.get_tables():
+            if not [x for x in filter_names
+                    if exporter.filter_applies(x, table_name)]:
+                sys.stderr.write("{} does not apply to {}, exporting all of "
+                                 "its rows\n".format(option, table_name))
+        filter_names = [x for x in filter_names
+                        if exporter.filter_applies(x)]
+        if not filter_names:
+            print("{} does not apply to any exported table".format(option))
+            sys.exit(1)
+        for name in filter_names:
+            query_args[name] = value
+
+    with profiling.ScriptProfile(results):
+        rows_read = exporter.run(**query_args)
+
+    for table_name, nrows in sorted(rows_read.items()):
+        print("Read {} rows from {}".format(nrows, table_name))
+    for sink in exporter.sinks:
+        print("Wrote {} rows to {}".format(sink.num_rows, sink.file_location))
+
+
+if __name__ == "__main__":
+    main()
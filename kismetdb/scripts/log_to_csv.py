@@ -6,6 +6,7 @@ import sys
 import csv
 
 import kismetdb
+from kismetdb import profiling
 
 
 def main():
@@ -16,6 +17,7 @@ def main():
                         help="Output CSV filename")
     parser.add_argument("--table", action="store", dest="srctable",
                         help="Select the table to output")
+    profiling.add_arguments(parser)
 
     results = parser.parse_args()
     replacements = {}
@@ -62,13 +64,15 @@ def main():
 
     csv_file_mode = "wb" if sys.version_info[0] < 3 else "w"
 
-    with open(results.outfile, csv_file_mode) as csvfile:
+    with profiling.ScriptProfile(results), \
+            open(results.outfile, csv_file_mode) as csvfile:
         csvWriter = csv.DictWriter(csvfile, delimiter="\t",
                                    extrasaction="ignore",
                                    fieldnames=column_names)
         nrows = 0
         csvWriter.writeheader()
         for row in table_abstraction.yield_meta():
+            profiling.switch("write")
             csvWriter.writerow(row)
             nrows = nrows + 1
             if nrows % 1000 == 0:
@@ -2,13 +2,11 @@
 
 import argparse
 import json
-import pprint
 import sys
 import re
 
-import simplekml
-
 import kismetdb
+from kismetdb import profiling
 
 
 def main():
@@ -16,7 +14,8 @@ def main():
     parser.add_argument("--in", action="store", dest="infile",
                         help="Input (.kismet) file")
     parser.add_argument("--out", action="store", dest="outfile",
-                        help="Output filename (optional)")
+                        help=("Output filename (optional). A zipped KMZ is "
+                              "written if the name ends in .kmz"))
     parser.add_argument("--start-time", action="store", dest="starttime",
                         help="Only list devices seen after given time")
     parser.add_argument("--min-signal", action="store", dest="minsignal",
@@ -30,6 +29,12 @@ def main():
     parser.add_argument("--ssid", action="store", dest="ssid",
                         help=("Only plot networks which match the SSID "
                               "(or SSID regex)"))
+    parser.add_argument("--kmz", action="store_true", dest="kmz",
+                        default=None, help="Write a zipped KMZ file")
+    parser.add_argument("--folders", action="store", dest="folders",
+                        choices=["phyname", "type"],
+                        help="Group placemarks into folders by phy or type")
+    profiling.add_arguments(parser)
 
     results = parser.parse_args()
 
@@ -39,75 +44,59 @@ def main():
         print("Expected --in [file]")
         sys.exit(1)
 
+    if results.outfile is None:
+        extension = "kmz" if results.kmz else "kml"
+        results.outfile = "{}.{}".format(results.infile, extension)
+
     if results.starttime:
         query_args["first_time_gt"] = results.starttime
 
     if results.minsignal:
         query_args["strongest_signal_gt"] = results.minsignal
 
-    kml = simplekml.Kml()
-
-    kml.document.name = results.title
-
-    num_plotted = 0
-
     devices = kismetdb.Devices(results.infile)
 
-    for device in devices.yield_all(**query_args):
-        try:
-            dev = json.loads(device["device"])
-            # Check for the SSID if we"re doing that; allow it to trip
-            # a KeyError and jump out of processing this device
+    locations = devices.yield_locations(strongest_point=results.strongest,
+                                        include_ssids=bool(results.ssid),
+                                        folder_by=results.folders,
+                                        **query_args)
+
+    with profiling.ScriptProfile(results), \
+            kismetdb.KMLWriter(results.outfile, title=results.title,
+                               kmz=results.kmz) as kml:
+        for dev in locations:
+            # Check for the SSID if we"re doing that
             if results.ssid is not None:
                 matched = False
-                for s in dev["dot11.device"]["dot11.device.advertised_ssid_map"]:  # NOQA
-                    adv_ssid = dev["dot11.device"]["dot11.device.advertised_ssid_map"][s]["dot11.advertisedssid.ssid"]  # NOQA
-                    if re.match(results.ssid, adv_ssid):
-                        matched = True
-                        break
+                profiling.switch("json")
+                try:
+                    ssid_map = json.loads(dev["advertised_ssid_map"])
+                    for s in ssid_map.values():
+                        adv_ssid = s["dot11.advertisedssid.ssid"]
+                        if re.match(results.ssid, adv_ssid):
+                            matched = True
+                            break
+                except (TypeError, KeyError, AttributeError, ValueError):
+                    pass
 
                 if not matched:
                     print("Not a match on SSID!")
                     continue
 
-            loc = None
-
-            if results.strongest:
-                loc = dev["kismet.device.base.signal"]["kismet.common.signal.peak_loc"]  # NOQA
-            else:
-                loc = dev["kismet.device.base.location"]["kismet.common.location.avg_loc"]  # NOQA
-
-            if loc == 0:
+            if dev["lat"] is None or dev["lon"] is None:
                 print("Null island...")
                 continue
 
-            mac = dev["kismet.device.base.macaddr"]
-
-            title = ""
-
-            if "kismet.device.base.name" in dev:
-                title = dev["kismet.device.base.name"]
-
-            if title == "":
-                if "dot11.device" in dev:
-                    if "dot11.device.last_beaconed_ssid" in dev["dot11.device"]:  # NOQA
-                        title = dev["dot11.device"]["dot11.device.last_beaconed_ssid"]  # NOQA
+            title = dev["name"] or dev["last_beaconed_ssid"] or dev["devmac"]
 
-            if title == "":
-                title = mac
+            folder = dev[results.folders] if results.folders else None
 
-            kml.newpoint(name=title,
-                         coords=[(loc["kismet.common.location.lon"],
-                                  loc["kismet.common.location.lat"],
-                                  loc["kismet.common.location.alt"])])
+            profiling.switch("write")
+            kml.add_point(title, dev["lon"], dev["lat"], dev["alt"],
+                          folder=folder)
 
-            num_plotted = num_plotted + 1
-        except TypeError:
-            continue
-        except KeyError:
-            continue
-    kml.save(results.outfile)
-    print("Exported {} devices to {}".format(num_plotted, results.outfile))
+    print("Exported {} devices to {}".format(kml.num_placemarks,
+                                             results.outfile))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,73 @@
+"""Export tables from the Kismet DB to Parquet."""
+
+import argparse
+import os
+import sys
+
+import kismetdb
+from kismetdb import profiling
+
+
+TABLES = {"alerts": kismetdb.Alerts,
+          "data": kismetdb.DataPackets,
+          "datasources": kismetdb.DataSources,
+          "devices": kismetdb.Devices,
+          "messages": kismetdb.Messages,
+          "packets": kismetdb.Packets,
+          "snapshots": kismetdb.Snapshots}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=("Kismet to Parquet Log "
+                                                  "Converter"))
+    parser.add_argument("--in", action="store", dest="infile",
+                        help="Input (.kismet) file")
+    parser.add_argument("--out-dir", action="store", dest="outdir",
+                        help=("Output directory (optional). Each table is "
+                              "written to TABLE.parquet in this directory. "
+                              "If omitted, files are named after the input "
+                              "file, as INFILE-TABLE.parquet"))
+    parser.add_argument("--table", action="append", dest="tables",
+                        choices=sorted(TABLES.keys()),
+                        help=("Table to export (multiple --table options "
+                              "export multiple tables). Defaults to all "
+                              "tables"))
+    parser.add_argument("--include-bulk", action="store_true",
+                        dest="includebulk", default=False,
+                        help=("Include bulk data: packet captures as binary "
+                              "and JSON records as strings"))
+    parser.add_argument("--row-group-size", action="store",
+                        dest="rowgroupsize", type=int, default=65536,
+                        help="Number of rows per Parquet row group")
+    profiling.add_arguments(parser)
+
+    results = parser.parse_args()
+
+    if results.infile is None:
+        print("Expected --in [file]")
+        sys.exit(1)
+
+    if not os.path.isfile(results.infile):
+        print("Could not find input file \"{}\"".format(results.infile))
+        sys.exit(1)
+
+    if results.outdir is not None and not os.path.isdir(results.outdir):
+        os.makedirs(results.outdir)
+
+    with profiling.ScriptProfile(results):
+        for table_name in results.tables or sorted(TABLES.keys()):
+            if results.outdir is None:
+                outfile = "{}-{}.parquet".format(results.infile, table_name)
+            else:
+                outfile = os.path.join(results.outdir,
+                                       "{}.parquet".format(table_name))
+            table_abstraction = TABLES[table_name](results.infile)
+            nrows = table_abstraction.to_parquet(
+                outfile, include_bulk=results.includebulk,
+                row_group_size=results.rowgroupsize)
+            print("Wrote {} rows from {} to {}".format(nrows, table_name,
+                                                      outfile))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import struct
 import sys
 
 import kismetdb
+from kismetdb import metrics
+from kismetdb import profiling
 
 
 def main():
@@ -61,6 +63,7 @@ def main():
                         help=("Only convert packets which are linked to the "
                               "specified device key (multiple --device-key "
                               "options will match multiple devices)"))
+    profiling.add_arguments(parser)
     results = parser.parse_args()
 
     log_to_single = True
@@ -96,43 +99,48 @@ def main():
     logf = None
     lognum = 0
 
-    packet_store = kismetdb.Packets(results.infile)
+    with profiling.ScriptProfile(results):
+        packet_store = kismetdb.Packets(results.infile)
 
-    npackets = 0
-    file_mode = "wb"
-    for result in packet_store.yield_all(**query_args):
-        if logf is None:
-            if results.silent is None:
-                print("DLT {} for all packets".format(query_args["dlt_gt"]))
-            if log_to_single:
+        npackets = 0
+        file_mode = "wb"
+        for result in packet_store.yield_all(**query_args):
+            if logf is None:
                 if results.silent is None:
-                    print("Logging to {}".format(results.outfile))
-                logf = open(results.outfile, file_mode)
-                write_pcap_header(logf, result["dlt"])
-            else:
-                if results.silent is None:
-                    print("Logging to {}-{}.pcap".format(results.outtitle,
-                                                         lognum))
-                logf = open("{}-{}.pcap".format(results.outtitle,
-                                                lognum), file_mode)
-                lognum = lognum + 1
-                print("Writing PCAP header with DLT {}".format(result["dlt"]))
-                write_pcap_header(logf, result["dlt"])
-
-        write_pcap_packet(logf, int(result["ts_sec"]), int(result["ts_usec"]),
-                          result["packet"])
-        npackets = npackets + 1
-
-        if not log_to_single:
-            if npackets % results.limitpackets == 0:
-                logf.close()
-                logf = None
-        elif results.silent is None:
-            if npackets % 1000 == 0:
-                print("Converted {} packets...".format(npackets))
-
-    if results.silent is None:
-        print("Done! Converted {} packets.".format(npackets))
+                    print("DLT {} for all packets".format(
+                        query_args["dlt_gt"]))
+                if log_to_single:
+                    if results.silent is None:
+                        print("Logging to {}".format(results.outfile))
+                    logf = open(results.outfile, file_mode)
+                    write_pcap_header(logf, result["dlt"])
+                else:
+                    if results.silent is None:
+                        print("Logging to {}-{}.pcap".format(results.outtitle,
+                                                             lognum))
+                    pcap_file = "{}-{}.pcap".format(results.outtitle, lognum)
+                    logf = open(pcap_file, file_mode)
+                    metrics.add_output(pcap_file, "packets")
+                    lognum = lognum + 1
+                    print("Writing PCAP header with DLT {}".format(
+                        result["dlt"]))
+                    write_pcap_header(logf, result["dlt"])
+
+            profiling.switch("write")
+            write_pcap_packet(logf, int(result["ts_sec"]),
+                              int(result["ts_usec"]), result["packet"])
+            npackets = npackets + 1
+
+            if not log_to_single:
+                if npackets % results.limitpackets == 0:
+                    logf.close()
+                    logf = None
+            elif results.silent is None:
+                if npackets % 1000 == 0:
+                    print("Converted {} packets...".format(npackets))
+
+        if results.silent is None:
+            print("Done! Converted {} packets.".format(npackets))
 
 
 if __name__ == "__main__":
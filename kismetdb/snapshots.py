@@ -22,6 +22,13 @@ class Snapshots(BaseInterface):
         lon_gt (str, float): Bounding minimum longitude
         lon_lt (str, float): Bounding maximum longitude
         snaptype (str): Snapshot type
+        bbox (tuple): Match snapshots located within
+            (min_lat, min_lon, max_lat, max_lon).
+        within_radius (tuple): Match snapshots located within
+            (lat, lon, meters).
+        where (Expression, callable): Match snapshots for which this
+            expression (see ``kismetdb.F``) or Python predicate (see
+            ``kismetdb.predicate()``) is true.
     """
 
     table_name = "snapshots"
@@ -43,6 +50,7 @@ class Snapshots(BaseInterface):
                         6: ["ts_sec", "ts_usec", "lat", "lon", "snaptype", "json"],
                         7: ["ts_sec", "ts_usec", "lat", "lon", "snaptype", "json"],
                         8: ["ts_sec", "ts_usec", "lat", "lon", "snaptype", "json"]}
+    location_columns = ("lat", "lon")
     valid_kwargs = {"ts_sec_gt": Utility.generate_single_tstamp_secs_gt,
                     "ts_sec_lt": Utility.generate_single_tstamp_secs_lt,
                     "lat_gt": Utility.generate_single_float_sql_gt,
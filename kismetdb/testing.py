@@ -0,0 +1,604 @@
+"""Generate synthetic Kismet logs, for tests and benchmarks.
+
+The generated logs follow the schema in each abstraction's
+``column_reference``, for DB versions 4 through 8, so every abstraction and
+script can be exercised without a real capture file. Output is fully
+determined by the arguments, including ``seed``, so a log of any size can
+be re-created exactly wherever it is needed::
+
+    from kismetdb import testing
+
+    testing.generate_log("bench.kismet", 8, n_devices=5000,
+                         n_packets=10000000, n_alerts=1000)
+
+Rows are written in batches, with journaling disabled, so the size of a
+generated log is limited only by disk space.
+"""
+import bisect
+import json
+import math
+import os
+import random
+import sqlite3
+import zlib
+
+from .alerts import Alerts
+from .base_interface import BaseInterface
+from .data_packets import DataPackets
+from .data_sources import DataSources
+from .devices import Devices
+from .messages import Messages
+from .packets import Packets
+from .snapshots import Snapshots
+from .utility import Utility
+
+abstractions = [BaseInterface, Packets, Devices, Alerts, Messages, Snapshots,
+                DataSources, DataPackets]
+
+column_types = {"alt": "REAL", "bytes_data": "INT", "datarate": "REAL",
+                "db_version": "INT", "device": "BLOB", "dlt": "INT",
+                "error": "INT", "first_time": "INT", "frequency": "REAL",
+                "hash": "INT", "heading": "REAL", "json": "BLOB",
+                "last_time": "INT", "packet": "BLOB", "packet_len": "INT",
+                "packetid": "INT", "signal": "INT", "speed": "REAL",
+                "strongest_signal": "INT", "ts_sec": "INT", "ts_usec": "INT"}
+
+latlon_columns = ["lat", "lon", "min_lat", "min_lon", "max_lat", "max_lon",
+                  "avg_lat", "avg_lon"]
+
+# Share of devices of each type, with the phy, DLT, frequencies (kHz) and
+# frame sizes used for their packets.
+device_profiles = [{"type": "Wi-Fi AP", "phyname": "IEEE802.11",
+                    "share": 0.25, "dlt": 127,
+                    "frequencies": [2412000, 2437000, 2462000, 5180000,
+                                    5745000],
+                    "packet_len": (80, 400)},
+                   {"type": "Wi-Fi Client", "phyname": "IEEE802.11",
+                    "share": 0.5, "dlt": 127,
+                    "frequencies": [2412000, 2437000, 2462000, 5180000,
+                                    5745000],
+                    "packet_len": (60, 1500)},
+                   {"type": "BTLE", "phyname": "Bluetooth", "share": 0.25,
+                    "dlt": 256, "frequencies": [2402000, 2426000, 2480000],
+                    "packet_len": (20, 60)}]
+
+datarates = [1.0, 6.0, 12.0, 24.0, 54.0, 65.0, 130.0, 300.0]
+
+alert_headers = ["APSPOOF", "BSSTIMESTAMP", "DEAUTHFLOOD", "NOCLIENTMFP",
+                 "PROBECHAN"]
+
+message_types = ["INFO", "INFO", "INFO", "LOW", "ERROR", "ALERT"]
+
+broadcast_mac = "FF:FF:FF:FF:FF:FF"
+null_mac = "00:00:00:00:00:00"
+
+
+def get_column_type(db_version, column):
+    """Return the SQLite type for a column."""
+    if column in latlon_columns:
+        return "INT" if db_version == 4 else "REAL"
+    return column_types.get(column, "TEXT")
+
+
+def create_tables(db, db_version):
+    """Create every table known to the abstractions, for ``db_version``."""
+    for abstraction in abstractions:
+        columns = ["{} {}".format(x, get_column_type(db_version, x))
+                   for x in abstraction.column_reference[db_version]]
+        db.execute("CREATE TABLE {} ({})".format(abstraction.table_name,
+                                                 ", ".join(columns)))
+
+
+def insert_rows(db, abstraction, db_version, rows, batch_size):
+    """Insert row dicts into an abstraction's table, ``batch_size`` at a
+    time.
+
+    Columns missing from a row are stored as zero, which is what Kismet
+    writes for unknown values. Returns the number of rows inserted.
+    """
+    columns = abstraction.column_reference[db_version]
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        abstraction.table_name, ", ".join(columns),
+        ", ".join(["?"] * len(columns)))
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append([row.get(x, 0) for x in columns])
+        if len(batch) >= batch_size:
+            db.executemany(sql, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def format_mac(value):
+    """Return a colon-separated MAC address for a 48-bit integer."""
+    digits = "{:012X}".format(value & 0xFFFFFFFFFFFF)
+    return ":".join([digits[x:x + 2] for x in range(0, 12, 2)])
+
+
+def format_devkey(phyname, mac):
+    """Return a devkey in the style Kismet uses."""
+    phy_key = zlib.crc32(phyname.encode("utf-8")) & 0xFFFFFFFF
+    return "{:08X}00000000_{}".format(phy_key, mac.replace(":", ""))
+
+
+class Track(object):
+    """A GPS track looping around a starting point.
+
+    Args:
+        lat (float): Latitude of the loop's center.
+        lon (float): Longitude of the loop's center.
+        radius (float): Radius of the loop, in meters.
+        period (int): Seconds taken to drive once around the loop.
+    """
+
+    def __init__(self, lat, lon, radius, period):
+        self.lat = lat
+        self.lon = lon
+        self.period = float(period)
+        self.lat_radius = radius / 111320.0
+        self.lon_radius = self.lat_radius / math.cos(math.radians(lat))
+        self.speed = 2 * math.pi * radius / self.period * 3.6
+
+    def position(self, timestamp):
+        """Return tuple with lat, lon, alt, speed (km/h) and heading."""
+        angle = 2 * math.pi * (timestamp % self.period) / self.period
+        lat = self.lat + self.lat_radius * math.sin(angle)
+        lon = self.lon + self.lon_radius * math.cos(angle)
+        alt = 1600.0 + 20.0 * math.sin(angle * 3)
+        heading = (360.0 - math.degrees(angle)) % 360.0
+        return (lat, lon, alt, self.speed, heading)
+
+
+class Device(object):
+    """A generated device, and the statistics of the packets it sent."""
+
+    def __init__(self, index, profile, mac, base_signal):
+        self.index = index
+        self.profile = profile
+        self.mac = mac
+        self.devkey = format_devkey(profile["phyname"], mac)
+        self.base_signal = base_signal
+        self.frequency = None
+        self.access_point = None
+        self.first_time = None
+        self.last_time = None
+        self.strongest_signal = -120
+        self.packets = 0
+        self.bytes_data = 0
+        self.locations = 0
+        self.sum_lat = 0.0
+        self.sum_lon = 0.0
+        self.bounds = None
+        self.peak = None
+
+    def observe(self, timestamp, signal, size, position):
+        """Update the device's statistics with one packet."""
+        if self.first_time is None:
+            self.first_time = timestamp
+        self.last_time = timestamp
+        self.packets += 1
+        self.bytes_data += size
+        if signal > self.strongest_signal:
+            self.strongest_signal = signal
+            if position is not None:
+                self.peak = position
+        if position is None:
+            return
+        lat, lon = position
+        if self.peak is None:
+            self.peak = position
+        self.locations += 1
+        self.sum_lat += lat
+        self.sum_lon += lon
+        if self.bounds is None:
+            self.bounds = [lat, lon, lat, lon]
+        else:
+            self.bounds = [min(self.bounds[0], lat), min(self.bounds[1], lon),
+                           max(self.bounds[2], lat), max(self.bounds[3], lon)]
+
+
+def make_devices(rng, n_devices):
+    """Return a list of devices, and the cumulative weights for picking
+    one to send each packet.
+
+    Weights follow a Zipf distribution, so a few devices send most
+    packets, as in real captures.
+    """
+    devices = []
+    weights = []
+    total = 0.0
+    macs = set()
+    access_points = []
+    for index in range(n_devices):
+        draw = rng.random()
+        for profile in device_profiles:
+            draw -= profile["share"]
+            if draw < 0:
+                break
+        mac = None
+        while mac is None or mac in macs:
+            mac = format_mac(rng.getrandbits(48) & 0xFCFFFFFFFFFF)
+        macs.add(mac)
+        device = Device(index, profile, mac, rng.randint(-90, -35))
+        device.frequency = rng.choice(profile["frequencies"])
+        if profile["type"] == "Wi-Fi AP":
+            access_points.append(device)
+        devices.append(device)
+        total += 1.0 / (index + 1) ** 1.1
+        weights.append(total)
+    for device in devices:
+        if device.profile["type"] == "Wi-Fi Client" and access_points:
+            device.access_point = rng.choice(access_points)
+            device.frequency = device.access_point.frequency
+    rng.shuffle(devices)
+    return devices, weights
+
+
+def make_payload_pool(rng, size=65536):
+    """Return random bytes, sliced to make packet contents."""
+    return bytes(bytearray([rng.getrandbits(8) for _ in range(size)]))
+
+
+def generate_packets(rng, db_version, devices, weights, datasources, track,
+                     start_time, duration, n_packets, gps_fix_rate,
+                     duplicate_rate):
+    """Yield packet row dicts, in time order.
+
+    A share of packets, set by ``duplicate_rate``, are copies of the
+    previous packet seen by another datasource, with the same ``hash`` and
+    ``packetid``, as Kismet logs frames seen by several sensors.
+    """
+    pool = make_payload_pool(rng)
+    step = float(duration) / max(n_packets, 1)
+    previous = None
+    packetid = 0
+    for count in range(n_packets):
+        timestamp = start_time + count * step
+        ts_sec = int(timestamp)
+        ts_usec = int((timestamp - ts_sec) * 1000000)
+        if previous is not None and len(datasources) > 1 and \
+                rng.random() < duplicate_rate:
+            row = dict(previous)
+            others = [x for x in datasources if x != previous["datasource"]]
+            row["datasource"] = rng.choice(others)
+            row["signal"] = previous["signal"] + rng.randint(-8, 8)
+            row["ts_sec"] = ts_sec
+            row["ts_usec"] = ts_usec
+            previous = None
+            yield row
+            continue
+        total = weights[-1]
+        device = devices[bisect.bisect_left(weights, rng.random() * total)]
+        profile = device.profile
+        size = rng.randint(*profile["packet_len"])
+        offset = rng.randint(0, len(pool) - size)
+        packet = pool[offset:offset + size]
+        signal = min(-10, device.base_signal + int(rng.gauss(0, 4)))
+        if rng.random() < gps_fix_rate:
+            lat, lon, alt, speed, heading = track.position(timestamp)
+            device.observe(timestamp, signal, size, (lat, lon))
+        else:
+            lat = lon = alt = speed = heading = 0
+            device.observe(timestamp, signal, size, None)
+        if profile["type"] == "Wi-Fi Client" and device.access_point:
+            destmac = transmac = device.access_point.mac
+        elif profile["phyname"] == "IEEE802.11":
+            destmac, transmac = broadcast_mac, device.mac
+        else:
+            destmac = transmac = null_mac
+        packetid += 1
+        row = {"ts_sec": ts_sec, "ts_usec": ts_usec,
+               "phyname": profile["phyname"], "sourcemac": device.mac,
+               "destmac": destmac, "transmac": transmac,
+               "frequency": device.frequency, "devkey": device.devkey,
+               "lat": lat, "lon": lon, "alt": alt, "speed": speed,
+               "heading": heading, "packet_len": size, "signal": signal,
+               "datasource": rng.choice(datasources), "dlt": profile["dlt"],
+               "packet": sqlite3.Binary(packet), "error": 0, "tags": "",
+               "datarate": rng.choice(datarates),
+               "hash": zlib.crc32(packet) & 0xFFFFFFFF, "packetid": packetid}
+        previous = row
+        yield row
+
+
+def make_location(lat, lon, alt=0.0):
+    """Return a location record, as in Kismet's device JSON."""
+    return {"kismet.common.location.lat": lat,
+            "kismet.common.location.lon": lon,
+            "kismet.common.location.alt": alt,
+            "kismet.common.location.fix": 3 if lat or lon else 0}
+
+
+def make_device_json(rng, device, device_json_size):
+    """Return the JSON record for a device, padded with history data to
+    about ``device_json_size`` bytes."""
+    profile = device.profile
+    name = ""
+    if profile["type"] == "Wi-Fi AP":
+        name = "net-{:04x}".format(rng.getrandbits(16))
+    elif profile["type"] == "BTLE" and rng.random() < 0.3:
+        name = "tag-{:04x}".format(rng.getrandbits(16))
+    record = {"kismet.device.base.key": device.devkey,
+              "kismet.device.base.macaddr": device.mac,
+              "kismet.device.base.phyname": profile["phyname"],
+              "kismet.device.base.type": profile["type"],
+              "kismet.device.base.name": name,
+              "kismet.device.base.commonname": name or device.mac,
+              "kismet.device.base.manuf": "Unknown",
+              "kismet.device.base.channel": str(device.frequency // 1000),
+              "kismet.device.base.frequency": device.frequency,
+              "kismet.device.base.first_time": int(device.first_time),
+              "kismet.device.base.last_time": int(device.last_time),
+              "kismet.device.base.packets.total": device.packets,
+              "kismet.device.base.datasize": device.bytes_data,
+              "kismet.device.base.location": 0,
+              "kismet.device.base.signal": {
+                  "kismet.common.signal.last_signal": device.base_signal,
+                  "kismet.common.signal.max_signal":
+                      device.strongest_signal,
+                  "kismet.common.signal.peak_loc": 0}}
+    if device.locations:
+        average = make_location(device.sum_lat / device.locations,
+                                device.sum_lon / device.locations)
+        record["kismet.device.base.location"] = {
+            "kismet.common.location.avg_loc": average,
+            "kismet.common.location.min_loc": make_location(
+                *device.bounds[:2]),
+            "kismet.common.location.max_loc": make_location(
+                *device.bounds[2:])}
+        record["kismet.device.base.signal"][
+            "kismet.common.signal.peak_loc"] = make_location(*device.peak)
+    if profile["phyname"] == "IEEE802.11":
+        ssid = name
+        if profile["type"] == "Wi-Fi Client" and device.access_point:
+            ssid = ""
+        record["dot11.device"] = {
+            "dot11.device.last_beaconed_ssid": ssid,
+            "dot11.device.advertised_ssid_map": {}}
+        if ssid:
+            record["dot11.device"]["dot11.device.advertised_ssid_map"] = {
+                "1": {"dot11.advertisedssid.ssid": ssid,
+                      "dot11.advertisedssid.channel":
+                          record["kismet.device.base.channel"]}}
+    padding = device_json_size - len(json.dumps(record))
+    if padding > 0:
+        record["kismet.device.base.packets.rrd"] = {
+            "kismet.common.rrd.minute_vec":
+                [rng.randint(10, 99) for _ in range(padding // 4)]}
+    return json.dumps(record, sort_keys=True).encode("utf-8")
+
+
+def generate_devices(rng, db_version, devices, start_time, duration,
+                     device_json_size):
+    """Yield device row dicts, from the statistics gathered while
+    generating packets."""
+    for device in sorted(devices, key=lambda x: x.index):
+        if device.first_time is None:
+            device.first_time = start_time + rng.random() * duration
+            device.last_time = device.first_time
+            device.strongest_signal = device.base_signal
+        row = {"first_time": int(device.first_time),
+               "last_time": int(device.last_time),
+               "devkey": device.devkey,
+               "phyname": device.profile["phyname"], "devmac": device.mac,
+               "strongest_signal": device.strongest_signal,
+               "bytes_data": device.bytes_data,
+               "type": device.profile["type"],
+               "device": sqlite3.Binary(
+                   make_device_json(rng, device, device_json_size))}
+        if device.locations:
+            row["min_lat"], row["min_lon"] = device.bounds[:2]
+            row["max_lat"], row["max_lon"] = device.bounds[2:]
+            row["avg_lat"] = device.sum_lat / device.locations
+            row["avg_lon"] = device.sum_lon / device.locations
+        if db_version == 4:
+            for column in latlon_columns:
+                if column in row:
+                    row[column] = Utility.format_latlon_as_integer(
+                        row[column])
+        yield row
+
+
+def generate_alerts(rng, devices, track, start_time, duration, n_alerts):
+    """Yield alert row dicts, in time order."""
+    candidates = [x for x in devices
+                  if x.profile["phyname"] == "IEEE802.11"] or devices
+    times = sorted([start_time + rng.random() * duration
+                    for _ in range(n_alerts)])
+    for timestamp in times:
+        device = rng.choice(candidates)
+        header = rng.choice(alert_headers)
+        lat, lon = track.position(timestamp)[:2]
+        record = {"kismet.alert.header": header,
+                  "kismet.alert.phy_name": device.profile["phyname"],
+                  "kismet.alert.timestamp": timestamp,
+                  "kismet.alert.transmitter_mac": device.mac,
+                  "kismet.alert.source_mac": device.mac,
+                  "kismet.alert.dest_mac": broadcast_mac,
+                  "kismet.alert.channel": str(device.frequency // 1000),
+                  "kismet.alert.text": "{} detected from {}".format(
+                      header, device.mac)}
+        yield {"ts_sec": int(timestamp),
+               "ts_usec": int((timestamp % 1) * 1000000),
+               "phyname": device.profile["phyname"], "devmac": device.mac,
+               "lat": lat, "lon": lon, "header": header,
+               "json": json.dumps(record, sort_keys=True)}
+
+
+def generate_messages(rng, track, start_time, duration, n_messages):
+    """Yield message row dicts, in time order."""
+    times = sorted([start_time + rng.random() * duration
+                    for _ in range(n_messages)])
+    for count, timestamp in enumerate(times):
+        lat, lon = track.position(timestamp)[:2]
+        yield {"ts_sec": int(timestamp), "lat": lat, "lon": lon,
+               "msgtype": rng.choice(message_types),
+               "message": "Synthetic message {}".format(count)}
+
+
+def generate_data(rng, track, start_time, duration, n_data):
+    """Yield non-packet data row dicts (sensor reports), in time order."""
+    times = sorted([start_time + rng.random() * duration
+                    for _ in range(n_data)])
+    sensors = [format_mac(0x0242AC000000 + x) for x in range(8)]
+    for timestamp in times:
+        lat, lon, alt, speed, heading = track.position(timestamp)
+        devmac = rng.choice(sensors)
+        record = {"model": "Acurite-Tower", "id": devmac[-5:],
+                  "temperature_C": round(rng.uniform(-10, 35), 1),
+                  "humidity": rng.randint(10, 90)}
+        yield {"ts_sec": int(timestamp),
+               "ts_usec": int((timestamp % 1) * 1000000),
+               "phyname": "RTL433", "devmac": devmac, "lat": lat,
+               "lon": lon, "alt": alt, "speed": speed, "heading": heading,
+               "datasource": "", "type": "RTL433",
+               "json": json.dumps(record, sort_keys=True)}
+
+
+def generate_datasources(datasources):
+    """Yield datasource row dicts."""
+    for index, uuid in enumerate(datasources):
+        interface = "wlan{}".format(index)
+        record = {"kismet.datasource.uuid": uuid,
+                  "kismet.datasource.interface": interface,
+                  "kismet.datasource.type_driver": {
+                      "kismet.datasource.driver.type": "linuxwifi"}}
+        yield {"uuid": uuid, "typestring": "linuxwifi",
+               "definition": interface, "name": interface,
+               "interface": interface,
+               "json": json.dumps(record, sort_keys=True)}
+
+
+def generate_snapshots(track, start_time, kismet_version):
+    """Yield the SYSTEM snapshot Kismet writes when it starts logging."""
+    lat, lon = track.position(start_time)[:2]
+    record = {"kismet.system.version": kismet_version,
+              "kismet.system.git": "synthetic",
+              "kismet.system.server_uuid":
+                  "00000000-0000-0000-0000-000000000000",
+              "kismet.system.server_name": "kismetdb-testing",
+              "kismet.system.server_location": "Synthetic",
+              "kismet.system.server_description": "Generated log",
+              "kismet.system.user": "kismet",
+              "kismet.system.timestamp.start_sec": int(start_time)}
+    yield {"ts_sec": int(start_time), "ts_usec": 0, "lat": lat, "lon": lon,
+           "snaptype": "SYSTEM", "json": json.dumps(record, sort_keys=True)}
+
+
+def to_integer_latlon(rows):
+    """Yield copies of rows with lat/lon converted to the v4 integer
+    format."""
+    for row in rows:
+        row = dict(row)
+        row["lat"] = Utility.format_latlon_as_integer(row["lat"])
+        row["lon"] = Utility.format_latlon_as_integer(row["lon"])
+        yield row
+
+
+def generate_log(path, db_version=8, n_devices=100, n_packets=10000,
+                 n_alerts=50, n_messages=100, n_data=100, n_datasources=3,
+                 device_json_size=2048, duplicate_rate=0.0,
+                 gps_fix_rate=0.9, start_time=1600000000, duration=3600,
+                 lat=39.7392, lon=-104.9903, seed=0, batch_size=10000,
+                 overwrite=False):
+    """Write a synthetic Kismet log.
+
+    Devices are picked to send each packet with a Zipf distribution, so a
+    few devices account for most packets, and a device's MAC, devkey,
+    phy and channel are the same in every packet it sends. Wi-Fi clients
+    address their packets to an access point. Packets are in time order,
+    spread evenly over ``duration``, and located along a GPS track which
+    loops around (``lat``, ``lon``); packets without a fix have a location
+    of zero. The devices table summarizes each device's packets, and
+    device JSON records are padded to about ``device_json_size`` bytes.
+
+    Args:
+        path (str): Path of the log file to write.
+        db_version (int): Kismet DB version, 4 through 8.
+        n_devices (int): Number of devices.
+        n_packets (int): Number of packets, including duplicates.
+        n_alerts (int): Number of alerts.
+        n_messages (int): Number of messages.
+        n_data (int): Number of non-packet data records.
+        n_datasources (int): Number of datasources packets are seen by.
+        device_json_size (int): Approximate size of each device's JSON.
+        duplicate_rate (float): Share of packets which are copies of the
+            previous packet, seen by another datasource.
+        gps_fix_rate (float): Share of packets with a GPS location.
+        start_time (int): Time of the first record, in seconds since the
+            epoch.
+        duration (int): Seconds covered by the log.
+        lat (float): Latitude of the center of the GPS track.
+        lon (float): Longitude of the center of the GPS track.
+        seed (int): Random seed. The same arguments always produce the
+            same log.
+        batch_size (int): Number of rows inserted at a time.
+        overwrite (bool): Replace ``path`` if it exists.
+
+    Returns:
+        dict: Number of rows written to each table.
+
+    Raises:
+        ValueError: Unsupported DB version, invalid count, or ``path``
+            exists and ``overwrite`` is not set.
+    """
+    if db_version not in Packets.column_reference:
+        err = "Unsupported DB version {}, expected one of {}".format(
+            db_version, sorted(Packets.column_reference))
+        raise ValueError(err)
+    if n_devices < 1 or n_datasources < 1:
+        raise ValueError("At least one device and datasource is required")
+    if min(n_packets, n_alerts, n_messages, n_data) < 0:
+        raise ValueError("Row counts must not be negative")
+    if os.path.exists(path):
+        if not overwrite:
+            raise ValueError("{} already exists".format(path))
+        os.remove(path)
+    rng = random.Random(seed)
+    track = Track(lat, lon, 2000.0, 900)
+    devices, weights = make_devices(rng, n_devices)
+    datasources = ["{:08X}-0000-0000-0000-{:012X}".format(
+        rng.getrandbits(32), x) for x in range(n_datasources)]
+    kismet_version = "2022.08.R1" if db_version >= 8 else "2020.12.R3"
+    integer_latlon = db_version == 4
+    counts = {}
+    db = sqlite3.connect(path)
+    try:
+        db.execute("PRAGMA journal_mode=OFF")
+        db.execute("PRAGMA synchronous=OFF")
+        create_tables(db, db_version)
+        db.execute("INSERT INTO KISMET VALUES (?, ?, ?)",
+                   (kismet_version, db_version, "kismetlog"))
+        tables = [(Packets, generate_packets(
+                      rng, db_version, devices, weights, datasources, track,
+                      start_time, duration, n_packets, gps_fix_rate,
+                      duplicate_rate)),
+                  (Alerts, generate_alerts(
+                      rng, devices, track, start_time, duration, n_alerts)),
+                  (Messages, generate_messages(
+                      rng, track, start_time, duration, n_messages)),
+                  (DataPackets, generate_data(
+                      rng, track, start_time, duration, n_data)),
+                  (DataSources, generate_datasources(datasources)),
+                  (Snapshots, generate_snapshots(
+                      track, start_time, kismet_version))]
+        for abstraction, rows in tables:
+            if integer_latlon and "lat" in abstraction.column_reference[4]:
+                rows = to_integer_latlon(rows)
+            counts[abstraction.table_name] = insert_rows(
+                db, abstraction, db_version, rows, batch_size)
+        # Devices last, since they summarize the generated packets.
+        counts[Devices.table_name] = insert_rows(
+            db, Devices, db_version,
+            generate_devices(rng, db_version, devices, start_time, duration,
+                             device_json_size),
+            batch_size)
+        db.commit()
+    finally:
+        db.close()
+    return counts
@@ -1,18 +1,55 @@
 """General utility functions that are shared between other classes."""
 import datetime
 import json
+import math
+import re
 import sys
 
-from dateutil import parser as dateparser
-
 
 class Utility(object):
+    """Helpers for building SQL and converting values.
+
+    Attributes:
+        multi_value_json_threshold (int): Multi-value filters with more
+            values than this are matched against a JSON array instead of
+            an ``OR`` chain of bound parameters.
+        timestamp_cache (dict): Epoch and ISO 8601 results of
+            ``timestamp_string_to_tuple()``, keyed by string. Emptied when
+            it reaches ``timestamp_cache_size`` entries.
+    """
+
+    multi_value_json_threshold = 3
+    timestamp_cache = {}
+    timestamp_cache_size = 4096
+    epoch_pattern = re.compile(r"^\s*(\d+)(\.\d+)?\s*$")
+    # Lengths of digit strings dateutil reads as dates (2018, 20180101,
+    # 201801011200, ...) rather than epoch seconds.
+    compact_date_lengths = [1, 2, 3, 4, 6, 8, 12, 14]
+
     @classmethod
     def timestamp_to_iso(cls, timestamp):
-        """Return an ISO-formatted timestamp for unix ``timestamp``."""
-        if not isinstance(timestamp, int):
-            raise ValueError("Integer required for timestamp conversion.")
-        return datetime.datetime.fromtimestamp(timestamp).isoformat()
+        """Return an ISO-formatted timestamp for unix ``timestamp``.
+
+        A whole column of timestamps (a list, tuple or NumPy array of
+        integers) may be passed at once, in which case a list of strings is
+        returned. Each distinct second is only formatted once, which is
+        much faster than converting values one by one, since a log has
+        many rows per second.
+        """
+        if hasattr(timestamp, "tolist"):
+            timestamp = timestamp.tolist()
+        if not isinstance(timestamp, (list, tuple)):
+            if not isinstance(timestamp, int):
+                raise ValueError("Integer required for timestamp conversion.")
+            return datetime.datetime.fromtimestamp(timestamp).isoformat()
+        formatted = {}
+        result = []
+        for value in timestamp:
+            iso = formatted.get(value)
+            if iso is None:
+                iso = formatted[value] = cls.timestamp_to_iso(value)
+            result.append(iso)
+        return result
 
     @classmethod
     def timestamp_to_dbtime(cls, timestamp):
@@ -43,6 +80,9 @@ class Utility(object):
         elif isinstance(timestamp, int):
             t_tup = (timestamp, 0)
             err = ""
+        elif isinstance(timestamp, float):
+            t_tup = cls.epoch_to_tuple(timestamp)
+            err = ""
         if err:
             raise ValueError(err)
         return t_tup
@@ -51,21 +91,42 @@ class Utility(object):
     def datetime_to_tuple(cls, timestamp):
         """Return a timestamp tuple.
 
+        Naive datetimes are taken to be UTC. Aware datetimes are converted
+        to UTC first.
+
         Args:
             timestamp (datetime.datetime): Python datetime.datetime object.
 
         Returns:
             tup: (seconds, u_seconds)
         """
-        epoch = datetime.datetime.utcfromtimestamp(0)
-        secs = str((timestamp - epoch).total_seconds())
-        seconds = int(secs.split(".")[0])
-        u_seconds = int(secs.split(".")[1]) if len(secs.split(".")) > 1 else 0
+        if timestamp.utcoffset() is not None:
+            timestamp = timestamp.replace(tzinfo=None) - timestamp.utcoffset()
+        delta = timestamp - datetime.datetime.utcfromtimestamp(0)
+        return (delta.days * 86400 + delta.seconds, delta.microseconds)
+
+    @classmethod
+    def epoch_to_tuple(cls, timestamp):
+        """Return a timestamp tuple for Unix epoch seconds (int or float)."""
+        seconds = int(math.floor(timestamp))
+        u_seconds = int(round((timestamp - seconds) * 1000000))
+        if u_seconds == 1000000:
+            seconds, u_seconds = seconds + 1, 0
         return (seconds, u_seconds)
 
     @classmethod
     def timestamp_string_to_tuple(cls, timestamp):
         """Return a timestamp tuple if possible, and a reason for failure.
+
+        Epoch seconds and ISO 8601 strings are parsed directly. Anything
+        else is parsed by ``dateutil``, which is only imported when needed.
+        Whole numbers with as many digits as a compact date (such as
+        ``20180101``) are read as dates, not epoch seconds.
+        Epoch and ISO 8601 results are memoized in ``timestamp_cache``, so
+        polling with the same time filter does not parse it again. Strings
+        parsed by ``dateutil`` are not, since relative ones (such as
+        ``"monday"``) mean a different time on another day.
+
         Args:
             timestamp (str): String-formatted timestamp.
 
@@ -75,19 +136,47 @@ class Utility(object):
                 parsing, if any. Successful parsing means that err is an
                 empty string.
         """
-        err = ""
-        ts = datetime.datetime.utcfromtimestamp(0)
-        epoch = datetime.datetime.utcfromtimestamp(0)
+        result = cls.timestamp_cache.get(timestamp)
+        if result is not None:
+            return result
+        t_tuple = cls.parse_timestamp_fast(timestamp)
+        if t_tuple is None:
+            return cls.parse_timestamp_string(timestamp)
+        if len(cls.timestamp_cache) >= cls.timestamp_cache_size:
+            cls.timestamp_cache.clear()
+        result = (t_tuple, "")
+        cls.timestamp_cache[timestamp] = result
+        return result
+
+    @classmethod
+    def parse_timestamp_fast(cls, timestamp):
+        """Return a timestamp tuple for epoch seconds or an ISO 8601
+        string, or None for anything else."""
+        epoch = cls.epoch_pattern.match(timestamp)
+        if epoch and (epoch.group(2) or len(epoch.group(1)) not in
+                      cls.compact_date_lengths):
+            return cls.epoch_to_tuple(float(timestamp))
+        try:
+            return cls.datetime_to_tuple(
+                datetime.datetime.fromisoformat(timestamp.strip()))
+        except (AttributeError, ValueError):
+            return None
+
+    @classmethod
+    def parse_timestamp_string(cls, timestamp):
+        """Parse a timestamp string, as ``timestamp_string_to_tuple()``
+        does, without memoizing the result."""
+        t_tuple = cls.parse_timestamp_fast(timestamp)
+        if t_tuple is not None:
+            return (t_tuple, "")
+        from dateutil import parser as dateparser
         try:
             ts = dateparser.parse(timestamp, fuzzy=True)
-        except ValueError as e:
+        except (ValueError, OverflowError) as e:
             err = ("Could not extract a date/time from start-time "
                    "argument: {}".format(e))
-        secs = str((ts - epoch).total_seconds())
-        seconds = int(secs.split(".")[0])
-        u_seconds = int(secs.split(".")[1]) if len(secs.split(".")) > 1 else 0
-        result = (seconds, u_seconds)
-        return (result, err)
+            return ((0, 0), err)
+        return (cls.datetime_to_tuple(ts), "")
 
     @classmethod
     def timestamp_tuple_validates(cls, timestamp):
@@ -184,10 +273,19 @@ class Utility(object):
             tuple: Item 0 contains the SQL partial string. Item 1 contains
                 the replacement dictionary.
 
+        Lists longer than ``Utility.multi_value_json_threshold`` are bound
+        as a single JSON array parameter and matched with
+        ``IN (SELECT value FROM json_each(...))``. This avoids SQLite's
+        bound-variable limit, and lets SQLite build a temporary index over
+        the values instead of evaluating a long ``OR`` chain for every row.
+
         """
         if not isinstance(filter_values, list):
             return cls.generate_single_string_sql_eq(column_name,
                                                      filter_values)
+        if len(filter_values) > cls.multi_value_json_threshold:
+            return cls.generate_multi_string_sql_in_json(column_name,
+                                                         filter_values)
         sql_parts = []
         replacement = {}
         increment = 1
@@ -199,6 +297,32 @@ class Utility(object):
         sql = "( {} )".format(" OR ".join(sql_parts))
         return (sql, replacement)
 
+    @classmethod
+    def generate_multi_string_sql_in_json(cls, column_name, filter_values,
+                                          param_name=None):
+        """Return tuple with sql and replacement.
+
+        This function builds the sql partial and replacement dict for
+        a set-membership match for any number of values against a single
+        column in the database. All values are bound as one JSON array.
+
+        Args:
+            column_name (str): Name of column in DB.
+            filter_values (list): This is what we look for in the column.
+            param_name (str): Name of the bound parameter. Defaults to
+                ``<column_name>_set``.
+
+        Returns:
+            tuple: Item 0 contains the SQL partial string. Item 1 contains
+                the replacement dictionary.
+
+        """
+        colref = param_name or "{}_set".format(column_name)
+        sql = "{} IN (SELECT value FROM json_each(:{}))".format(column_name,
+                                                                colref)
+        replacement = {colref: json.dumps([str(x) for x in filter_values])}
+        return (sql, replacement)
+
     @classmethod
     def generate_single_string_sql_includes(cls, column_name, filter_value):
         """Return tuple with sql and replacement.
@@ -456,6 +580,113 @@ class Utility(object):
         mod_filter_value = cls.timestamp_to_dbtime(filter_value)[0]
         return cls.generate_single_int_sql_eq(column_name, mod_filter_value)
 
+    @classmethod
+    def duration_to_usecs(cls, duration):
+        """Return a duration in integer microseconds.
+
+        Args:
+            duration (str, int or float): Number of seconds, or a string
+                made of a number and a unit: ``us``, ``ms``, ``s``, ``m``,
+                ``h`` or ``d`` (for example ``"100ms"`` or ``"5m"``).
+
+        Returns:
+            int: Microseconds.
+
+        Raises:
+            ValueError: Unparseable or non-positive duration.
+        """
+        units = {"us": 1, "ms": 1000, "s": 1000000, "m": 60000000,
+                 "h": 3600000000, "d": 86400000000}
+        err = ("Invalid duration {}. Expected seconds, or a number followed "
+               "by one of {}".format(duration, sorted(units.keys())))
+        if cls.is_it_a_string(duration):
+            match = re.match(r"^\s*([0-9.]+)\s*([a-z]*)\s*$", duration)
+            if not match or (match.group(2) and match.group(2) not in units):
+                raise ValueError(err)
+            unit = units[match.group(2) or "s"]
+            try:
+                result = int(float(match.group(1)) * unit)
+            except ValueError:
+                raise ValueError(err)
+        else:
+            result = int(duration * 1000000)
+        if result <= 0:
+            raise ValueError(err)
+        return result
+
+    @classmethod
+    def distance_meters(cls, lat1, lon1, lat2, lon2):
+        """Return the great-circle distance between two points, in meters.
+
+        Returns ``None`` if any coordinate is ``None``, so this can be used
+        as an SQL function on columns which may be NULL.
+        """
+        if None in (lat1, lon1, lat2, lon2):
+            return None
+        lat1, lon1, lat2, lon2 = [math.radians(float(x))
+                                  for x in (lat1, lon1, lat2, lon2)]
+        a = (math.sin((lat2 - lat1) / 2) ** 2 +
+             math.cos(lat1) * math.cos(lat2) *
+             math.sin((lon2 - lon1) / 2) ** 2)
+        return 6371008.8 * 2 * math.asin(min(1.0, math.sqrt(a)))
+
+    @classmethod
+    def lon_to_tile_x(cls, lon, zoom):
+        """Return the slippy-map tile column containing ``lon``."""
+        if lon is None:
+            return None
+        tiles = 2 ** int(zoom)
+        x = int((float(lon) + 180.0) / 360.0 * tiles)
+        return min(max(x, 0), tiles - 1)
+
+    @classmethod
+    def lat_to_tile_y(cls, lat, zoom):
+        """Return the slippy-map tile row containing ``lat``.
+
+        Latitudes beyond the Web Mercator limit (about 85.05 degrees) are
+        clamped to the first or last row.
+        """
+        if lat is None:
+            return None
+        tiles = 2 ** int(zoom)
+        lat_rad = math.radians(min(max(float(lat), -85.0511), 85.0511))
+        y = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) /
+                 math.pi) / 2.0 * tiles)
+        return min(max(y, 0), tiles - 1)
+
+    @classmethod
+    def tile_bounds(cls, x, y, zoom):
+        """Return (min_lat, min_lon, max_lat, max_lon) for a slippy-map tile.
+
+        The result can be passed as a ``bbox`` filter.
+        """
+        tiles = 2.0 ** int(zoom)
+
+        def tile_lat(row):
+            return math.degrees(math.atan(math.sinh(math.pi *
+                                                    (1 - 2 * row / tiles))))
+        return (tile_lat(y + 1), x / tiles * 360.0 - 180.0,
+                tile_lat(y), (x + 1) / tiles * 360.0 - 180.0)
+
+    @classmethod
+    def generate_json_extract(cls, column_name, path):
+        """Return SQL which extracts one value from a JSON column.
+
+        Kismet keys contain dots, so each path element is quoted. The column
+        is cast to text because Kismet stores JSON as a blob, which SQLite's
+        JSON functions refuse to read directly.
+
+        Args:
+            column_name (str): Name of column in DB containing JSON.
+            path (tuple): Nested keys leading to the value.
+
+        Returns:
+            str: SQL expression.
+        """
+        json_path = "$" + "".join(".\"{}\"".format(p) for p in path)
+        return "json_extract(CAST({} AS TEXT), '{}')".format(column_name,
+                                                             json_path)
+
     @classmethod
     def is_it_a_string(cls, target):
         """Return boolean True if target is a string, else return False."""
@@ -59,12 +59,16 @@ setup(name="kismetdb",
       keywords="kismet",
       url="https://github.com/kismetwireless/python-kismet-db",
       packages=["kismetdb", "kismetdb.scripts"],
-      install_requires=["python-dateutil", "simplekml"],
+      install_requires=["python-dateutil"],
+      extras_require={"parquet": ["pyarrow"]},
       entry_points={
           "console_scripts": [
               "kismet_log_devices_to_json = kismetdb.scripts.log_devices_to_json:main",  # NOQA
+              "kismet_log_export = kismetdb.scripts.log_export:main",
+              "kismet_log_generate = kismetdb.scripts.generate_log:main",
               "kismet_log_to_csv = kismetdb.scripts.log_to_csv:main",
               "kismet_log_to_kml = kismetdb.scripts.log_to_kml:main",
+              "kismet_log_to_parquet = kismetdb.scripts.log_to_parquet:main",  # NOQA
               "kismet_log_to_pcap = kismetdb.scripts.log_to_pcap:main",
               "kismet_log_devices_to_filebeat_json = kismetdb.scripts.log_devices_to_filebeat_json:main"]},  # NOQA
       classifiers=[
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from kismetdb import testing
+
+
+def get_test_log(tmpdir_factory, db_version, duplicate_rate=0.0):
+    """Return the path of a log of ``db_version`` to test against.
+
+    A real capture at ``tests/assets/testdata.kismet_<db_version>`` is used
+    if there is one. Otherwise a synthetic log is generated in a temporary
+    directory for the test session, so nothing is written to the source
+    tree.
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "assets", "testdata.kismet_{}".format(db_version))
+    if os.path.exists(path):
+        return path
+    path = str(tmpdir_factory.mktemp("assets").join(
+        "testdata.kismet_{}".format(db_version)))
+    testing.generate_log(path, db_version, n_devices=50, n_packets=2000,
+                         n_alerts=20, n_messages=20, n_data=20,
+                         device_json_size=1024, start_time=1600000000,
+                         duration=600, duplicate_rate=duplicate_rate)
+    return path
+
+
+@pytest.fixture(scope="session")
+def testdata_4(tmpdir_factory):
+    """Path of a version 4 log."""
+    return get_test_log(tmpdir_factory, 4)
+
+
+@pytest.fixture(scope="session")
+def testdata_5(tmpdir_factory):
+    """Path of a version 5 log."""
+    return get_test_log(tmpdir_factory, 5)
+
+
+@pytest.fixture(scope="session")
+def testdata_8(tmpdir_factory):
+    """Path of a version 8 log, with frames heard by several datasources."""
+    return get_test_log(tmpdir_factory, 8, duplicate_rate=0.2)
@@ -1,18 +1,14 @@
-import os
-
 import kismetdb
 
 
 class TestIntegrationAlerts(object):
-    def test_integration_alerts_instantiate(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_4")
+    def test_integration_alerts_instantiate(self, testdata_4):
+        test_db = testdata_4
         abstraction = kismetdb.Alerts(test_db)
         assert abstraction
 
-    def test_integration_alerts_get_all(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_4")
+    def test_integration_alerts_get_all(self, testdata_4):
+        test_db = testdata_4
         abstraction = kismetdb.Alerts(test_db)
         all_alerts = abstraction.get_all()
         assert all_alerts
@@ -20,16 +16,14 @@ class TestIntegrationAlerts(object):
             assert isinstance(alert["lat"], float)
             assert isinstance(alert["lon"], float)
 
-    def test_integration_alerts_get_all_date_filter(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_4")
+    def test_integration_alerts_get_all_date_filter(self, testdata_4):
+        test_db = testdata_4
         abstraction = kismetdb.Alerts(test_db)
         all_alerts = abstraction.get_all(ts_sec_gt="2018-01-01")
         assert all_alerts
 
-    def test_integration_alerts_get_all_date_phy_filter(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_4")
+    def test_integration_alerts_get_all_date_phy_filter(self, testdata_4):
+        test_db = testdata_4
         abstraction = kismetdb.Alerts(test_db)
         all_alerts = abstraction.get_all(ts_sec_gt="2018-01-01",
                                          phyname=["Bluetooth",
@@ -37,9 +31,8 @@ class TestIntegrationAlerts(object):
                                                   "UNKNOWN"])
         assert all_alerts
 
-    def test_integration_alerts_get_meta(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_4")
+    def test_integration_alerts_get_meta(self, testdata_4):
+        test_db = testdata_4
         abstraction = kismetdb.Alerts(test_db)
         all_alerts = abstraction.get_meta()
         assert all_alerts
@@ -6,9 +6,8 @@ import kismetdb
 
 
 class TestIntegrationBaseInterface(object):
-    def test_integration_base_interface_instantiate_success(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_4")
+    def test_integration_base_interface_instantiate_success(self, testdata_4):
+        test_db = testdata_4
         base_interface = kismetdb.BaseInterface(test_db)
         assert base_interface
 
@@ -6,9 +6,8 @@ import kismetdb
 
 
 class TestIntegrationBaseInterface(object):
-    def test_integration_base_interface_instantiate_success(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_5")
+    def test_integration_base_interface_instantiate_success(self, testdata_5):
+        test_db = testdata_5
         base_interface = kismetdb.BaseInterface(test_db)
         assert base_interface
 
@@ -0,0 +1,51 @@
+import os
+import shutil
+import sqlite3
+
+import kismetdb
+
+
+class TestIntegrationDeviceCache(object):
+    def test_integration_device_cache_get(self, testdata_5):
+        test_db = testdata_5
+        devices = kismetdb.Devices(test_db).get_meta()
+        cache = kismetdb.DeviceCache(test_db)
+        first = cache.get(devkey=devices[0]["devkey"])
+        assert isinstance(first["device"], dict)
+        assert cache.misses == 1
+        assert cache.get(devmac=devices[0]["devmac"]) is first
+        assert cache.hits == 1
+        assert cache.get(devkey="not-a-devkey") is None
+
+    def test_integration_device_cache_warm_evict(self, testdata_5):
+        test_db = testdata_5
+        devkeys = [x["devkey"] for x in kismetdb.Devices(test_db).get_meta()]
+        cache = kismetdb.DeviceCache(test_db, max_devices=2)
+        assert cache.warm(devkeys) == len(devkeys)
+        assert len(cache) == min(2, len(devkeys))
+        cache.get(devkey=devkeys[-1])
+        assert cache.misses == 0
+        cache.invalidate()
+        assert len(cache) == 0
+        assert cache.size_bytes == 0
+
+    def test_integration_device_cache_check_interval(self, testdata_5,
+                                                     tmpdir):
+        source_db = testdata_5
+        test_db = str(tmpdir.join("testdata.kismet_5"))
+        shutil.copy2(source_db, test_db)
+        devkey = kismetdb.Devices(test_db).get_meta()[0]["devkey"]
+        cache = kismetdb.DeviceCache(test_db, check_interval=None)
+        checked = kismetdb.DeviceCache(test_db, check_interval=0)
+        first = cache.get(devkey=devkey)
+        checked.get(devkey=devkey)
+        db = sqlite3.connect(test_db)
+        db.execute("UPDATE devices SET last_time = last_time + 60")
+        db.commit()
+        db.close()
+        os.utime(test_db, (0, 0))
+        assert cache.get(devkey=devkey) is first
+        assert cache.check_watermark()
+        assert len(cache) == 0
+        checked.get(devkey=devkey)
+        assert checked.misses == 2
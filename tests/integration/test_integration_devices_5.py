@@ -1,49 +1,43 @@
-import os
+import pytest
 
 import kismetdb
 
 
 class TestIntegrationDevices(object):
-    def test_integration_devices_instantiate(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_5")
+    def test_integration_devices_instantiate(self, testdata_5):
+        test_db = testdata_5
         abstraction = kismetdb.Devices(test_db)
         assert abstraction
 
-    def test_integration_devices_get_all(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_5")
+    def test_integration_devices_get_all(self, testdata_5):
+        test_db = testdata_5
         abstraction = kismetdb.Devices(test_db)
         all_alerts = abstraction.get_all()
         assert all_alerts
 
-    def test_integration_devices_get_all_date_filter(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_5")
+    def test_integration_devices_get_all_date_filter(self, testdata_5):
+        test_db = testdata_5
         abstraction = kismetdb.Devices(test_db)
         all_alerts = abstraction.get_all(first_time_gt="2018-01-01")
         assert all_alerts
 
-    def test_integration_devices_get_all_date_phy_filter(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_5")
+    def test_integration_devices_get_all_date_phy_filter(self, testdata_5):
+        test_db = testdata_5
         abstraction = kismetdb.Devices(test_db)
         all_alerts = abstraction.get_all(first_time_gt="2018-01-01",
                                          phyname=["Bluetooth",
                                                   "IEEE802.11"])
         assert all_alerts
 
-    def test_integration_devices_get_meta(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_5")
+    def test_integration_devices_get_meta(self, testdata_5):
+        test_db = testdata_5
         abstraction = kismetdb.Devices(test_db)
         all_alerts = abstraction.get_meta()
         assert all_alerts
         assert "json" not in all_alerts[0]
 
-    def test_integration_devices_yield_all_date_phy_filter(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_5")
+    def test_integration_devices_yield_all_date_phy_filter(self, testdata_5):
+        test_db = testdata_5
         abstraction = kismetdb.Devices(test_db)
         for device in abstraction.yield_meta(first_time_gt="2018-01-01",
                                              phyname=["Bluetooth",
@@ -57,10 +51,77 @@ class TestIntegrationDevices(object):
             assert isinstance(device["avg_lat"], float)
             assert isinstance(device["avg_lon"], float)
 
-    def test_integration_devices_yield_meta(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_5")
+    def test_integration_devices_yield_meta(self, testdata_5):
+        test_db = testdata_5
         abstraction = kismetdb.Devices(test_db)
         for alert in abstraction.yield_meta():
             assert alert
             assert "device" not in alert
+
+    def test_integration_devices_yield_locations(self, testdata_5):
+        test_db = testdata_5
+        abstraction = kismetdb.Devices(test_db)
+        for device in abstraction.yield_locations(folder_by="phyname"):
+            assert device
+            assert "device" not in device
+            assert device["devmac"]
+            assert "lat" in device
+            assert "lon" in device
+
+    def test_integration_devices_aggregate(self, testdata_5):
+        test_db = testdata_5
+        abstraction = kismetdb.Devices(test_db)
+        results = abstraction.aggregate(group_by=["phyname"],
+                                        metrics={"bytes": "sum:bytes_data"},
+                                        phyname=["Bluetooth", "IEEE802.11"])
+        assert results
+        assert set([x["phyname"] for x in results]) <= set(["Bluetooth",
+                                                              "IEEE802.11"])
+
+    def test_integration_devices_get_meta_large_set_filter(self, testdata_5):
+        test_db = testdata_5
+        abstraction = kismetdb.Devices(test_db)
+        macs = [x["devmac"] for x in abstraction.get_meta()]
+        padding = ["02:00:00:00:{:02X}:{:02X}".format(x >> 8, x & 0xff)
+                   for x in range(20000)]
+        devices = abstraction.get_meta(devmac=macs + padding)
+        assert len(devices) == len(macs)
+
+    def test_integration_devices_count_exists(self, testdata_5):
+        test_db = testdata_5
+        abstraction = kismetdb.Devices(test_db)
+        assert abstraction.count() == len(abstraction.get_meta())
+        filtered = abstraction.get_meta(phyname="IEEE802.11")
+        assert abstraction.count(phyname="IEEE802.11") == len(filtered)
+        assert abstraction.exists(phyname="IEEE802.11") == bool(filtered)
+        assert not abstraction.exists(devmac="not-a-mac")
+        assert abstraction.estimated_count() >= abstraction.count()
+
+    def test_integration_devices_where_expression(self, testdata_5):
+        test_db = testdata_5
+        abstraction = kismetdb.Devices(test_db)
+        devices = abstraction.get_meta()
+        expression = (kismetdb.F("type") == devices[0]["type"]) | \
+            ~(kismetdb.F("strongest_signal") <= -50)
+        expected = [x for x in devices if x["type"] == devices[0]["type"] or
+                    x["strongest_signal"] > -50]
+        assert len(abstraction.get_meta(where=expression)) == len(expected)
+        expression = kismetdb.F("devmac").isin([devices[0]["devmac"]])
+        assert abstraction.count(where=expression,
+                                 phyname=devices[0]["phyname"]) == 1
+        with pytest.raises(ValueError):
+            abstraction.get_meta(where=kismetdb.F("device") == "{}")
+
+    def test_integration_devices_where_long_isin(self, testdata_5):
+        test_db = testdata_5
+        abstraction = kismetdb.Devices(test_db)
+        devices = abstraction.get_meta()
+        # More values than SQLite allows parameters
+        macs = [x["devmac"] for x in devices[:5]] + \
+            ["not-a-mac-{}".format(x) for x in range(40000)]
+        signals = list(set([x["strongest_signal"] for x in devices[:10]]))
+        expression = kismetdb.F("devmac").isin(macs) & \
+            kismetdb.F("strongest_signal").isin(signals + [1, 2, 3])
+        expected = [x for x in devices if x["devmac"] in macs[:5] and
+                    x["strongest_signal"] in signals]
+        assert len(abstraction.get_meta(where=expression)) == len(expected)
@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+import kismetdb
+from kismetdb import export
+
+
+class TestIntegrationExport(object):
+    def test_integration_export_fan_out(self, testdata_5, tmpdir):
+        test_db = testdata_5
+        exporter = kismetdb.Exporter(test_db)
+        csv_sink = exporter.add_sink(
+            export.CSVSink("packets", str(tmpdir.join("packets.csv"))))
+        pcap_sink = exporter.add_sink(
+            export.PcapSink(str(tmpdir.join("packets.pcap"))))
+        json_sink = exporter.add_sink(
+            export.NDJSONSink("devices", str(tmpdir.join("devices.json")),
+                              include_bulk=True))
+        rows_read = exporter.run()
+        assert sorted(rows_read.keys()) == ["devices", "packets"]
+        assert csv_sink.num_rows == rows_read["packets"]
+        assert pcap_sink.num_rows <= rows_read["packets"]
+        assert json_sink.num_rows == rows_read["devices"]
+        with open(str(tmpdir.join("devices.json"))) as f:
+            for line in f:
+                assert isinstance(json.loads(line)["device"], dict)
+
+    def test_integration_export_per_sink_filter(self, testdata_5, tmpdir):
+        test_db = testdata_5
+        exporter = kismetdb.Exporter(test_db)
+        everything = exporter.add_sink(
+            export.CSVSink("devices", str(tmpdir.join("all.csv"))))
+        bluetooth = exporter.add_sink(
+            export.CSVSink("devices", str(tmpdir.join("bt.csv")),
+                           match={"phyname": "Bluetooth"}))
+        exporter.run()
+        expected = len(kismetdb.Devices(test_db).get_meta(phyname="Bluetooth"))
+        assert bluetooth.num_rows == expected
+        assert everything.num_rows >= bluetooth.num_rows
+
+    def test_integration_export_filter_applies_to_no_table(self, testdata_5,
+                                                           tmpdir):
+        test_db = testdata_5
+        exporter = kismetdb.Exporter(test_db)
+        exporter.add_sink(
+            export.CSVSink("devices", str(tmpdir.join("devices.csv"))))
+        assert exporter.filter_applies("last_time_gt")
+        assert not exporter.filter_applies("ts_sec_gt")
+        with pytest.raises(ValueError):
+            exporter.run(ts_sec_gt="2018-01-01")
+
+    def test_integration_export_script_time_filters(self, testdata_5, tmpdir,
+                                                    capsys, monkeypatch):
+        from kismetdb.scripts import log_export
+        test_db = testdata_5
+        monkeypatch.setattr("sys.argv", [
+            "kismet_log_export", "--in", test_db, "--start-time", "1000000000",
+            "--sink", "csv:packets:{}".format(tmpdir.join("packets.csv")),
+            "--sink", "csv:datasources:{}".format(
+                tmpdir.join("sources.csv"))])
+        log_export.main()
+        assert "--start-time does not apply to datasources" in \
+            capsys.readouterr().err
+        monkeypatch.setattr("sys.argv", [
+            "kismet_log_export", "--in", test_db, "--start-time", "1000000000",
+            "--sink", "csv:datasources:{}".format(
+                tmpdir.join("sources.csv"))])
+        with pytest.raises(SystemExit):
+            log_export.main()
+
+    def test_integration_export_script_sink_filters(self):
+        from kismetdb.scripts import log_export
+        sink = log_export.build_sink(
+            "pcap:packets:b.pcap:sourcemac=A8:0C:C8:F8:E3:D0|"
+            "00:11:22:33:44:55,"
+            "datasource=5FE308BD-0000-0000-0000-00C0CA9B7D0B")
+        assert sink.match["sourcemac"] == set(["A8:0C:C8:F8:E3:D0",
+                                               "00:11:22:33:44:55"])
+        assert sink.match["datasource"] == set(
+            ["5FE308BD-0000-0000-0000-00C0CA9B7D0B"])
+        with pytest.raises(ValueError):
+            log_export.build_sink("csv:packets:out.csv:sourcemac")
+
+    def test_integration_export_match_integer_column(self, testdata_5,
+                                                     tmpdir):
+        from kismetdb.scripts import log_export
+        packets = kismetdb.Packets(testdata_5).get_meta()
+        dlt = packets[0]["dlt"]
+        exporter = kismetdb.Exporter(testdata_5)
+        sink = exporter.add_sink(log_export.build_sink(
+            "csv:packets:{}:dlt={}".format(tmpdir.join("out.csv"), dlt)))
+        typed = exporter.add_sink(export.CSVSink(
+            "packets", str(tmpdir.join("typed.csv")), match={"dlt": dlt}))
+        exporter.run()
+        expected = len([x for x in packets if x["dlt"] == dlt])
+        assert expected
+        assert sink.num_rows == expected
+        assert typed.num_rows == expected
+
+    def test_integration_export_filters_checked_first(self, testdata_5,
+                                                      tmpdir):
+        packets = kismetdb.Packets(testdata_5)
+        located = [x for x in packets.get_meta() if x["lat"] or x["lon"]]
+        lat, lon = located[0]["lat"], located[0]["lon"]
+        bbox = (lat - 0.01, lon - 0.01, lat + 0.01, lon + 0.01)
+        exporter = kismetdb.Exporter(testdata_5)
+        packets_sink = exporter.add_sink(
+            export.CSVSink("packets", str(tmpdir.join("packets.csv"))))
+        sources_sink = exporter.add_sink(
+            export.CSVSink("datasources", str(tmpdir.join("sources.csv"))))
+        assert not exporter.filter_applies("bbox", "datasources")
+        rows_read = exporter.run(bbox=bbox)
+        assert packets_sink.num_rows == len(packets.get_meta(bbox=bbox))
+        assert sources_sink.num_rows == rows_read["datasources"]
+        assert sources_sink.num_rows == len(
+            kismetdb.DataSources(testdata_5).get_meta())
+        exporter = kismetdb.Exporter(testdata_5)
+        exporter.add_sink(
+            export.CSVSink("packets", str(tmpdir.join("signal.csv"))))
+        exporter.add_sink(
+            export.CSVSink("datasources", str(tmpdir.join("none.csv"))))
+        with pytest.raises(ValueError):
+            exporter.run(where=kismetdb.F("signal") < -50)
+        assert not tmpdir.join("signal.csv").exists()
+        assert not tmpdir.join("none.csv").exists()
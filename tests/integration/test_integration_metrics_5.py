@@ -0,0 +1,99 @@
+import os
+import socket
+
+import pytest
+
+import kismetdb
+from kismetdb import metrics
+
+
+class TestIntegrationMetrics(object):
+    def test_integration_metrics_rows_and_lag(self, testdata_5):
+        test_db = testdata_5
+        devices = kismetdb.Devices(test_db)
+        packets = kismetdb.Packets(test_db)
+        assert metrics.get_table_metrics(devices) is None
+        with metrics.Metrics(interval=60) as progress:
+            ndevices = len(list(devices.yield_meta()))
+            npackets = len(packets.get_meta())
+        assert metrics.active is None
+        assert progress.tables["devices"].rows == ndevices
+        assert progress.tables["packets"].rows == npackets
+        assert progress.tables["devices"].time_column == "last_time"
+        assert progress.tables["packets"].time_column == "ts_sec"
+        rendered = progress.render()
+        assert "kismetdb_rows_read_total{{table=\"devices\"}} {}".format(
+            ndevices) in rendered
+        assert "kismetdb_errors_total{table=\"packets\"} 0" in rendered
+        assert "kismetdb_lag_seconds{table=\"packets\"}" in rendered
+
+    def test_integration_metrics_errors(self, testdata_5):
+        test_db = testdata_5
+        abstraction = kismetdb.Alerts(test_db)
+        with metrics.Metrics(interval=60) as progress:
+            with pytest.raises(Exception):
+                abstraction.get_rows(["ts_sec"], "SELECT nope FROM alerts",
+                                     {})
+            with pytest.raises(ValueError):
+                metrics.Metrics().start()
+        assert progress.tables["alerts"].errors == 1
+
+    def test_integration_metrics_port_in_use(self):
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1)
+        try:
+            with pytest.raises(socket.error):
+                metrics.Metrics(port=listener.getsockname()[1]).start()
+            assert metrics.active is None
+        finally:
+            listener.close()
+        with metrics.Metrics(interval=60) as progress:
+            assert metrics.active is progress
+
+    def test_integration_metrics_exporter_textfile(self, testdata_5, tmpdir):
+        test_db = testdata_5
+        textfile = str(tmpdir.join("kismetdb.prom"))
+        outfile = str(tmpdir.join("packets.json"))
+        exporter = kismetdb.Exporter(test_db)
+        exporter.add_sink(kismetdb.export.NDJSONSink("packets", outfile))
+        with metrics.Metrics(textfile=textfile, labels={"job": "test"}):
+            rows_read = exporter.run()
+        with open(textfile) as f:
+            published = f.read()
+        assert ("kismetdb_rows_read_total{{job=\"test\",table=\"packets\"}} "
+                "{}".format(rows_read["packets"])) in published
+        assert ("kismetdb_bytes_written_total{{job=\"test\",output=\"{}\","
+                "table=\"packets\"}} {}".format(
+                    outfile, os.path.getsize(outfile))) in published
+        assert not [x for x in tmpdir.listdir() if x.ext == ".tmp"]
+
+    def test_integration_metrics_http(self, testdata_5):
+        try:
+            from urllib.request import urlopen
+        except ImportError:
+            from urllib2 import urlopen
+        test_db = testdata_5
+        with metrics.Metrics(port=0) as progress:
+            nrows = len(kismetdb.Messages(test_db).get_meta())
+            response = urlopen("http://127.0.0.1:{}/metrics".format(
+                progress.port))
+            body = response.read().decode("utf-8")
+        assert "kismetdb_rows_read_total{{table=\"messages\"}} {}".format(
+            nrows) in body
+
+    def test_integration_metrics_script_options(self, testdata_5, tmpdir,
+                                                monkeypatch):
+        from kismetdb.scripts import log_to_csv
+        test_db = testdata_5
+        textfile = str(tmpdir.join("kismetdb.prom"))
+        outfile = str(tmpdir.join("packets.csv"))
+        monkeypatch.setattr("sys.argv", [
+            "kismet_log_to_csv", "--in", test_db, "--table", "packets",
+            "--out", outfile, "--metrics-textfile", textfile])
+        log_to_csv.main()
+        with open(textfile) as f:
+            published = f.read()
+        assert "kismetdb_rows_read_total{table=\"packets\"}" in published
+        assert "kismetdb_bytes_written_total{{output=\"{}\"}} {}".format(
+            outfile, os.path.getsize(outfile)) in published
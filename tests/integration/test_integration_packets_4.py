@@ -1,18 +1,20 @@
 import os
+import shutil
+import sqlite3
+
+import pytest
 
 import kismetdb
 
 
 class TestIntegrationPackets(object):
-    def test_integration_packets_instantiate(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_4")
+    def test_integration_packets_instantiate(self, testdata_4):
+        test_db = testdata_4
         abstraction = kismetdb.Packets(test_db)
         assert abstraction
 
-    def test_integration_packets_yield_all_date_phy_filter(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_4")
+    def test_integration_packets_yield_all_date_phy_filter(self, testdata_4):
+        test_db = testdata_4
         abstraction = kismetdb.Packets(test_db)
         for packet in abstraction.yield_meta(first_time_gt="2018-01-01"):
             assert packet
@@ -23,9 +25,8 @@ class TestIntegrationPackets(object):
             assert isinstance(packet["lat"], float)
             assert isinstance(packet["lon"], float)
 
-    def test_integration_packets_yield_meta(self):
-        here_dir = os.path.dirname(os.path.abspath(__file__))
-        test_db = os.path.join(here_dir, "../assets/testdata.kismet_4")
+    def test_integration_packets_yield_meta(self, testdata_4):
+        test_db = testdata_4
         abstraction = kismetdb.Packets(test_db)
         for packet in abstraction.yield_meta():
             assert packet
@@ -36,3 +37,307 @@ class TestIntegrationPackets(object):
             assert packet["ts_sec"] != 0
             assert isinstance(packet["lat"], float)
             assert isinstance(packet["lon"], float)
+
+    def test_integration_packets_aggregate(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        results = abstraction.aggregate(group_by="datasource",
+                                        metrics={"n": "count",
+                                                 "sig": "max:signal",
+                                                 "lat": "max:lat"})
+        assert results
+        assert sum([x["n"] for x in results]) == len(abstraction.get_meta())
+        for result in results:
+            assert result["datasource"]
+            assert isinstance(result["lat"], float)
+
+    def test_integration_packets_aggregate_invalid_column(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        with pytest.raises(ValueError):
+            abstraction.aggregate(group_by="packet")
+        with pytest.raises(ValueError):
+            abstraction.aggregate(metrics={"n": "median:signal"})
+
+    def test_integration_packets_time_histogram(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        results = abstraction.time_histogram(bucket="1m", by="datasource")
+        assert results
+        assert sum([x[2] for x in results]) == len(abstraction.get_meta())
+        for bucket_start, _, _ in results:
+            assert bucket_start % 60 == 0
+
+    def test_integration_packets_spatial_index(self, testdata_4, tmpdir):
+        source_db = testdata_4
+        test_db = str(tmpdir.join("testdata.kismet_4"))
+        shutil.copy2(source_db, test_db)
+        abstraction = kismetdb.Packets(test_db)
+        located = [x for x in abstraction.get_meta()
+                   if x["lat"] != 0 or x["lon"] != 0]
+        if not located:
+            pytest.skip("No located packets in test data")
+        lat, lon = located[0]["lat"], located[0]["lon"]
+        bbox = (lat - 0.5, lon - 0.5, lat + 0.5, lon + 0.5)
+        scanned = abstraction.get_meta(bbox=bbox)
+        assert scanned
+        for packet in scanned:
+            assert bbox[0] <= packet["lat"] <= bbox[2]
+            assert bbox[1] <= packet["lon"] <= bbox[3]
+        assert abstraction.build_spatial_index() == len(located)
+        assert abstraction.has_spatial_index()
+        assert len(abstraction.get_meta(bbox=bbox)) == len(scanned)
+        nearby = abstraction.get_meta(within_radius=(lat, lon, 1000))
+        assert nearby
+        for packet in nearby:
+            distance = kismetdb.Utility.distance_meters(lat, lon,
+                                                        packet["lat"],
+                                                        packet["lon"])
+            assert distance <= 1000
+
+    def test_integration_packets_query_stale_spatial_index(self, testdata_4,
+                                                           tmpdir):
+        test_db = str(tmpdir.join("testdata.kismet_4"))
+        shutil.copy2(testdata_4, test_db)
+        abstraction = kismetdb.Packets(test_db)
+        located = [x for x in abstraction.get_meta()
+                   if x["lat"] != 0 or x["lon"] != 0]
+        if not located:
+            pytest.skip("No located packets in test data")
+        lat, lon = located[0]["lat"], located[0]["lon"]
+        bbox = (lat - 0.5, lon - 0.5, lat + 0.5, lon + 0.5)
+        expected = len(abstraction.get_meta(bbox=bbox))
+        abstraction.build_spatial_index()
+        query = abstraction.query(bbox=bbox)
+        assert abstraction.uses_spatial_index(query.sql)
+        assert len(query.get_rows()) == expected
+        query.close()
+        # The log changing makes the index stale
+        os.utime(test_db, (0, 0))
+        assert not abstraction.has_spatial_index()
+        assert len(query.get_rows()) == expected
+        assert not abstraction.uses_spatial_index(query.sql)
+        query.close()
+        abstraction.build_spatial_index()
+        assert len(query.get_rows()) == expected
+        assert abstraction.uses_spatial_index(query.sql)
+        query.close()
+
+    def test_integration_packets_bbox_and_within_radius(self, testdata_4,
+                                                        tmpdir):
+        source_db = testdata_4
+        test_db = str(tmpdir.join("testdata.kismet_4"))
+        shutil.copy2(source_db, test_db)
+        abstraction = kismetdb.Packets(test_db)
+        located = [x for x in abstraction.get_meta()
+                   if x["lat"] != 0 or x["lon"] != 0]
+        if not located:
+            pytest.skip("No located packets in test data")
+        lat, lon = located[0]["lat"], located[0]["lon"]
+        bbox = (lat, lon, lat + 0.5, lon + 0.5)
+        radius = (lat, lon, 100000)
+        by_bbox = abstraction.get_meta(bbox=bbox)
+        by_radius = abstraction.get_meta(within_radius=radius)
+        both = abstraction.get_meta(bbox=bbox, within_radius=radius)
+        expected = [x for x in by_radius
+                    if bbox[0] <= x["lat"] <= bbox[2] and
+                    bbox[1] <= x["lon"] <= bbox[3]]
+        assert len(both) == len(expected)
+        assert len(both) <= len(by_bbox)
+        for packet in both:
+            assert bbox[0] <= packet["lat"] <= bbox[2]
+            assert bbox[1] <= packet["lon"] <= bbox[3]
+            distance = kismetdb.Utility.distance_meters(lat, lon,
+                                                        packet["lat"],
+                                                        packet["lon"])
+            assert distance <= radius[2]
+        abstraction.build_spatial_index()
+        assert len(abstraction.get_meta(bbox=bbox,
+                                        within_radius=radius)) == len(both)
+
+    def test_integration_packets_unlocated_not_matched(self, testdata_4,
+                                                       tmpdir):
+        source_db = testdata_4
+        test_db = str(tmpdir.join("testdata.kismet_4"))
+        shutil.copy2(source_db, test_db)
+        abstraction = kismetdb.Packets(test_db)
+        unlocated = [x for x in abstraction.get_meta()
+                     if x["lat"] == 0 and x["lon"] == 0]
+        if not unlocated:
+            pytest.skip("No unlocated packets in test data")
+        bbox = (-1, -1, 1, 1)
+        scanned = abstraction.get_meta(bbox=bbox)
+        abstraction.build_spatial_index()
+        assert abstraction.get_meta(bbox=bbox) == scanned
+        for packet in scanned:
+            assert packet["lat"] != 0 or packet["lon"] != 0
+
+    def test_integration_packets_aggregate_tiles(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        located = [x for x in abstraction.get_meta()
+                   if x["lat"] != 0 or x["lon"] != 0]
+        tiles = abstraction.aggregate_tiles(8)
+        assert sum([x[2] for x in tiles]) == len(located)
+        for tile_x, tile_y, count in tiles:
+            bbox = kismetdb.Utility.tile_bounds(tile_x, tile_y, 8)
+            assert len(abstraction.get_meta(bbox=bbox)) == count
+        signals = abstraction.aggregate_tiles(8, metric="max_signal")
+        assert [x[:2] for x in signals] == [x[:2] for x in tiles]
+        with pytest.raises(ValueError):
+            abstraction.aggregate_tiles(8, metric="min_signal")
+
+    def test_integration_packets_order_by_limit(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        results = abstraction.get_meta(order_by="-signal", limit=3)
+        assert len(results) <= 3
+        signals = [x["signal"] for x in results]
+        assert signals == sorted(signals, reverse=True)
+        with pytest.raises(ValueError):
+            abstraction.get_meta(order_by="packet")
+
+    def test_integration_packets_page(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        order_by = ["ts_sec", "ts_usec"]
+        results = []
+        rows, cursor = abstraction.page(7, order_by=order_by)
+        results.extend(rows)
+        while cursor is not None:
+            assert len(rows) == 7
+            rows, cursor = abstraction.page(7, cursor=cursor,
+                                            order_by=order_by)
+            results.extend(rows)
+        assert len(results) == abstraction.count()
+        timestamps = [(x["ts_sec"], x["ts_usec"]) for x in results]
+        assert timestamps == sorted(timestamps)
+        with pytest.raises(ValueError):
+            abstraction.page(7, cursor="not-a-cursor")
+
+    def test_integration_packets_top_k(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        signals = sorted([x["signal"] for x in abstraction.get_meta()],
+                         reverse=True)
+        results = abstraction.top_k("signal", 5)
+        assert [x["signal"] for x in results] == signals[:5]
+        per_source = abstraction.top_k("signal", 2, by="datasource")
+        for datasource in set([x["datasource"] for x in per_source]):
+            expected = sorted([x["signal"] for x in abstraction.get_meta(
+                datasource=datasource)], reverse=True)[:2]
+            assert [x["signal"] for x in per_source
+                    if x["datasource"] == datasource] == expected
+
+    def test_integration_packets_distinct_cardinality(self, testdata_4,
+                                                      tmpdir):
+        source_db = testdata_4
+        test_db = str(tmpdir.join("testdata.kismet_4"))
+        shutil.copy2(source_db, test_db)
+        abstraction = kismetdb.Packets(test_db)
+        datasources = sorted(set([x["datasource"]
+                                  for x in abstraction.get_meta()]))
+        assert abstraction.distinct("datasource") == datasources
+        assert abstraction.cardinality("datasource") == len(datasources)
+        db = sqlite3.connect(test_db)
+        db.execute("UPDATE packets SET datasource = 'zzz' WHERE rowid = 1")
+        db.commit()
+        db.close()
+        os.utime(test_db, (0, 0))
+        assert abstraction.distinct("datasource")[-1] == "zzz"
+        with pytest.raises(ValueError):
+            abstraction.distinct("packet")
+
+    def test_integration_packets_distinct_predicate(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        signals = sorted(set([x["signal"] for x in abstraction.get_meta()]))
+        for threshold in [signals[0], signals[-1]]:
+            assert abstraction.distinct(
+                "signal", where=lambda signal: signal <= threshold) == [
+                    x for x in signals if x <= threshold]
+
+    def test_integration_packets_distinct_expression(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        signals = sorted(set([x["signal"] for x in abstraction.get_meta()]))
+        results = []
+        for threshold in signals:
+            result = abstraction.distinct(
+                "signal", where=kismetdb.F("signal") <= threshold)
+            assert result == [x for x in signals if x <= threshold]
+            results.append(result)
+        assert results[0] != results[-1]
+
+    def test_integration_packets_dedupe_requires_hash(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        with pytest.raises(ValueError):
+            abstraction.dedupe()
+        with pytest.raises(ValueError):
+            list(abstraction.group_by_hash())
+
+    def test_integration_packets_query(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        datasources = abstraction.distinct("datasource")
+        with abstraction.query(datasource=datasources[0]) as query:
+            assert query.params == {"datasource": datasources[0]}
+            assert query.get_rows() == abstraction.get_meta(
+                datasource=datasources[0])
+            sql = query.sql
+            rows = query.get_rows(datasource=datasources[-1])
+            assert query.sql == sql
+            assert rows == abstraction.get_meta(datasource=datasources[-1])
+            with pytest.raises(ValueError):
+                query.bind(devkey="not-in-query")
+        with pytest.raises(ValueError):
+            abstraction.query(not_a_filter=1)
+
+    def test_integration_packets_query_rebind_predicate(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        packets = abstraction.get_meta()
+        with abstraction.query(where=lambda signal: signal > -60) as query:
+            assert len(query.get_rows()) == len(
+                [x for x in packets if x["signal"] > -60])
+            rows = query.get_rows(where=lambda signal: signal <= -60)
+            assert len(rows) == len([x for x in packets
+                                     if x["signal"] <= -60])
+            assert len(query.sql_functions) == 1
+
+    def test_integration_packets_query_keeps_predicates(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        expected = len([x for x in abstraction.get_meta()
+                        if x["signal"] > -60])
+        query = abstraction.query(where=lambda signal: signal > -60)
+        sql = query.sql
+        for i in range(abstraction.sql_functions_size + 1):
+            abstraction.count(where=lambda signal: signal > i)
+        assert len(abstraction.sql_functions) == \
+            abstraction.sql_functions_size
+        assert abstraction.get_sql_functions(sql) == {}
+        with query:
+            assert len(query.get_rows()) == expected
+
+    def test_integration_packets_where_predicate(self, testdata_4):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        packets = abstraction.get_meta()
+        datasource = packets[0]["datasource"]
+        expected = [x for x in packets
+                    if x["datasource"] == datasource and x["signal"] > -60]
+        results = abstraction.get_all(
+            where=lambda datasource, signal: signal > -60 and
+            datasource == packets[0]["datasource"])
+        assert len(results) == len(expected)
+        assert "packet" in results[0]
+
+        @kismetdb.predicate("lat")
+        def north(latitude):
+            return latitude > expected[0]["lat"]
+        assert abstraction.count(where=north) == len(
+            [x for x in packets if x["lat"] > expected[0]["lat"]])
+        with pytest.raises(ValueError):
+            abstraction.get_meta(where=lambda not_a_column: True)
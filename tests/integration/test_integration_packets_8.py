@@ -0,0 +1,34 @@
+import shutil
+import sqlite3
+
+import kismetdb
+
+
+class TestIntegrationPackets(object):
+    def test_integration_packets_dedupe(self, testdata_8, tmpdir):
+        source_db = testdata_8
+        test_db = str(tmpdir.join("testdata.kismet_8"))
+        shutil.copy2(source_db, test_db)
+        abstraction = kismetdb.Packets(test_db)
+        packets = abstraction.get_meta()
+        frames = list(abstraction.group_by_hash(min_observations=2))
+        assert frames
+        frame = frames[0]
+        copies = abstraction.get_meta(packetid=frame["packetid"])
+        assert len(set([x["datasource"] for x in copies])) == 2
+        assert len(abstraction.dedupe()) == len(packets) - len(frames)
+        # The same frame, sent again a minute later
+        db = sqlite3.connect(test_db)
+        db.execute("INSERT INTO packets SELECT ts_sec + 60, ts_usec, phyname, "
+                   "sourcemac, destmac, transmac, frequency, devkey, lat, "
+                   "lon, alt, speed, heading, packet_len, signal, datasource, "
+                   "dlt, packet, error, tags, datarate, hash, ? FROM packets "
+                   "WHERE packetid = ? LIMIT 1",
+                   (packets[-1]["packetid"] + 1, frame["packetid"]))
+        db.commit()
+        db.close()
+        unique = abstraction.dedupe(hash=frame["hash"])
+        assert len(unique) == 2
+        assert unique[1]["ts_sec"] == copies[0]["ts_sec"] + 60
+        assert [len(x["observations"]) for x in abstraction.group_by_hash(
+            hash=frame["hash"])] == [2, 1]
@@ -0,0 +1,29 @@
+import pytest
+
+import kismetdb
+
+
+class TestIntegrationParquet(object):
+    def test_integration_parquet_packets_meta(self, testdata_5, tmpdir):
+        pq = pytest.importorskip("pyarrow.parquet")
+        test_db = testdata_5
+        abstraction = kismetdb.Packets(test_db)
+        outfile = str(tmpdir.join("packets.parquet"))
+        nrows = abstraction.to_parquet(outfile, row_group_size=16)
+        assert nrows == len(abstraction.get_meta())
+        parquet_file = pq.ParquetFile(outfile)
+        assert parquet_file.metadata.num_rows == nrows
+        assert "packet" not in parquet_file.schema_arrow.names
+        if nrows > 16:
+            assert parquet_file.metadata.num_row_groups > 1
+
+    def test_integration_parquet_devices_json_fields(self, testdata_5, tmpdir):
+        pq = pytest.importorskip("pyarrow.parquet")
+        test_db = testdata_5
+        abstraction = kismetdb.Devices(test_db)
+        outfile = str(tmpdir.join("devices.parquet"))
+        nrows = abstraction.to_parquet(outfile, include_bulk=True)
+        table = pq.read_table(outfile)
+        assert table.num_rows == nrows
+        for field in ["device", "name", "last_beaconed_ssid", "devmac"]:
+            assert field in table.schema.names
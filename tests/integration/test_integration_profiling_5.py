@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+
+import pytest
+
+import kismetdb
+from kismetdb import profiling
+
+
+class TestIntegrationProfiling(object):
+    def test_integration_profiling_memory_profile(self, testdata_5):
+        test_db = testdata_5
+        abstraction = kismetdb.Devices(test_db)
+        with profiling.MemoryProfile(interval=0.01) as profile:
+            for row in abstraction.yield_all():
+                profiling.switch("json")
+                json.loads(row["device"])
+        assert not profiling.recorders
+        summary = profile.summary()
+        assert summary["peak_traced"] > 0
+        assert summary["samples"]
+        nrows = len(abstraction.get_meta())
+        assert summary["stages"]["json"]["entries"] == nrows
+        assert summary["stages"]["decode"]["entries"] >= nrows
+        assert summary["stages"]["query"]["allocated"] > 0
+        report = profile.report()
+        for stage in ["query", "decode", "json"]:
+            assert stage in report
+
+    def test_integration_profiling_no_recorder(self, testdata_5):
+        test_db = testdata_5
+        abstraction = kismetdb.Devices(test_db)
+        assert profiling.get_switch() is None
+        assert abstraction.get_all() == list(abstraction.yield_all())
+
+    def test_integration_profiling_stage_timer(self, testdata_5):
+        test_db = testdata_5
+        abstraction = kismetdb.Packets(test_db)
+        with profiling.StageTimer() as timings:
+            nrows = len(abstraction.get_meta())
+        summary = timings.summary()
+        assert summary["stages"]["query"]["entries"] == 1
+        assert summary["stages"]["decode"]["entries"] == 1
+        total = sum([x["seconds"] for x in summary["stages"].values()])
+        assert abs(total - summary["duration"]) < 0.001
+        with profiling.StageTimer() as timings:
+            for _ in abstraction.yield_meta():
+                profiling.switch("write")
+        assert timings.summary()["stages"]["write"]["entries"] == nrows
+        assert "write" in timings.report()
+
+    def test_integration_profiling_script_options(self, testdata_5, tmpdir,
+                                                  capsys, monkeypatch):
+        from kismetdb.scripts import log_to_csv
+        test_db = testdata_5
+        pstats_file = str(tmpdir.join("csv.pstats"))
+        monkeypatch.setattr("sys.argv", [
+            "kismet_log_to_csv", "--in", test_db, "--table", "packets",
+            "--out", str(tmpdir.join("packets.csv")), "--timings",
+            "--profile", pstats_file])
+        log_to_csv.main()
+        err = capsys.readouterr().err
+        assert "Stage timings" in err
+        assert "cumulative" in err
+        assert os.path.getsize(pstats_file)
+        assert not profiling.recorders
+
+    def test_integration_profiling_memory_unavailable(self, capsys,
+                                                      monkeypatch):
+        from kismetdb.scripts import log_to_csv
+        monkeypatch.setitem(sys.modules, "tracemalloc", None)
+        monkeypatch.setattr("sys.argv", [
+            "kismet_log_to_csv", "--in", "Kismet.kismet", "--table",
+            "packets", "--profile-memory"])
+        with pytest.raises(SystemExit):
+            log_to_csv.main()
+        assert "--profile-memory requires Python 3.4+" in \
+            capsys.readouterr().err
+        with pytest.raises(ImportError):
+            profiling.MemoryProfile()
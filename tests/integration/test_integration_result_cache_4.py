@@ -0,0 +1,30 @@
+import os
+
+import kismetdb
+
+
+class TestIntegrationResultCache(object):
+    def test_integration_result_cache_get_meta(self, testdata_4, tmpdir):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        expected = abstraction.get_meta()
+        abstraction.result_cache = kismetdb.ResultCache(str(tmpdir))
+        assert abstraction.get_meta() == expected
+        assert abstraction.get_meta() == expected
+        assert abstraction.result_cache.hits == 1
+        assert abstraction.result_cache.misses == 1
+
+    def test_integration_result_cache_yield_meta(self, testdata_4, tmpdir):
+        test_db = testdata_4
+        abstraction = kismetdb.Packets(test_db)
+        abstraction.result_cache = kismetdb.ResultCache(str(tmpdir),
+                                                        batch_size=7)
+        partial = abstraction.yield_meta()
+        next(partial)
+        partial.close()
+        assert not os.listdir(str(tmpdir))
+        first = list(abstraction.yield_meta())
+        assert list(abstraction.yield_meta()) == first
+        assert abstraction.result_cache.hits == 1
+        abstraction.result_cache.clear()
+        assert not os.listdir(str(tmpdir))
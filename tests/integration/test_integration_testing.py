@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import kismetdb
+from kismetdb import testing
+
+
+class TestIntegrationTesting(object):
+    @pytest.mark.parametrize("db_version", [4, 5, 6, 7, 8])
+    def test_integration_testing_generate_log(self, tmpdir, db_version):
+        test_db = str(tmpdir.join("generated.kismet"))
+        counts = testing.generate_log(test_db, db_version, n_devices=20,
+                                      n_packets=500, n_alerts=5,
+                                      n_messages=5, n_data=5,
+                                      device_json_size=4096)
+        assert counts["packets"] == 500
+        assert kismetdb.Packets(test_db).db_version == db_version
+        assert kismetdb.Kismet(test_db).kismet_name == "kismetdb-testing"
+        for abstraction in [kismetdb.Alerts, kismetdb.DataPackets,
+                            kismetdb.DataSources, kismetdb.Devices,
+                            kismetdb.Messages, kismetdb.Packets,
+                            kismetdb.Snapshots]:
+            rows = abstraction(test_db).get_all()
+            assert len(rows) == counts[abstraction.table_name]
+        packets = kismetdb.Packets(test_db).get_meta()
+        times = [(x["ts_sec"], x["ts_usec"]) for x in packets]
+        assert times == sorted(times)
+        devices = kismetdb.Devices(test_db).get_all()
+        devkeys = set([x["devkey"] for x in devices])
+        assert set([x["devkey"] for x in packets]) <= devkeys
+        for device in devices:
+            record = json.loads(device["device"])
+            assert record["kismet.device.base.macaddr"] == device["devmac"]
+            assert len(device["device"]) >= 4096 * 0.9
+            if device["avg_lat"]:
+                assert device["min_lat"] <= device["avg_lat"] <= \
+                    device["max_lat"]
+
+    def test_integration_testing_generate_log_repeatable(self, tmpdir):
+        first = str(tmpdir.join("first.kismet"))
+        second = str(tmpdir.join("second.kismet"))
+        for test_db in [first, second]:
+            testing.generate_log(test_db, 8, n_devices=10, n_packets=200,
+                                 duplicate_rate=0.2, seed=7)
+        packets = kismetdb.Packets(first).get_all()
+        assert packets == kismetdb.Packets(second).get_all()
+        assert len(kismetdb.Packets(first).dedupe()) < len(packets)
+
+    def test_integration_testing_generate_log_invalid(self, tmpdir):
+        test_db = str(tmpdir.join("generated.kismet"))
+        with pytest.raises(ValueError):
+            testing.generate_log(test_db, 3)
+        testing.generate_log(test_db, 5, n_packets=10)
+        with pytest.raises(ValueError):
+            testing.generate_log(test_db, 5, n_packets=10)
+        testing.generate_log(test_db, 5, n_packets=10, overwrite=True)
@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import pytest
+
+import kismetdb
+
+
+class TestUnitImports(object):
+    @pytest.mark.skipif(sys.version_info < (3, 7),
+                        reason="Lazy loading requires Python 3.7")
+    def test_unit_imports_lazy(self):
+        code = ("import sys, kismetdb; kismetdb.Packets; "
+                "print(' '.join(sorted(sys.modules)))")
+        modules = subprocess.check_output([sys.executable, "-c",
+                                           code]).decode("utf-8").split()
+        assert "kismetdb.packets" in modules
+        for module in ["kismetdb.export", "kismetdb.result_cache",
+                       "dateutil", "inspect", "xml.sax.saxutils"]:
+            assert module not in modules
+
+    def test_unit_imports_public_names(self):
+        for name in kismetdb.__all__:
+            assert getattr(kismetdb, name) is not None
+        with pytest.raises(AttributeError):
+            kismetdb.NotAName
@@ -0,0 +1,31 @@
+import zipfile
+
+import kismetdb
+
+
+class TestUnitKML(object):
+    def test_unit_kml_writer_points_and_folders(self, tmpdir):
+        outfile = str(tmpdir.join("out.kml"))
+        with kismetdb.KMLWriter(outfile, title="Test & title") as kml:
+            kml.add_point("first <ap>", -105.1, 40.1, folder="IEEE802.11")
+            kml.add_point("second", -105.2, 40.2, folder="IEEE802.11")
+            kml.add_point("third", -105.3, 40.3, folder="Bluetooth")
+        assert kml.num_placemarks == 3
+        with open(outfile) as f:
+            content = f.read()
+        assert "<name>Test &amp; title</name>" in content
+        assert "first &lt;ap&gt;" in content
+        assert content.count("<Folder>") == 2
+        assert content.count("</Folder>") == 2
+        assert "-105.3,40.3,0" in content
+        assert content.endswith("</Document>\n</kml>\n")
+
+    def test_unit_kml_writer_kmz(self, tmpdir):
+        outfile = str(tmpdir.join("out.kmz"))
+        with kismetdb.KMLWriter(outfile) as kml:
+            kml.add_point("only", -105.1, 40.1)
+        assert kml.kmz
+        with zipfile.ZipFile(outfile) as kmz:
+            content = kmz.read("doc.kml").decode("utf-8")
+        assert "<Placemark><name>only</name>" in content
+        assert [str(x) for x in tmpdir.listdir()] == [outfile]
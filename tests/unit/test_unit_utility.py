@@ -1,4 +1,7 @@
 import datetime
+import json
+
+import pytest
 
 import kismetdb
 
@@ -64,3 +67,85 @@ class TestUnitUtility(object):
                                                                  filter_value)
         assert result[0] == "tstamp_abc = :tstamp_abc"
         assert result[1] == {"tstamp_abc": 1514764800}
+
+    def test_unit_utility_generate_json_extract(self):
+        result = kismetdb.Utility.generate_json_extract(
+            "device", ("kismet.device.base.name",))
+        assert result == ("json_extract(CAST(device AS TEXT), "
+                          "'$.\"kismet.device.base.name\"')")
+
+    def test_unit_utility_duration_to_usecs(self):
+        durations = {"100ms": 100000, "1s": 1000000, "5m": 300000000,
+                     "1h": 3600000000, "1d": 86400000000, "2": 2000000,
+                     1: 1000000, 0.5: 500000}
+        for duration, expected in durations.items():
+            assert kismetdb.Utility.duration_to_usecs(duration) == expected
+
+    def test_unit_utility_duration_to_usecs_invalid(self):
+        for duration in ["nonsense", "5q", "0s", -1]:
+            with pytest.raises(ValueError):
+                kismetdb.Utility.duration_to_usecs(duration)
+
+    def test_unit_utility_generate_multi_string_sql_eq_or(self):
+        result = kismetdb.Utility.generate_multi_string_sql_eq("devmac",
+                                                               ["a", "b"])
+        assert result[0] == "( devmac = :devmac1 OR devmac = :devmac2 )"
+        assert result[1] == {"devmac1": "a", "devmac2": "b"}
+
+    def test_unit_utility_generate_multi_string_sql_eq_json(self):
+        values = ["mac{}".format(x) for x in range(20000)]
+        result = kismetdb.Utility.generate_multi_string_sql_eq("devmac",
+                                                               values)
+        assert result[0] == ("devmac IN (SELECT value FROM "
+                             "json_each(:devmac_set))")
+        assert list(result[1].keys()) == ["devmac_set"]
+        assert json.loads(result[1]["devmac_set"]) == values
+
+    def test_unit_utility_distance_meters(self):
+        assert kismetdb.Utility.distance_meters(40, -105, 40, -105) == 0
+        one_degree = kismetdb.Utility.distance_meters(0, 0, 1, 0)
+        assert 111000 < one_degree < 111400
+        assert kismetdb.Utility.distance_meters(None, 0, 1, 0) is None
+
+    def test_unit_utility_slippy_tiles(self):
+        assert kismetdb.Utility.lon_to_tile_x(-180, 0) == 0
+        assert kismetdb.Utility.lon_to_tile_x(180, 1) == 1
+        assert kismetdb.Utility.lat_to_tile_y(89.9, 3) == 0
+        x = kismetdb.Utility.lon_to_tile_x(-105, 10)
+        y = kismetdb.Utility.lat_to_tile_y(40, 10)
+        assert (x, y) == (213, 387)
+        bounds = kismetdb.Utility.tile_bounds(x, y, 10)
+        assert bounds[0] <= 40 <= bounds[2]
+        assert bounds[1] <= -105 <= bounds[3]
+
+    def test_unit_utility_timestamp_string_fast_path(self):
+        kismetdb.Utility.timestamp_cache.clear()
+        expected = {"1514764800": (1514764800, 0),
+                    "1514764800.25": (1514764800, 250000),
+                    "2018-01-01T00:00:00": (1514764800, 0),
+                    "2018-01-01T02:00:00+02:00": (1514764800, 0)}
+        for timestamp, result in expected.items():
+            assert kismetdb.Utility.timestamp_string_to_tuple(timestamp) == \
+                (result, "")
+        assert "1514764800" in kismetdb.Utility.timestamp_cache
+
+    def test_unit_utility_timestamp_string_compact_date(self):
+        kismetdb.Utility.timestamp_cache.clear()
+        expected = {"20180101": (1514764800, 0),
+                    "20180101000010": (1514764810, 0),
+                    "20180101.5": (20180101, 500000)}
+        for timestamp, result in expected.items():
+            assert kismetdb.Utility.timestamp_string_to_tuple(timestamp) == \
+                (result, "")
+
+    def test_unit_utility_timestamp_string_dateutil_not_cached(self):
+        kismetdb.Utility.timestamp_cache.clear()
+        result = kismetdb.Utility.timestamp_string_to_tuple("Jan 1 2018")
+        assert result == ((1514764800, 0), "")
+        assert kismetdb.Utility.timestamp_cache == {}
+
+    def test_unit_utility_timestamp_to_iso_column(self):
+        timestamps = [1514764800, 1514764800, 1514764801]
+        result = kismetdb.Utility.timestamp_to_iso(timestamps)
+        assert result == [kismetdb.Utility.timestamp_to_iso(x)
+                          for x in timestamps]